@@ -0,0 +1,24 @@
+import logging
+
+from .db_queries import DatabaseOperations
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class AsyncDatabaseOperations:
+    """DatabaseOperations for psycopg AsyncCursor, used from the scraper event loop
+
+    Same queries as the sync versions, only awaited, so a slow database suspends
+    one coroutine instead of blocking every page of the event loop.
+    Matches are written with BulkIngestion.ingest_async, only reads live here.
+    """
+
+    @staticmethod
+    async def load_known_matches(cur):
+        """All stored match ids and (home, away, date) keys with one query"""
+        await cur.execute(DatabaseOperations.KNOWN_MATCHES_QUERY)
+        return DatabaseOperations.known_matches(await cur.fetchall())
@@ -0,0 +1,286 @@
+import logging
+
+from .db_queries import DatabaseOperations
+from .long_statistics import LongStatistics
+from .db_connect import DB_STATISTICS_LAYOUT
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class BulkIngestion:
+    """Batch of matches into the database with COPY and a handful of set based statements
+
+    Matches are copied into temporary staging tables, teams, referees and stadiums
+    missing in the database are inserted in one statement each, then `matches` is
+    upserted with ON CONFLICT (match_id) and the statistics rows of the batch are replaced.
+    Running the same batch twice leaves the same rows, so retries are safe,
+    and concurrent writers skip rows the other one inserted first; this needs the
+    unique keys of schema migration 2. The caller owns the transaction and commits.
+    """
+
+    # staging column -> match_data key
+    MATCH_FIELDS = {
+        'match_id': 'match_id',
+        'url': 'url',
+        'date_time': 'date_time',
+        'home_team': 'home_team',
+        'away_team': 'away_team',
+        'home_score': 'home_score',
+        'away_score': 'away_score',
+        'status': 'status',
+        'referee_name': 'referee_name',
+        'referee_nationality': 'referee_nationality',
+        'stadium_name': 'stadium_name',
+        'stadium_city': 'stadium_city',
+        'attendance': 'attendance',
+    }
+
+    # columns of matches which are copied straight from staging
+    MATCH_COLUMNS = ['match_id', 'url', 'date_time', 'home_score', 'away_score', 'status', 'attendance']
+
+    @staticmethod
+    def match_rows(matches):
+        """Staging rows for matches, one per match_id, the last occurrence wins"""
+        rows = {}
+        for match_data in matches:
+            match_id = match_data.get('match_id')
+            if not match_id:
+                logger.warning(f"Skipping match without match_id: {match_data.get('url')}")
+                continue
+            row = []
+            for key in BulkIngestion.MATCH_FIELDS.values():
+                value = match_data.get(key)
+                if key == 'date_time' and value:
+                    # ISO text does not depend on the DateStyle of the server
+                    value = DatabaseOperations.match_key(None, None, value)[2]
+                row.append(None if value is None else str(value))
+            rows[str(match_id)] = tuple(row)
+        return list(rows.values())
+
+    @staticmethod
+    def statistic_rows(matches):
+        """(match_id, column, value) rows in long format, columns like home_ball_possession"""
+        rows = {}
+        for match_data in matches:
+            match_id = match_data.get('match_id')
+            if not match_id:
+                continue
+            for column, value in DatabaseOperations.statistic_columns(match_data).items():
+                rows[(str(match_id), column)] = None if value is None else str(value)
+        return [(match_id, column, value) for (match_id, column), value in rows.items()]
+
+    COLUMN_TYPES_QUERY = """
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+    """
+
+    # missing teams, referees and stadiums of the staged batch, keys compared like the unique
+    # indexes of schema migration 2 do, rows added meanwhile by another writer are skipped
+    DIMENSION_STATEMENTS = [
+        """
+            INSERT INTO teams (name)
+            SELECT DISTINCT s.name
+            FROM (
+                SELECT home_team AS name FROM staging_matches
+                UNION
+                SELECT away_team FROM staging_matches
+            ) s
+            WHERE s.name IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM teams t WHERE t.name = s.name)
+            ON CONFLICT (name) DO NOTHING
+        """,
+        """
+            INSERT INTO referees (name, nationality)
+            SELECT DISTINCT s.referee_name, s.referee_nationality
+            FROM staging_matches s
+            WHERE s.referee_name IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM referees r
+                  WHERE r.name = s.referee_name AND coalesce(r.nationality, '') = coalesce(s.referee_nationality, '')
+              )
+            ON CONFLICT (name, coalesce(nationality, '')) DO NOTHING
+        """,
+        """
+            INSERT INTO stadiums (name, city)
+            SELECT DISTINCT s.stadium_name, s.stadium_city
+            FROM staging_matches s
+            WHERE s.stadium_name IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM stadiums st
+                  WHERE st.name = s.stadium_name AND coalesce(st.city, '') = coalesce(s.stadium_city, '')
+              )
+            ON CONFLICT (name, coalesce(city, '')) DO NOTHING
+        """,
+    ]
+
+    @staticmethod
+    def staging_statements():
+        # temp tables live until commit, dropping first allows several batches per transaction
+        columns = ', '.join(f"{column} text" for column in BulkIngestion.MATCH_FIELDS)
+        return [
+            "DROP TABLE IF EXISTS staging_matches, staging_statistics",
+            f"CREATE TEMP TABLE staging_matches ({columns}) ON COMMIT DROP",
+            "CREATE TEMP TABLE staging_statistics (match_id text, stat_column text, value text) ON COMMIT DROP",
+        ]
+
+    @staticmethod
+    def copy_statement(table, columns):
+        return f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+
+    @staticmethod
+    def upsert_matches_query(match_types):
+        columns = BulkIngestion.MATCH_COLUMNS
+        select = ', '.join(f"CAST(s.{column} AS {match_types[column]})" for column in columns)
+        updates = ', '.join(
+            f"{column} = EXCLUDED.{column}"
+            for column in columns + ['home_team_id', 'away_team_id', 'referee_id', 'stadium_id']
+            if column != 'match_id'
+        )
+        # databases before schema migration 2 have duplicate names, the lowest id per name is the canonical row,
+        # updated_at tells incremental readers like team_form that a stored match changed
+        return f"""
+            INSERT INTO matches ({', '.join(columns)}, home_team_id, away_team_id, referee_id, stadium_id)
+            SELECT {select}, ht.team_id, at.team_id, r.referee_id, st.stadium_id
+            FROM staging_matches s
+            LEFT JOIN (SELECT name, min(team_id) AS team_id FROM teams GROUP BY name) ht ON ht.name = s.home_team
+            LEFT JOIN (SELECT name, min(team_id) AS team_id FROM teams GROUP BY name) at ON at.name = s.away_team
+            LEFT JOIN (
+                SELECT name, coalesce(nationality, '') AS nationality, min(referee_id) AS referee_id
+                FROM referees GROUP BY name, coalesce(nationality, '')
+            ) r ON r.name = s.referee_name AND r.nationality = coalesce(s.referee_nationality, '')
+            LEFT JOIN (
+                SELECT name, coalesce(city, '') AS city, min(stadium_id) AS stadium_id
+                FROM stadiums GROUP BY name, coalesce(city, '')
+            ) st ON st.name = s.stadium_name AND st.city = coalesce(s.stadium_city, '')
+            ON CONFLICT (match_id) DO UPDATE SET {updates}, updated_at = now()
+        """
+
+    @staticmethod
+    def replace_statistics_statements(match_types, statistic_types, stat_columns):
+        """Delete and re-insert the statistics rows of the batch, pivoted to the wide table"""
+        pivot = ''.join(
+            f", CAST(max(st.value) FILTER (WHERE st.stat_column = '{column}') AS {statistic_types[column]})"
+            for column in stat_columns
+        )
+        columns = ''.join(f", {column}" for column in stat_columns)
+        return [
+            f"""
+                DELETE FROM match_statistics
+                WHERE match_id IN (SELECT CAST(match_id AS {match_types['match_id']}) FROM staging_matches)
+            """,
+            f"""
+                INSERT INTO match_statistics (match_id{columns})
+                SELECT CAST(s.match_id AS {statistic_types['match_id']}){pivot}
+                FROM staging_matches s
+                LEFT JOIN staging_statistics st ON st.match_id = s.match_id
+                GROUP BY s.match_id
+            """,
+        ]
+
+    @staticmethod
+    def known_statistics(statistic_rows, statistic_types):
+        """Rows and sorted column names of statistics which have a column in match_statistics"""
+        # statistics without a column in the table cannot be stored, same as a failed single insert
+        stat_columns = sorted({column for _, column, _ in statistic_rows})
+        unknown = [column for column in stat_columns if column not in statistic_types]
+        if unknown:
+            logger.warning(f"No match_statistics columns for {unknown}, skipping them")
+            stat_columns = [column for column in stat_columns if column in statistic_types]
+            statistic_rows = [row for row in statistic_rows if row[1] in statistic_types]
+        return statistic_rows, stat_columns
+
+    @staticmethod
+    def staged_statistics(matches, statistic_types, layout=None):
+        """Statistic rows to stage and the match_statistics columns they fill"""
+        layout = layout or DB_STATISTICS_LAYOUT
+        rows = BulkIngestion.statistic_rows(matches)
+        if not LongStatistics.writes_wide(layout):
+            return rows, []
+        known_rows, stat_columns = BulkIngestion.known_statistics(rows, statistic_types)
+        # long format has a row for every statistic, also those without a column
+        return (rows if LongStatistics.writes_long(layout) else known_rows), stat_columns
+
+    @staticmethod
+    def statistics_statements(match_types, statistic_types, stat_columns, layout=None):
+        layout = layout or DB_STATISTICS_LAYOUT
+        statements = []
+        if LongStatistics.writes_wide(layout):
+            statements += BulkIngestion.replace_statistics_statements(match_types, statistic_types, stat_columns)
+        if LongStatistics.writes_long(layout):
+            statements += LongStatistics.staged_statements(match_types['match_id'])
+        return statements
+
+    @staticmethod
+    def steps(matches):
+        """Statements of one batch as (query, params, copy rows) steps, returns number of matches written
+
+        A driver runs each step, COPY when rows are given, and sends back (fetched rows, rowcount).
+        `ingest` and `ingest_async` only drive it, so both run exactly the same statements.
+        """
+        match_rows = BulkIngestion.match_rows(matches)
+        if not match_rows:
+            return 0
+
+        match_types, _ = yield BulkIngestion.COLUMN_TYPES_QUERY, ('matches',), None
+        statistic_types, _ = yield BulkIngestion.COLUMN_TYPES_QUERY, ('match_statistics',), None
+        match_types, statistic_types = dict(match_types), dict(statistic_types)
+        statistic_rows, stat_columns = BulkIngestion.staged_statistics(matches, statistic_types)
+
+        for statement in BulkIngestion.staging_statements():
+            yield statement, None, None
+        yield BulkIngestion.copy_statement('staging_matches', BulkIngestion.MATCH_FIELDS), None, match_rows
+        yield BulkIngestion.copy_statement('staging_statistics', ['match_id', 'stat_column', 'value']), None, statistic_rows
+
+        for statement in BulkIngestion.DIMENSION_STATEMENTS:
+            yield statement, None, None
+        _, written = yield BulkIngestion.upsert_matches_query(match_types), None, None
+        for statement in BulkIngestion.statistics_statements(match_types, statistic_types, stat_columns):
+            yield statement, None, None
+
+        logger.info(f"Bulk ingested {written} matches with {len(statistic_rows)} statistic values")
+        return written
+
+    @staticmethod
+    def ingest(cur, matches):
+        """Upsert a batch of scraped match dicts, returns number of matches written"""
+        steps = BulkIngestion.steps(matches)
+        result = None
+        while True:
+            try:
+                query, params, rows = steps.send(result)
+            except StopIteration as done:
+                return done.value
+
+            if rows is not None:
+                with cur.copy(query) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                result = None, cur.rowcount
+            else:
+                cur.execute(query, params)
+                result = (cur.fetchall() if cur.description else None), cur.rowcount
+
+    @staticmethod
+    async def ingest_async(cur, matches):
+        """Same as ingest on an async cursor"""
+        steps = BulkIngestion.steps(matches)
+        result = None
+        while True:
+            try:
+                query, params, rows = steps.send(result)
+            except StopIteration as done:
+                return done.value
+
+            if rows is not None:
+                async with cur.copy(query) as copy:
+                    for row in rows:
+                        await copy.write_row(row)
+                result = None, cur.rowcount
+            else:
+                await cur.execute(query, params)
+                result = (await cur.fetchall() if cur.description else None), cur.rowcount
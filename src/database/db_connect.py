@@ -1,8 +1,13 @@
 import os
+import asyncio
+import atexit
+import threading
+import weakref
+from contextlib import contextmanager, asynccontextmanager
 from dotenv import load_dotenv
 import logging
-from psycopg import connect
 from psycopg.conninfo import make_conninfo
+from psycopg_pool import ConnectionPool, AsyncConnectionPool
 
 load_dotenv()
 
@@ -22,6 +27,21 @@ DB_NAME = os.getenv("DB_NAME")
 DB_PORT= os.getenv("DB_PORT")
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# connections kept open by the process wide pool
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 5))
+# seconds to wait for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# idle connections are closed after that many seconds
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", 300))
+# where match statistics are written: wide match_statistics, long match_statistic_values or both
+DB_STATISTICS_LAYOUT = os.getenv("DB_STATISTICS_LAYOUT", "wide")
+# incremental readers stay that many seconds behind the newest change, rows of transactions
+# still running when they read can commit with an older timestamp
+DB_WATERMARK_LAG = float(os.getenv("DB_WATERMARK_LAG", 120))
+# parquet export of the match history, partitioned by season
+PARQUET_SNAPSHOT_DIR = os.getenv("PARQUET_SNAPSHOT_DIR", "data/match_history")
+
 
 CONNECTION_INFO = make_conninfo(
     host = DB_HOST,
@@ -31,11 +51,125 @@ CONNECTION_INFO = make_conninfo(
     password = DB_PASSWORD
 )
 
-try:  
-    logger.info(f"Attempting to connect with database {DB_NAME} on host {DB_HOST}:{DB_PORT}")
-    db_connection = connect(CONNECTION_INFO)
-    logger.info(f"Connected to {DB_NAME}")
-    db_connection.commit()
-    db_connection.close()
-except Exception as e:
-    logger.error(f"Failed to connect to database {DB_NAME} {e}")
+_pool = None
+_async_pool = None
+_async_pool_loop = None
+_async_pool_connections = weakref.WeakSet()
+_async_pool_lock = None
+_async_pool_lock_loop = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process wide connection pool, created on first use so importing never touches the network"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                logger.info(f"Opening connection pool to {DB_NAME} on host {DB_HOST}:{DB_PORT}")
+                _pool = ConnectionPool(
+                    CONNECTION_INFO,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    max_idle=DB_POOL_MAX_IDLE,
+                    # a connection dropped by the server is replaced before it is handed out
+                    check=ConnectionPool.check_connection,
+                    name='ekstraklasa',
+                    open=True,
+                )
+    return _pool
+
+
+@contextmanager
+def connection():
+    """Pooled connection, committed when the block ends and rolled back on error"""
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def _async_lock(loop):
+    """Lock serialising pool creation in one event loop"""
+    global _async_pool_lock, _async_pool_lock_loop
+    if _async_pool_lock_loop is not loop:
+        _async_pool_lock, _async_pool_lock_loop = asyncio.Lock(), loop
+    return _async_pool_lock
+
+
+async def _close_async_pool(pool, loop, connections):
+    if pool.closed:
+        return
+    if loop is asyncio.get_running_loop():
+        await pool.close()
+    elif loop.is_running():
+        # loop of another thread, the pool has to be closed there
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(pool.close(), loop))
+    else:
+        # the workers of pool.close() died with their loop, only the connections are left to close
+        logger.info(f"Closing {len(connections)} connections of an async pool left open by a finished event loop")
+        for conn in list(connections):
+            await conn.close()
+
+
+async def get_async_pool():
+    """Async pool of the running event loop, created on first use"""
+    global _async_pool, _async_pool_loop, _async_pool_connections
+    loop = asyncio.get_running_loop()
+    if _async_pool is not None and _async_pool_loop is loop:
+        return _async_pool
+
+    async with _async_lock(loop):
+        if _async_pool is not None and _async_pool_loop is loop:
+            return _async_pool
+        # async pools belong to one event loop, asyncio.run gives every run a new one
+        if _async_pool is not None:
+            logger.info("Event loop changed, replacing async connection pool")
+            await _close_async_pool(_async_pool, _async_pool_loop, _async_pool_connections)
+            _async_pool, _async_pool_loop = None, None
+
+        connections = weakref.WeakSet()
+
+        async def track(conn):
+            connections.add(conn)
+
+        pool = AsyncConnectionPool(
+            CONNECTION_INFO,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            timeout=DB_POOL_TIMEOUT,
+            max_idle=DB_POOL_MAX_IDLE,
+            check=AsyncConnectionPool.check_connection,
+            configure=track,
+            name='ekstraklasa-async',
+            open=False,
+        )
+        # published only once open, concurrent callers wait on the lock meanwhile
+        await pool.open()
+        _async_pool, _async_pool_loop, _async_pool_connections = pool, loop, connections
+    return _async_pool
+
+
+@asynccontextmanager
+async def async_connection():
+    """Pooled async connection, committed when the block ends and rolled back on error"""
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        yield conn
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+async def close_async_pool():
+    global _async_pool, _async_pool_loop
+    if _async_pool is not None:
+        await _close_async_pool(_async_pool, _async_pool_loop, _async_pool_connections)
+        _async_pool, _async_pool_loop = None, None
+
+
+atexit.register(close_pool)
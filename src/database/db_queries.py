@@ -1,8 +1,11 @@
 import logging
+from datetime import datetime
 from psycopg import connect
 from psycopg.rows import dict_row
 import json
 from .db_connect import CONNECTION_INFO
+from .stat_normalizer import normalize_statistics
+from .long_statistics import LongStatistics
 
 logger = logging.getLogger(__name__)
 
@@ -135,6 +138,44 @@ class DatabaseOperations:
             logger.error(f"Error checking match existence: {e}")
             return False
 
+    @staticmethod
+    def match_key(home_team, away_team, date_time):
+        """(home, away, date) key comparable between scraped text 'dd.mm.yyyy hh:mm' and database timestamps"""
+        if isinstance(date_time, str):
+            for date_format in ('%d.%m.%Y %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
+                try:
+                    date_time = datetime.strptime(date_time.strip(), date_format)
+                    break
+                except ValueError:
+                    continue
+        if isinstance(date_time, datetime):
+            date_time = date_time.strftime('%Y-%m-%d %H:%M')
+        return (home_team, away_team, date_time)
+
+    KNOWN_MATCHES_QUERY = """
+        SELECT m.match_id, ht.name, at.name, m.date_time
+        FROM matches m
+        LEFT JOIN teams ht ON m.home_team_id = ht.team_id
+        LEFT JOIN teams at ON m.away_team_id = at.team_id
+    """
+
+    @staticmethod
+    def known_matches(rows):
+        """(match ids, match keys) from rows of KNOWN_MATCHES_QUERY"""
+        match_ids = set()
+        match_keys = set()
+        for match_id, home_team, away_team, date_time in rows:
+            match_ids.add(str(match_id))
+            if home_team and away_team and date_time:
+                match_keys.add(DatabaseOperations.match_key(home_team, away_team, date_time))
+        return match_ids, match_keys
+
+    @staticmethod
+    def load_known_matches(cur):
+        """All stored match ids and (home, away, date) keys with one query, for in-memory existence checks"""
+        cur.execute(DatabaseOperations.KNOWN_MATCHES_QUERY)
+        return DatabaseOperations.known_matches(cur.fetchall())
+
     @staticmethod
     def get_or_create_stadium(cur, stadium_name, city):
         if not stadium_name:
@@ -162,32 +203,11 @@ class DatabaseOperations:
             raise
     
     @staticmethod
-    def insert_match_data(cur, match_data):
-        """Insert a single match into the database with all statistics"""
-        
-        # using get or create functions for 2 teams and referee
-        home_team_name = match_data.get('home_team')
-        away_team_name = match_data.get('away_team')
-        
-        logger.debug(f"Processing match: {home_team_name} vs {away_team_name}")
-        
-        home_team_id = DatabaseOperations.get_or_create_team(cur, home_team_name)
-        logger.debug(f"Home team '{home_team_name}' -> ID: {home_team_id}")
-        
-        away_team_id = DatabaseOperations.get_or_create_team(cur, away_team_name)
-        logger.debug(f"Away team '{away_team_name}' -> ID: {away_team_id}")
-        
-        referee_id = DatabaseOperations.get_or_create_referee(
-            cur, 
-            match_data.get('referee_name'),
-            match_data.get('referee_nationality')
-        )
-        stadium_id = DatabaseOperations.get_or_create_stadium(
-            cur,
-            match_data.get('stadium_name'),
-            match_data.get('stadium_city')
-        )
-        
+    def statistic_columns(match_data):
+        """Basic and detailed statistics of a match as {'home_<stat>': value, 'away_<stat>': value}
+
+        Values are numbers, see stat_normalizer, ratio statistics also get _completed and _attempted columns.
+        """
         #  all statistics from both basic and detailed statistics
         all_stats = {}
         
@@ -210,12 +230,49 @@ class DatabaseOperations:
         else:
             logger.warning(f"No 'detailed_statistic' key in match_data for match {match_data.get('match_id')}")
         
-        # statistics dictionary with English column names
         stats_dict = {}
         for polish_name, values in all_stats.items():
             english_name = DatabaseOperations.translate_statistic_name(polish_name)
             stats_dict[f'home_{english_name}'] = values.get('home')
             stats_dict[f'away_{english_name}'] = values.get('away')
+        return normalize_statistics(stats_dict)
+    
+    @staticmethod
+    def insert_match_data(cur, match_data, cache=None):
+        """Insert a single match into the database with all statistics
+
+        With a DimensionCache teams, referee and stadium are resolved in memory.
+        """
+        
+        # using get or create functions for 2 teams and referee
+        home_team_name = match_data.get('home_team')
+        away_team_name = match_data.get('away_team')
+        
+        logger.debug(f"Processing match: {home_team_name} vs {away_team_name}")
+        
+        if cache is not None:
+            home_team_id = cache.team_id(cur, home_team_name)
+            away_team_id = cache.team_id(cur, away_team_name)
+            referee_id = cache.referee_id(cur, match_data.get('referee_name'), match_data.get('referee_nationality'))
+            stadium_id = cache.stadium_id(cur, match_data.get('stadium_name'), match_data.get('stadium_city'))
+        else:
+            home_team_id = DatabaseOperations.get_or_create_team(cur, home_team_name)
+            away_team_id = DatabaseOperations.get_or_create_team(cur, away_team_name)
+            referee_id = DatabaseOperations.get_or_create_referee(
+                cur, 
+                match_data.get('referee_name'),
+                match_data.get('referee_nationality')
+            )
+            stadium_id = DatabaseOperations.get_or_create_stadium(
+                cur,
+                match_data.get('stadium_name'),
+                match_data.get('stadium_city')
+            )
+        logger.debug(f"Home team '{home_team_name}' -> ID: {home_team_id}")
+        logger.debug(f"Away team '{away_team_name}' -> ID: {away_team_id}")
+        
+        # statistics dictionary with English column names
+        stats_dict = DatabaseOperations.statistic_columns(match_data)
 
         cur.execute("""
             INSERT INTO matches (
@@ -240,6 +297,12 @@ class DatabaseOperations:
         
         match_id = cur.fetchone()[0]
         
+        # one fixed shape row per statistic, unseen statistics extend stat_definitions
+        if LongStatistics.writes_long():
+            LongStatistics.insert(cur, match_id, stats_dict)
+        if not LongStatistics.writes_wide():
+            return match_id
+
         # dynamic INSERT for match_statistics with all statistic columns
         stat_columns = list(stats_dict.keys())
         stat_values = list(stats_dict.values())
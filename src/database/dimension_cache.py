@@ -0,0 +1,121 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class DimensionCache:
+    """Ids of teams, referees and stadiums kept in memory
+
+    Warms itself from the tables on first use, after that known names cost no query.
+    Unseen names are inserted in one statement per table under a transaction level
+    advisory lock, so writers in other processes never create the same row twice,
+    and the ids are read back with one select. The lowest id of a name is its id,
+    same as in bulk ingestion.
+    Call `invalidate()` after a rollback, ids inserted in that transaction are gone.
+    Only per match inserts use it, the backfill writer and the fallback of MatchWriter;
+    BulkIngestion already resolves a whole batch with one statement per table.
+    """
+
+    # table -> (id column, key columns)
+    TABLES = {
+        'teams': ('team_id', ('name',)),
+        'referees': ('referee_id', ('name', 'nationality')),
+        'stadiums': ('stadium_id', ('name', 'city')),
+    }
+
+    def __init__(self):
+        self.ids = {table: {} for table in self.TABLES}
+        self.warmed = False
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def warm(self, cur):
+        for table, (id_column, key_columns) in self.TABLES.items():
+            keys = ', '.join(key_columns)
+            cur.execute(f"SELECT {keys}, min({id_column}) FROM {table} GROUP BY {keys}")
+            self.ids[table] = {tuple(row[:-1]): row[-1] for row in cur.fetchall()}
+        self.warmed = True
+        logger.info(f"Dimension cache warmed: {', '.join(f'{len(ids)} {table}' for table, ids in self.ids.items())}")
+
+    def invalidate(self):
+        with self._lock:
+            self.ids = {table: {} for table in self.TABLES}
+            self.warmed = False
+
+    def resolve(self, cur, table, keys):
+        """{key tuple: id} for all keys, inserting the ones missing in the table"""
+        with self._lock:
+            if not self.warmed:
+                self.warm(cur)
+
+            cached = self.ids[table]
+            keys = {tuple(key) for key in keys if key and key[0]}
+            missing = [key for key in keys if key not in cached]
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+            if missing:
+                self._insert_missing(cur, table, missing)
+            return {key: cached.get(key) for key in keys}
+
+    def _insert_missing(self, cur, table, missing):
+        id_column, key_columns = self.TABLES[table]
+        keys = ', '.join(key_columns)
+        arrays = ', '.join(['%s::text[]'] * len(key_columns))
+        # same keys as the unique indexes, a missing nationality or city equals ''
+        name, *optional = key_columns
+        match = ' AND '.join([f"d.{name} = n.{name}", *(f"coalesce(d.{column}, '') = coalesce(n.{column}, '')" for column in optional)])
+        params = [list(values) for values in zip(*missing)]
+
+        # serialises inserts into this table until commit, also across processes
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"dimension:{table}",))
+        cur.execute(f"""
+            INSERT INTO {table} ({keys})
+            SELECT DISTINCT {', '.join(f'n.{column}' for column in key_columns)}
+            FROM unnest({arrays}) AS n({keys})
+            WHERE NOT EXISTS (SELECT 1 FROM {table} d WHERE {match})
+            ON CONFLICT DO NOTHING
+            RETURNING {id_column}
+        """, params)
+        inserted = len(cur.fetchall())
+
+        # rows added by other writers are picked up by the same select
+        cur.execute(f"""
+            SELECT {', '.join(f'n.{column}' for column in key_columns)}, min(d.{id_column})
+            FROM unnest({arrays}) AS n({keys})
+            JOIN {table} d ON {match}
+            GROUP BY {', '.join(f'n.{column}' for column in key_columns)}
+        """, params)
+        for row in cur.fetchall():
+            self.ids[table][tuple(row[:-1])] = row[-1]
+        logger.debug(f"Inserted {inserted} of {len(missing)} unseen {table}")
+
+    def team_id(self, cur, name):
+        if not name:
+            return None
+        return self.resolve(cur, 'teams', [(name,)])[(name,)]
+
+    def referee_id(self, cur, name, nationality):
+        if not name:
+            return None
+        return self.resolve(cur, 'referees', [(name, nationality)])[(name, nationality)]
+
+    def stadium_id(self, cur, name, city):
+        if not name:
+            return None
+        return self.resolve(cur, 'stadiums', [(name, city)])[(name, city)]
+
+    def resolve_matches(self, cur, matches):
+        """Insert every unseen team, referee and stadium of a batch with at most one insert per table"""
+        self.resolve(cur, 'teams', [(m.get(side),) for m in matches for side in ('home_team', 'away_team')])
+        self.resolve(cur, 'referees', [(m.get('referee_name'), m.get('referee_nationality')) for m in matches])
+        self.resolve(cur, 'stadiums', [(m.get('stadium_name'), m.get('stadium_city')) for m in matches])
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, **{table: len(ids) for table, ids in self.ids.items()}}
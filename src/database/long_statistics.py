@@ -0,0 +1,116 @@
+import logging
+
+from .db_connect import DB_STATISTICS_LAYOUT
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+SIDES = ('home', 'away')
+
+
+class LongStatistics:
+    """Match statistics as (match_id, stat_id, home_value, away_value) rows
+
+    Statistic names live once in `stat_definitions`, a row exists only for statistics
+    the page had, and a statistic never seen before is added to the dictionary
+    instead of failing the insert. `pivot_query` turns the rows back into the
+    home_<stat>/away_<stat> columns of match_statistics.
+    """
+
+    @staticmethod
+    def writes_wide(layout=DB_STATISTICS_LAYOUT):
+        return layout in ('wide', 'both')
+
+    @staticmethod
+    def writes_long(layout=DB_STATISTICS_LAYOUT):
+        return layout in ('long', 'both')
+
+    @staticmethod
+    def split_column(column):
+        """'home_ball_possession' -> ('home', 'ball_possession')"""
+        side, _, name = column.partition('_')
+        return side, name
+
+    @staticmethod
+    def statistic_values(stats_dict):
+        """{stat name: (home value, away value)} from {'home_<stat>': value, 'away_<stat>': value}"""
+        values = {}
+        for column, value in stats_dict.items():
+            side, name = LongStatistics.split_column(column)
+            if side not in SIDES:
+                continue
+            home, away = values.get(name, (None, None))
+            values[name] = (value, away) if side == 'home' else (home, value)
+        return values
+
+    @staticmethod
+    def stat_ids(cur, names):
+        """{name: stat_id}, names missing in stat_definitions are added"""
+        names = sorted(set(names))
+        if not names:
+            return {}
+        cur.execute("""
+            INSERT INTO stat_definitions (name)
+            SELECT unnest(%s::text[])
+            ON CONFLICT (name) DO NOTHING
+        """, (names,))
+        cur.execute("SELECT name, stat_id FROM stat_definitions WHERE name = ANY(%s)", (names,))
+        return dict(cur.fetchall())
+
+    @staticmethod
+    def insert(cur, match_id, stats_dict):
+        """Replace the statistics rows of one match, one fixed shape COPY whatever the page contained"""
+        values = LongStatistics.statistic_values(stats_dict)
+        ids = LongStatistics.stat_ids(cur, values)
+        cur.execute("DELETE FROM match_statistic_values WHERE match_id = %s", (match_id,))
+        with cur.copy("COPY match_statistic_values (match_id, stat_id, home_value, away_value) FROM STDIN") as copy:
+            for name, (home, away) in values.items():
+                copy.write_row((match_id, ids[name], home, away))
+        return len(values)
+
+    @staticmethod
+    def staged_statements(match_id_type):
+        """Long rows from the staging tables of BulkIngestion, set based like the rest of the batch"""
+        return [
+            """
+                INSERT INTO stat_definitions (name)
+                SELECT DISTINCT substr(stat_column, 6) FROM staging_statistics
+                ON CONFLICT (name) DO NOTHING
+            """,
+            f"""
+                DELETE FROM match_statistic_values
+                WHERE match_id IN (SELECT CAST(match_id AS {match_id_type}) FROM staging_matches)
+            """,
+            # home_ and away_ are both five characters
+            f"""
+                INSERT INTO match_statistic_values (match_id, stat_id, home_value, away_value)
+                SELECT CAST(s.match_id AS {match_id_type}), d.stat_id,
+                    CAST(max(s.value) FILTER (WHERE s.stat_column LIKE 'home\\_%') AS double precision),
+                    CAST(max(s.value) FILTER (WHERE s.stat_column LIKE 'away\\_%') AS double precision)
+                FROM staging_statistics s
+                JOIN stat_definitions d ON d.name = substr(s.stat_column, 6)
+                GROUP BY s.match_id, d.stat_id
+            """,
+        ]
+
+    @staticmethod
+    def _literal(name):
+        return "'" + name.replace("'", "''") + "'"
+
+    @staticmethod
+    def pivot_query(statistics):
+        """match_id plus home_<stat> and away_<stat> columns for the given statistic names"""
+        columns = ''.join(
+            f', max(v.{side}_value) FILTER (WHERE d.name = {LongStatistics._literal(name)}) AS "{side}_{name}"'
+            for name in statistics for side in SIDES
+        )
+        return f"""
+            SELECT v.match_id{columns}
+            FROM match_statistic_values v
+            JOIN stat_definitions d ON d.stat_id = v.stat_id
+            WHERE d.name IN ({', '.join(LongStatistics._literal(name) for name in statistics)})
+            GROUP BY v.match_id
+        """
@@ -0,0 +1,406 @@
+import argparse
+import json
+import logging
+
+from .db_queries import DatabaseOperations
+from .db_connect import connection
+from .stat_normalizer import RATIO_STATISTICS
+from .team_form import SIDE_VALUES, AVERAGES
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def statistic_columns():
+    """home_/away_ column of every translated statistic, in translation order"""
+    columns = []
+    for name in DatabaseOperations.STATISTIC_TRANSLATIONS.values():
+        columns += [f'home_{name}', f'away_{name}']
+    return columns
+
+
+def stat_definitions():
+    """(name, polish name) of every statistic column pair in match_statistics"""
+    definitions = [(name, polish_name) for polish_name, name in DatabaseOperations.STATISTIC_TRANSLATIONS.items()]
+    for name in RATIO_STATISTICS:
+        definitions += [(f'{name}_completed', None), (f'{name}_attempted', None)]
+    return definitions
+
+
+def _literal(value):
+    return 'NULL' if value is None else "'" + value.replace("'", "''") + "'"
+
+
+def _dedupe_dimension(table, id_column, key_expressions, references):
+    """Point references at the lowest id of each key and delete the other rows
+
+    `key_expressions` are those of the unique index built afterwards, so rows the
+    index would see as equal, like a NULL and an empty city, are merged too.
+    """
+    canonical = f"""
+        SELECT old_id, new_id
+        FROM (
+            SELECT {id_column} AS old_id, min({id_column}) OVER (PARTITION BY {', '.join(key_expressions)}) AS new_id
+            FROM {table}
+        ) k
+        WHERE old_id <> new_id
+    """
+    statements = [
+        f"UPDATE matches m SET {column} = c.new_id FROM ({canonical}) c WHERE m.{column} = c.old_id"
+        for column in references
+    ]
+    statements.append(f"DELETE FROM {table} d USING ({canonical}) c WHERE d.{id_column} = c.old_id")
+    return statements
+
+
+# version -> (name, statements), applied in order, every version in its own transaction
+# CREATE ... IF NOT EXISTS everywhere, so databases created by hand are adopted as they are
+MIGRATIONS = {
+    1: ('base tables', [
+        """
+            CREATE TABLE IF NOT EXISTS teams (
+                team_id serial PRIMARY KEY,
+                name varchar NOT NULL,
+                created_at timestamp DEFAULT now()
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS referees (
+                referee_id serial PRIMARY KEY,
+                name varchar NOT NULL,
+                nationality varchar,
+                created_at timestamp DEFAULT now()
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS stadiums (
+                stadium_id serial PRIMARY KEY,
+                name varchar NOT NULL,
+                city varchar,
+                created_at timestamp DEFAULT now()
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS matches (
+                match_id varchar PRIMARY KEY,
+                url text,
+                date_time timestamp,
+                home_team_id integer REFERENCES teams (team_id),
+                away_team_id integer REFERENCES teams (team_id),
+                home_score integer,
+                away_score integer,
+                status varchar,
+                referee_id integer REFERENCES referees (referee_id),
+                stadium_id integer REFERENCES stadiums (stadium_id),
+                attendance integer,
+                created_at timestamp DEFAULT now()
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS match_statistics (
+                id serial PRIMARY KEY,
+                match_id varchar REFERENCES matches (match_id),
+                created_at timestamp DEFAULT now()
+            )
+        """,
+        # values are stored as scraped, like '58%' or '84% (412/490)'
+        *[f"ALTER TABLE match_statistics ADD COLUMN IF NOT EXISTS {column} varchar" for column in statistic_columns()],
+    ]),
+    2: ('unique natural keys', [
+        # duplicates written before the keys existed, the lowest id is the one everything already joins on
+        *_dedupe_dimension('teams', 'team_id', ['name'], ['home_team_id', 'away_team_id']),
+        *_dedupe_dimension('referees', 'referee_id', ['name', "coalesce(nationality, '')"], ['referee_id']),
+        *_dedupe_dimension('stadiums', 'stadium_id', ['name', "coalesce(city, '')"], ['stadium_id']),
+        """
+            DELETE FROM match_statistics s
+            USING match_statistics newer
+            WHERE newer.match_id = s.match_id AND newer.id > s.id
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS teams_name_key ON teams (name)",
+        # coalesce, so a missing nationality or city is still one row per name
+        "CREATE UNIQUE INDEX IF NOT EXISTS referees_name_nationality_key ON referees (name, coalesce(nationality, ''))",
+        "CREATE UNIQUE INDEX IF NOT EXISTS stadiums_name_city_key ON stadiums (name, coalesce(city, ''))",
+        "CREATE UNIQUE INDEX IF NOT EXISTS match_statistics_match_id_key ON match_statistics (match_id)",
+    ]),
+    3: ('indexes for hot queries', [
+        # check_match_exist by teams and date, and the recent form of a team
+        "CREATE INDEX IF NOT EXISTS matches_home_team_date_idx ON matches (home_team_id, date_time)",
+        "CREATE INDEX IF NOT EXISTS matches_away_team_date_idx ON matches (away_team_id, date_time)",
+        # training data is read ordered by date
+        "CREATE INDEX IF NOT EXISTS matches_date_time_idx ON matches (date_time)",
+        # get_or_create_referee and get_or_create_stadium filter on both columns with '='
+        "CREATE INDEX IF NOT EXISTS referees_name_nationality_idx ON referees (name, nationality)",
+        "CREATE INDEX IF NOT EXISTS stadiums_name_city_idx ON stadiums (name, city)",
+    ]),
+    4: ('numeric statistics', [
+        # same rules as stat_normalizer.stat_number and stat_fraction
+        r"""
+            CREATE OR REPLACE FUNCTION stat_number(value text) RETURNS double precision
+            LANGUAGE sql IMMUTABLE AS $$
+                SELECT replace(coalesce(
+                    (regexp_match(value, '(-?\d+(?:[.,]\d+)?)\s*%'))[1],
+                    (regexp_match(value, '^\s*(-?\d+(?:[.,]\d+)?)\s*$'))[1],
+                    (regexp_match(value, '-?\d+(?:[.,]\d+)?'))[1]
+                ), ',', '.')::double precision
+            $$
+        """,
+        r"""
+            CREATE OR REPLACE FUNCTION stat_fraction(value text, part integer) RETURNS double precision
+            LANGUAGE sql IMMUTABLE AS $$
+                SELECT ((regexp_match(value, '(\d+)\s*/\s*(\d+)'))[part])::double precision
+            $$
+        """,
+        *[
+            f"ALTER TABLE match_statistics ADD COLUMN IF NOT EXISTS {side}_{stat}_{part} double precision"
+            for stat in RATIO_STATISTICS for side in ('home', 'away') for part in ('completed', 'attempted')
+        ],
+        # the fractions have to be read before the text columns are converted
+        "UPDATE match_statistics SET " + ', '.join(
+            f"{side}_{stat}_{part} = stat_fraction({side}_{stat}::text, {index})"
+            for stat in RATIO_STATISTICS for side in ('home', 'away')
+            for index, part in ((1, 'completed'), (2, 'attempted'))
+        ),
+        # every text statistic column, also those added by hand
+        r"""
+            DO $$
+            DECLARE
+                col record;
+            BEGIN
+                FOR col IN
+                    SELECT column_name FROM information_schema.columns
+                    WHERE table_schema = current_schema() AND table_name = 'match_statistics'
+                      AND (column_name LIKE 'home\_%' OR column_name LIKE 'away\_%')
+                      AND data_type IN ('character varying', 'text')
+                LOOP
+                    EXECUTE format(
+                        'ALTER TABLE match_statistics ALTER COLUMN %I TYPE double precision USING stat_number(%I)',
+                        col.column_name, col.column_name
+                    );
+                END LOOP;
+            END
+            $$
+        """,
+    ]),
+    5: ('rolling team form', [
+        # one row per team and finished match, averages cover the matches before it, see team_form.py
+        f"""
+            CREATE TABLE IF NOT EXISTS team_form (
+                team_id integer NOT NULL REFERENCES teams (team_id),
+                match_id varchar NOT NULL REFERENCES matches (match_id) ON DELETE CASCADE,
+                date_time timestamp,
+                is_home boolean NOT NULL,
+                {''.join(f'{column} double precision, ' for column in SIDE_VALUES)}
+                points integer,
+                win integer,
+                games_played integer,
+                {''.join(f'{column} double precision, ' for column in AVERAGES)}
+                refreshed_at timestamp DEFAULT now(),
+                PRIMARY KEY (team_id, match_id)
+            )
+        """,
+        "CREATE INDEX IF NOT EXISTS team_form_team_date_idx ON team_form (team_id, date_time)",
+        """
+            CREATE TABLE IF NOT EXISTS feature_refresh (
+                name varchar PRIMARY KEY,
+                refreshed_until timestamp,
+                refreshed_at timestamp DEFAULT now()
+            )
+        """,
+        # incremental refresh looks for rows written after its watermark
+        "CREATE INDEX IF NOT EXISTS matches_created_at_idx ON matches (created_at)",
+        "CREATE INDEX IF NOT EXISTS match_statistics_created_at_idx ON match_statistics (created_at)",
+    ]),
+    6: ('long format statistics', [
+        """
+            CREATE TABLE IF NOT EXISTS stat_definitions (
+                stat_id serial PRIMARY KEY,
+                name varchar NOT NULL UNIQUE,
+                polish_name varchar,
+                created_at timestamp DEFAULT now()
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS match_statistic_values (
+                match_id varchar NOT NULL REFERENCES matches (match_id) ON DELETE CASCADE,
+                stat_id integer NOT NULL REFERENCES stat_definitions (stat_id),
+                home_value double precision,
+                away_value double precision,
+                created_at timestamp DEFAULT now(),
+                PRIMARY KEY (match_id, stat_id)
+            )
+        """,
+        # loads of a few statistics read them by stat_id
+        "CREATE INDEX IF NOT EXISTS match_statistic_values_stat_idx ON match_statistic_values (stat_id, match_id)",
+        """
+            INSERT INTO stat_definitions (name, polish_name)
+            VALUES """ + ', '.join(
+            f"({_literal(name)}, {_literal(polish_name)})" for name, polish_name in stat_definitions()
+        ) + """
+            ON CONFLICT (name) DO NOTHING
+        """,
+        # rows already in match_statistics, one per statistic the match has
+        """
+            INSERT INTO match_statistic_values (match_id, stat_id, home_value, away_value)
+            SELECT ms.match_id, d.stat_id, v.home_value, v.away_value
+            FROM match_statistics ms
+            CROSS JOIN LATERAL (VALUES """ + ', '.join(
+            f"({_literal(name)}, ms.home_{name}, ms.away_{name})" for name, _ in stat_definitions()
+        ) + """) v (name, home_value, away_value)
+            JOIN stat_definitions d ON d.name = v.name
+            WHERE ms.match_id IS NOT NULL AND (v.home_value IS NOT NULL OR v.away_value IS NOT NULL)
+            ON CONFLICT (match_id, stat_id) DO NOTHING
+        """,
+    ]),
+    7: ('match updated_at', [
+        # created_at never moves on an upsert, incremental readers follow updated_at instead
+        "ALTER TABLE matches ADD COLUMN IF NOT EXISTS updated_at timestamp",
+        "UPDATE matches SET updated_at = created_at WHERE updated_at IS NULL",
+        "ALTER TABLE matches ALTER COLUMN updated_at SET DEFAULT now()",
+        "CREATE INDEX IF NOT EXISTS matches_updated_at_idx ON matches (updated_at)",
+    ]),
+}
+
+
+# name -> (query, params) of the queries run for every scraped match or prediction
+HOT_QUERIES = {
+    'check_match_by_teams': ("""
+        SELECT m.match_id FROM matches m
+        JOIN teams ht ON m.home_team_id = ht.team_id
+        JOIN teams at ON m.away_team_id = at.team_id
+        WHERE ht.name = %s AND at.name = %s AND m.date_time = %s
+    """, ('Legia Warszawa', 'Lech Poznań', '2024-08-18 17:30')),
+    'check_match_by_id': ("SELECT match_id FROM matches WHERE match_id = %s", ('KpW2Xq0e',)),
+    'team_by_name': ("SELECT team_id FROM teams WHERE name = %s", ('Legia Warszawa',)),
+    'referee_by_name': (
+        "SELECT referee_id FROM referees WHERE name = %s AND nationality = %s", ('Marciniak S.', 'Polska')
+    ),
+    'stadium_by_name': ("SELECT stadium_id FROM stadiums WHERE name = %s AND city = %s", ('Stadion Wojska Polskiego', 'Warszawa')),
+    'team_recent_form': ("""
+        SELECT match_id FROM matches
+        WHERE home_team_id = %s OR away_team_id = %s
+        ORDER BY date_time DESC
+        LIMIT 5
+    """, (1, 1)),
+    'team_current_form': ("SELECT * FROM team_form WHERE team_id = %s ORDER BY date_time DESC LIMIT 5", (1,)),
+    'statistics_by_match': ("SELECT * FROM match_statistics WHERE match_id = %s", ('KpW2Xq0e',)),
+}
+
+INDEX_SCANS = {'Index Scan', 'Index Only Scan', 'Bitmap Index Scan'}
+
+
+def ensure_migrations_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version integer PRIMARY KEY,
+            name varchar NOT NULL,
+            applied_at timestamp DEFAULT now()
+        )
+    """)
+
+
+def applied_versions(cur):
+    ensure_migrations_table(cur)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def pending_migrations(applied):
+    return [(version, *MIGRATIONS[version]) for version in sorted(MIGRATIONS) if version not in applied]
+
+
+def apply_migrations(conn, target=None):
+    """Apply every migration not recorded in schema_migrations, returns the applied versions"""
+    applied = []
+    with conn.cursor() as cur:
+        with conn.transaction():
+            # one migrator at a time, others wait and then find nothing left to do
+            cur.execute("SELECT pg_advisory_lock(hashtext('schema_migrations'))")
+        try:
+            with conn.transaction():
+                done = applied_versions(cur)
+            for version, name, statements in pending_migrations(done):
+                if target is not None and version > target:
+                    break
+                logger.info(f"Applying migration {version}: {name}")
+                with conn.transaction():
+                    for statement in statements:
+                        cur.execute(statement)
+                    cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                applied.append(version)
+        finally:
+            with conn.transaction():
+                cur.execute("SELECT pg_advisory_unlock(hashtext('schema_migrations'))")
+    logger.info(f"Schema up to date, applied {applied or 'nothing'}")
+    return applied
+
+
+def plan_scans(plan):
+    """(node type, relation) of every scan node in an EXPLAIN (FORMAT JSON) plan"""
+    scans = []
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        if 'Scan' in node.get('Node Type', ''):
+            scans.append((node['Node Type'], node.get('Relation Name') or node.get('Index Name')))
+        nodes.extend(node.get('Plans', []))
+    return scans
+
+
+def uses_indexes(scans):
+    """True when no table of the plan is read with a sequential scan"""
+    return bool(scans) and all(node_type != 'Seq Scan' for node_type, _ in scans)
+
+
+def explain_hot_queries(conn):
+    """{query name: (uses indexes, scans)} for every hot query
+
+    Small tables are cheaper to read whole, so sequential scans are disabled for
+    the check, a query still planned with one has no index it could use.
+    """
+    results = {}
+    with conn.cursor() as cur:
+        with conn.transaction():
+            cur.execute("SET LOCAL enable_seqscan = off")
+            for name, (query, params) in HOT_QUERIES.items():
+                cur.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+                plan = cur.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scans = plan_scans(plan[0]['Plan'])
+                results[name] = (uses_indexes(scans), scans)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the database schema")
+    commands = parser.add_subparsers(dest='command', required=True)
+    apply_parser = commands.add_parser('apply', help="apply pending migrations")
+    apply_parser.add_argument('--target', type=int, help="stop after this version")
+    commands.add_parser('status', help="list applied and pending migrations")
+    commands.add_parser('explain', help="check that the hot queries are planned with index scans")
+    args = parser.parse_args()
+
+    with connection() as conn:
+        if args.command == 'apply':
+            apply_migrations(conn, target=args.target)
+
+        elif args.command == 'status':
+            with conn.cursor() as cur:
+                applied = applied_versions(cur)
+            for version in sorted(MIGRATIONS):
+                state = 'applied' if version in applied else 'pending'
+                print(f"{version:>4} {state:>8}  {MIGRATIONS[version][0]}")
+
+        elif args.command == 'explain':
+            results = explain_hot_queries(conn)
+            for name, (ok, scans) in results.items():
+                print(f"{'ok' if ok else 'SEQ':>4}  {name}: {', '.join(f'{node} on {relation}' for node, relation in scans)}")
+            if not all(ok for ok, _ in results.values()):
+                raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
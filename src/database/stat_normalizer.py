@@ -0,0 +1,64 @@
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+NUMBER = r'-?\d+(?:[.,]\d+)?'
+PERCENT_RE = re.compile(rf'({NUMBER})\s*%')
+PLAIN_RE = re.compile(rf'^\s*({NUMBER})\s*$')
+FIRST_NUMBER_RE = re.compile(NUMBER)
+FRACTION_RE = re.compile(r'(\d+)\s*/\s*(\d+)')
+
+# statistics scraped like '84% (412/490)', stored as percent plus _completed and _attempted columns
+RATIO_STATISTICS = ['passes', 'long_balls', 'crosses', 'tackle_success', 'passes_into_final_third']
+
+
+def _number(text):
+    return float(text.replace(',', '.'))
+
+
+def stat_number(value):
+    """Numeric value of a scraped statistic, the percent when it has one
+
+    '58%' -> 58.0, '1.84' -> 1.84, '84% (412/490)' and '412/490 (84%)' -> 84.0,
+    None, '' and '-' -> None. Numbers pass through as floats.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value)
+    for pattern in (PERCENT_RE, PLAIN_RE, FIRST_NUMBER_RE):
+        match = pattern.search(value)
+        if match:
+            return _number(match.group(1) if pattern.groups else match.group(0))
+    return None
+
+
+def stat_fraction(value):
+    """(completed, attempted) of values like '84% (412/490)', (None, None) without a fraction"""
+    if value is None or isinstance(value, (int, float)):
+        return None, None
+    match = FRACTION_RE.search(str(value))
+    if not match:
+        return None, None
+    return float(match.group(1)), float(match.group(2))
+
+
+def normalize_statistics(stats_dict):
+    """Typed copy of {'home_<stat>': raw value}, ratio statistics get _completed and _attempted columns"""
+    normalized = {}
+    for column, value in stats_dict.items():
+        normalized[column] = stat_number(value)
+        # only ratio statistics have columns for the fraction
+        if column.split('_', 1)[1] in RATIO_STATISTICS:
+            completed, attempted = stat_fraction(value)
+            normalized[f'{column}_completed'] = completed
+            normalized[f'{column}_attempted'] = attempted
+        if value not in (None, '', '-') and normalized[column] is None:
+            logger.debug(f"Statistic {column} has no number in {value!r}")
+    return normalized
@@ -0,0 +1,178 @@
+import argparse
+import logging
+
+from .db_connect import connection, DB_STATISTICS_LAYOUT
+from .long_statistics import LongStatistics
+from .watermark import change_watermark, change_sources, changed_condition
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+# matches in a rolling window, same as n_games of calculate_rolling_stats
+FORM_GAMES = 5
+
+# team_form column -> expression of a finished match, seen from one side, missing statistics
+# get the same defaults as calculate_rolling_stats
+SIDE_VALUES = {
+    'goals_for': '{side}_score',
+    'goals_against': '{other}_score',
+    'xg': 'coalesce(ms.{side}_xg, 0)',
+    'shots': 'coalesce(ms.{side}_total_shots, 10)',
+    'possession': 'coalesce(ms.{side}_ball_possession, 50)',
+    'corners': 'coalesce(ms.{side}_corner_kicks, 5)',
+    'fouls': 'coalesce(ms.{side}_fouls, 12)',
+    'yellow_cards': 'coalesce(ms.{side}_yellow_cards, 2)',
+    'shots_on_target': 'coalesce(ms.{side}_shots_on_target, 4)',
+}
+
+# statistics SIDE_VALUES reads, the long layout pivots only these
+FORM_STATISTICS = ['xg', 'total_shots', 'ball_possession', 'corner_kicks', 'fouls', 'yellow_cards', 'shots_on_target']
+
+# rolling average -> averaged team_form column
+AVERAGES = {
+    'avg_goals': 'goals_for',
+    'avg_conceded': 'goals_against',
+    'avg_xg': 'xg',
+    'avg_shots': 'shots',
+    'avg_possession': 'possession',
+    'win_rate': 'win',
+    'ppg': 'points',
+    'avg_corners': 'corners',
+    'avg_fouls': 'fouls',
+    'avg_yellow': 'yellow_cards',
+    'avg_shots_on_target': 'shots_on_target',
+}
+
+
+def statistics_source(layout=DB_STATISTICS_LAYOUT):
+    """FROM item with the home_/away_ columns of FORM_STATISTICS, pivoted from the long rows when the layout writes them"""
+    if LongStatistics.writes_long(layout):
+        return f"({LongStatistics.pivot_query(FORM_STATISTICS)})"
+    return "match_statistics"
+
+
+def _side_select(side, other, layout):
+    values = ', '.join(f"{expression.format(side=side, other=other)} AS {column}" for column, expression in SIDE_VALUES.items())
+    return f"""
+        SELECT m.{side}_team_id AS team_id, m.match_id, m.date_time, {side == 'home'} AS is_home, {values}
+        FROM matches m
+        LEFT JOIN {statistics_source(layout)} ms ON ms.match_id = m.match_id
+        WHERE m.home_score IS NOT NULL AND m.away_score IS NOT NULL
+          AND m.{side}_team_id IN (SELECT team_id FROM affected)
+    """
+
+
+def refresh_query(games=FORM_GAMES, layout=DB_STATISTICS_LAYOUT):
+    """Upsert team_form rows of every team with a match changed after %(since)s, from that match on"""
+    columns = ['team_id', 'match_id', 'date_time', 'is_home', *SIDE_VALUES, 'points', 'win', 'games_played', *AVERAGES]
+    averages = ', '.join(f"avg({column}) OVER previous AS {name}" for name, column in AVERAGES.items())
+    updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in columns[2:])
+    return f"""
+        WITH changed AS (
+            SELECT m.home_team_id, m.away_team_id, m.date_time
+            FROM matches m
+            WHERE {changed_condition(layout)}
+        ),
+        affected AS (
+            SELECT team_id, min(date_time) AS first_changed
+            FROM (
+                SELECT home_team_id AS team_id, date_time FROM changed
+                UNION ALL
+                SELECT away_team_id, date_time FROM changed
+            ) c
+            WHERE team_id IS NOT NULL
+            GROUP BY team_id
+        ),
+        scored AS (
+            SELECT t.*,
+                CASE WHEN goals_for > goals_against THEN 3 WHEN goals_for = goals_against THEN 1 ELSE 0 END AS points,
+                CASE WHEN goals_for > goals_against THEN 1 ELSE 0 END AS win
+            FROM ({_side_select('home', 'away', layout)} UNION ALL {_side_select('away', 'home', layout)}) t
+        ),
+        windowed AS (
+            SELECT s.*,
+                count(*) OVER (
+                    PARTITION BY team_id ORDER BY date_time, match_id
+                    ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                ) AS games_played,
+                {averages}
+            FROM scored s
+            WINDOW previous AS (
+                PARTITION BY team_id ORDER BY date_time, match_id
+                ROWS BETWEEN {games} PRECEDING AND 1 PRECEDING
+            )
+        )
+        INSERT INTO team_form ({', '.join(columns)})
+        SELECT {', '.join(f'w.{column}' for column in columns)}
+        FROM windowed w
+        JOIN affected a ON a.team_id = w.team_id
+        -- earlier rows keep their window, a late match only moves the ones after it
+        WHERE w.date_time >= a.first_changed
+        ON CONFLICT (team_id, match_id) DO UPDATE SET {updates}, refreshed_at = now()
+    """
+
+
+def refresh(cur, full=False, layout=DB_STATISTICS_LAYOUT):
+    """Bring team_form up to date with matches, returns number of rows written
+
+    Only teams with matches inserted, re-scraped or given new statistics since the
+    last refresh are recomputed, and only from their earliest changed match on.
+    The watermark stays DB_WATERMARK_LAG behind the newest change, see change_watermark,
+    so the rows of the last moments are recomputed once more by the next refresh.
+    Statistics are read from the tables `layout` writes, pivoted from the long rows
+    when it writes them.
+    """
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext('team_form'))")
+    cur.execute("SELECT refreshed_until FROM feature_refresh WHERE name = 'team_form'")
+    row = cur.fetchone()
+    since = '-infinity' if full or row is None or row[0] is None else row[0]
+
+    newest, until = change_watermark(cur, change_sources(layout))
+    if newest is None or (since != '-infinity' and newest <= since):
+        return 0
+
+    if full:
+        cur.execute("TRUNCATE team_form")
+    cur.execute(refresh_query(layout=layout), {'since': since})
+    written = cur.rowcount
+    cur.execute("""
+        INSERT INTO feature_refresh (name, refreshed_until) VALUES ('team_form', %s)
+        ON CONFLICT (name) DO UPDATE SET refreshed_until = EXCLUDED.refreshed_until, refreshed_at = now()
+    """, (until,))
+    logger.info(f"Team form refreshed, {written} rows written for matches after {since}")
+    return written
+
+
+def changed_since_refresh(cur, layout=DB_STATISTICS_LAYOUT):
+    """True when a match or its statistics were written after the last refresh started, reads only
+
+    Cheaper than `refresh`, which takes a lock and recomputes the rows of the lag window
+    every time. Rows committed late with an older timestamp wait for the next refresh.
+    """
+    cur.execute("SELECT refreshed_at FROM feature_refresh WHERE name = 'team_form'")
+    row = cur.fetchone()
+    newest, _ = change_watermark(cur, change_sources(layout))
+    return newest is not None and (row is None or newest > row[0])
+
+
+def refresh_team_form(full=False, if_changed=False):
+    """Refresh in its own transaction, with `if_changed` only when changed_since_refresh"""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            if if_changed and not full and not changed_since_refresh(cur):
+                return 0
+            return refresh(cur, full=full)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the rolling team form table")
+    parser.add_argument('--full', action='store_true', help="recompute every team instead of only changed ones")
+    args = parser.parse_args()
+    refresh_team_form(full=args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import logging
+
+from .db_connect import DB_STATISTICS_LAYOUT, DB_WATERMARK_LAG
+from .long_statistics import LongStatistics
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def change_watermark(cur, sources, lag=DB_WATERMARK_LAG):
+    """(newest change, safe watermark) over `sources`, (table, timestamp column) pairs
+
+    Rows get now() of the transaction writing them, which is when it started, and
+    are seen only after it commits. A transaction still running can therefore commit
+    rows older than the newest one visible now. The safe watermark stays `lag`
+    seconds behind the database clock, so readers which continue after it read the
+    last rows again instead of missing late commits. Both are None without rows.
+    """
+    newest = ', '.join(f"(SELECT max({column}) FROM {table})" for table, column in sources)
+    cur.execute(f"SELECT greatest({newest}), localtimestamp - make_interval(secs => %s)", (lag,))
+    newest, horizon = cur.fetchone()
+    if newest is None:
+        return None, None
+    return newest, min(newest, horizon)
+
+
+def statistics_tables(layout=DB_STATISTICS_LAYOUT):
+    """Statistics tables the layout writes, each has match_id and created_at"""
+    tables = []
+    if LongStatistics.writes_wide(layout):
+        tables.append('match_statistics')
+    if LongStatistics.writes_long(layout):
+        tables.append('match_statistic_values')
+    return tables
+
+
+def change_sources(layout=DB_STATISTICS_LAYOUT):
+    """Timestamps which move when a match or its statistics change
+
+    The upsert of a re-scraped match sets updated_at and its statistics rows are
+    written again.
+    """
+    return [('matches', 'updated_at')] + [(table, 'created_at') for table in statistics_tables(layout)]
+
+
+def changed_condition(layout=DB_STATISTICS_LAYOUT):
+    """WHERE condition on matches m, true when the match or its statistics changed after %(since)s"""
+    statistics = ''.join(
+        f" OR EXISTS (SELECT 1 FROM {table} s WHERE s.match_id = m.match_id AND s.created_at > %(since)s)"
+        for table in statistics_tables(layout)
+    )
+    return f"(m.updated_at > %(since)s{statistics})"
@@ -0,0 +1,193 @@
+import logging
+import struct
+
+import numpy as np
+import pandas as pd
+
+from ..database.db_connect import connection
+from .data_loading import statistics_source
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+# columns read by calculate_rolling_stats
+FEATURE_COLUMNS = [
+    'match_id', 'home_team_id', 'away_team_id', 'home_score', 'away_score', 'date_time',
+    'home_xg', 'away_xg', 'home_total_shots', 'away_total_shots',
+    'home_ball_possession', 'away_ball_possession', 'home_shots_on_target', 'away_shots_on_target',
+    'home_corner_kicks', 'away_corner_kicks', 'home_fouls', 'away_fouls',
+    'home_yellow_cards', 'away_yellow_cards',
+]
+
+# column -> sql expression of the matches side of the query, everything else is a statistic
+MATCH_COLUMNS = {
+    'home_team_id': 'm.home_team_id',
+    'away_team_id': 'm.away_team_id',
+    'home_score': 'm.home_score',
+    'away_score': 'm.away_score',
+    'attendance': 'm.attendance',
+    # seconds since epoch, turned back into datetime64 after decoding
+    'date_time': 'extract(epoch FROM m.date_time)',
+}
+
+# integer columns of matches, the rest of the numbers are read as float8
+INTEGER_COLUMNS = {'home_team_id', 'away_team_id', 'home_score', 'away_score', 'attendance'}
+
+# stands for NULL in int4 fields, masked out again after decoding
+INT4_NULL = np.iinfo(np.int32).min
+
+# binary COPY type -> (numpy field, sql cast, NULL replacement)
+FIELD_TYPES = {
+    'int4': ('>i4', 'int4', str(INT4_NULL)),
+    'float8': ('>f8', 'float8', "'NaN'"),
+}
+
+# columns that are no numbers, read with a text COPY of the same snapshot
+TEXT_COLUMNS = {
+    'match_id': 'm.match_id',
+    'home_team_name': 'ht.name',
+    'away_team_name': 'at.name',
+}
+
+COPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def field_type(column):
+    return 'int4' if column in INTEGER_COLUMNS else 'float8'
+
+
+def row_dtype(types):
+    """Big endian layout of a binary COPY tuple with fields of the given types"""
+    fields = [('count', '>i2')]
+    for i, name in enumerate(types):
+        fields += [(f'len{i}', '>i4'), (f'v{i}', FIELD_TYPES[name][0])]
+    return np.dtype(fields)
+
+
+def header_size(buffer):
+    """Length of the binary COPY header at the start of buffer, None until it is complete"""
+    if len(buffer) < 19:
+        return None
+    if bytes(buffer[:11]) != COPY_SIGNATURE:
+        raise ValueError("Not a binary COPY stream")
+    extension = struct.unpack('>i', bytes(buffer[15:19]))[0]
+    if len(buffer) < 19 + extension:
+        return None
+    return 19 + extension
+
+
+def decode_rows(buffer, types):
+    """One native array per column from whole tuples of buffer, plus the bytes consumed
+
+    Every field has a fixed size type and is never NULL, so all tuples have the same
+    size and are read with one np.frombuffer call instead of one Python object per cell.
+    """
+    dtype = row_dtype(types)
+    # the two byte trailer at the end of the stream is never a whole tuple
+    rows = len(buffer) // dtype.itemsize
+    records = np.frombuffer(buffer, dtype=dtype, count=rows)
+    sizes = [dtype[f'v{i}'].itemsize for i in range(len(types))]
+    if (records['count'] != len(types)).any() or any((records[f'len{i}'] != size).any() for i, size in enumerate(sizes)):
+        raise ValueError(f"Unexpected binary COPY tuple, expected non NULL fields of {types}")
+
+    values = [records[f'v{i}'].astype(dtype[f'v{i}'].newbyteorder('=')) for i in range(len(types))]
+    return values, rows * dtype.itemsize
+
+
+def _from_clause(statistics):
+    return f"""
+        FROM matches m
+        LEFT JOIN {statistics_source(statistics)} ms ON m.match_id = ms.match_id
+        LEFT JOIN teams ht ON m.home_team_id = ht.team_id
+        LEFT JOIN teams at ON m.away_team_id = at.team_id
+    """
+
+
+def copy_query(numeric_columns, statistics):
+    # NaN or INT4_NULL instead of NULL keeps every tuple the same size
+    expressions = []
+    for column in numeric_columns:
+        _, cast, null = FIELD_TYPES[field_type(column)]
+        expressions.append(f"coalesce(CAST({MATCH_COLUMNS.get(column, f'ms.{column}')} AS {cast}), {null})")
+    expressions = ', '.join(expressions)
+    return f"COPY (SELECT {expressions} {_from_clause(statistics)} ORDER BY m.date_time, m.match_id) TO STDOUT (FORMAT BINARY)"
+
+
+def _statistics(columns):
+    names = {column.split('_', 1)[1] for column in columns if column not in MATCH_COLUMNS and column not in TEXT_COLUMNS}
+    return sorted(names)
+
+
+def iter_chunks(cur, numeric_columns, statistics, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield lists of column arrays of at most chunk_size rows straight from a binary COPY"""
+    types = [field_type(column) for column in numeric_columns]
+    chunk_bytes = row_dtype(types).itemsize * chunk_size
+    buffer = bytearray()
+    header = None
+
+    with cur.copy(copy_query(numeric_columns, statistics)) as copy:
+        for data in copy:
+            buffer += data
+            if header is None:
+                header = header_size(buffer)
+                if header is None:
+                    continue
+                del buffer[:header]
+            if len(buffer) >= chunk_bytes:
+                values, used = decode_rows(bytes(buffer[:chunk_bytes]), types)
+                del buffer[:used]
+                yield values
+
+    if buffer:
+        values, used = decode_rows(bytes(buffer), types)
+        if len(values[0]):
+            yield values
+
+
+def load_columns(columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Match history as a frame of typed columns, only `columns` are read
+
+    Numbers come in through COPY ... (FORMAT BINARY) and are decoded in chunks of
+    chunk_size rows, integer match columns as nullable Int32 and statistics as float64.
+    Text columns like match_id come through a text COPY of the same snapshot.
+    """
+    columns = list(columns or FEATURE_COLUMNS)
+    numeric_columns = [column for column in columns if column not in TEXT_COLUMNS]
+    text_columns = [column for column in columns if column in TEXT_COLUMNS]
+    statistics = _statistics(numeric_columns)
+
+    chunks = []
+    texts = []
+    with connection() as conn:
+        with conn.cursor() as cur:
+            # both copies have to see the same rows
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            if numeric_columns:
+                chunks = list(iter_chunks(cur, numeric_columns, statistics, chunk_size))
+            if text_columns:
+                expressions = ', '.join(TEXT_COLUMNS[column] for column in text_columns)
+                query = f"COPY (SELECT {expressions} {_from_clause(statistics)} ORDER BY m.date_time, m.match_id) TO STDOUT"
+                with cur.copy(query) as copy:
+                    texts = list(copy.rows())
+
+    data = {}
+    for i, column in enumerate(numeric_columns):
+        if chunks:
+            values = np.concatenate([chunk[i] for chunk in chunks])
+        else:
+            values = np.empty(0, dtype=np.int32 if field_type(column) == 'int4' else np.float64)
+        if field_type(column) == 'int4':
+            values = pd.arrays.IntegerArray(values, values == INT4_NULL)
+        data[column] = values
+    if 'date_time' in data:
+        data['date_time'] = pd.to_datetime(data['date_time'], unit='s')
+    for i, column in enumerate(text_columns):
+        data[column] = np.array([row[i] for row in texts], dtype=object)
+
+    df = pd.DataFrame({column: data[column] for column in columns})
+    logger.info(f"Loaded {len(df)} matches, {len(columns)} columns in {len(chunks)} chunks")
+    return df
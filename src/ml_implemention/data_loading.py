@@ -1,6 +1,8 @@
 import pandas as pd
-from psycopg import connect
-from ..database.db_connect import CONNECTION_INFO
+from ..database.db_connect import connection, DB_STATISTICS_LAYOUT
+from ..database.long_statistics import LongStatistics
+from ..database.team_form import refresh, AVERAGES
+from .match_cache import match_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,8 +11,25 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-def load_match_data():
-    query = """
+def statistics_source(statistics=None, layout=DB_STATISTICS_LAYOUT):
+    """FROM item with match_id and home_/away_ statistic columns, only the named statistics when given"""
+    if statistics is not None and not statistics:
+        return "(SELECT match_id FROM matches WHERE false)"
+    if LongStatistics.writes_long(layout):
+        if statistics is None:
+            with connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT name FROM stat_definitions ORDER BY stat_id")
+                    statistics = [row[0] for row in cur.fetchall()]
+        return f"({LongStatistics.pivot_query(statistics)})"
+    if statistics is None:
+        return "match_statistics"
+    columns = ', '.join(f"{side}_{name}" for name in statistics for side in ('home', 'away'))
+    return f"(SELECT match_id, {columns} FROM match_statistics)"
+
+
+def match_data_query(statistics=None, where=''):
+    return f"""
     SELECT 
         m.match_id,
         m.home_team_id,
@@ -23,17 +42,173 @@ def load_match_data():
         m.attendance,
         ms.*
     FROM matches m
-    LEFT JOIN match_statistics ms ON m.match_id = ms.match_id
+    LEFT JOIN {statistics_source(statistics)} ms ON m.match_id = ms.match_id
     LEFT JOIN teams ht ON m.home_team_id = ht.team_id
     LEFT JOIN teams at ON m.away_team_id = at.team_id
+    {where}
     ORDER BY m.date_time
     """
+
+
+def load_match_data(statistics=None, source='postgres', columns=None, chunk_size=None, cache=True):
+    """Matches with team names and statistics, `statistics` limits the statistics to those names
+
+    Long format statistics are pivoted to the same home_<stat>/away_<stat> columns.
+    With source='parquet' the frame comes from the snapshot written by parquet_snapshot,
+    reading only `columns` when given, and no database is needed.
+    source='copy' streams `columns` (by default the ones calculate_rolling_stats uses)
+    with a binary COPY decoded into numpy arrays `chunk_size` rows at a time.
+    Database loads are cached in the process until new matches or statistics land,
+    pass cache=False to always read the tables.
+    """
+    # both modules build on this one, so they are imported here
+    if source == 'parquet':
+        from .parquet_snapshot import read_snapshot
+        return read_snapshot(columns=columns)
+    if source not in ('postgres', 'copy'):
+        raise ValueError(f"Unknown match data source: {source}")
+
+    def load():
+        if source == 'copy':
+            from .copy_loader import load_columns, DEFAULT_CHUNK_SIZE
+            return load_columns(columns, chunk_size=chunk_size or DEFAULT_CHUNK_SIZE)
+        return _read_match_data(statistics, columns)
+
+    if not cache:
+        return load()
+    key = (
+        source,
+        None if statistics is None else tuple(statistics),
+        None if columns is None else tuple(columns),
+    )
+    return match_cache.get(key, load)
+
+
+def _read_match_data(statistics, columns):
+    query = match_data_query(statistics)
     
     try:
-        with connect(CONNECTION_INFO) as conn:
+        with connection() as conn:
             df = pd.read_sql_query(query, conn)
+            if columns:
+                # ms.* repeats match_id
+                df = df.loc[:, ~df.columns.duplicated()][columns]
             return df
           
     except Exception as e:
         logger.error(f"Error loading data: {e}")
         raise
+
+
+# value of a rolling average before a team has played, as in calculate_rolling_stats
+FORM_DEFAULTS = {
+    'avg_goals': 1.0,
+    'avg_conceded': 1.0,
+    'avg_xg': 1.0,
+    'avg_shots': 10.0,
+    'avg_possession': 50.0,
+    'win_rate': 0.33,
+    'ppg': 1.0,
+    'avg_corners': 5.0,
+    'avg_fouls': 12.0,
+    'avg_yellow': 2.0,
+    'avg_shots_on_target': 4.0,
+}
+
+# feature column suffix -> team_form column
+FORM_FEATURES = {
+    'avg_goals_last_5': 'avg_goals',
+    'avg_conceded_last_5': 'avg_conceded',
+    'avg_xg_last_5': 'avg_xg',
+    'avg_shots_last_5': 'avg_shots',
+    'avg_possession_last_5': 'avg_possession',
+    'win_rate_last_5': 'win_rate',
+    'ppg_last_5': 'ppg',
+    'avg_corners_last_5': 'avg_corners',
+    'avg_fouls_last_5': 'avg_fouls',
+    'avg_yellow_last_5': 'avg_yellow',
+    'avg_shots_on_target_last_5': 'avg_shots_on_target',
+}
+
+# targets of the statistics models -> team_form column of the match itself
+FORM_TARGETS = {
+    'corner_kicks': 'corners',
+    'fouls': 'fouls',
+    'yellow_cards': 'yellow_cards',
+    'ball_possession': 'possession',
+    'total_shots': 'shots',
+    'shots_on_target': 'shots_on_target',
+}
+
+
+def _form(alias, column):
+    if column in FORM_DEFAULTS:
+        return f"coalesce({alias}.{column}, {FORM_DEFAULTS[column]})"
+    return f"{alias}.{column}"
+
+
+def form_features_query():
+    """Same columns as calculate_rolling_stats, from the team_form table"""
+    columns = []
+    for side, alias in (('home', 'h'), ('away', 'a')):
+        columns += [f"{_form(alias, column)} AS {side}_{feature}" for feature, column in FORM_FEATURES.items()]
+        columns.append(f"{alias}.games_played AS {side}_games_played")
+        columns += [f"{alias}.{column} AS {side}_{target}" for target, column in FORM_TARGETS.items()]
+    return f"""
+    SELECT
+        m.match_id,
+        m.date_time,
+        m.home_score,
+        m.away_score,
+        {', '.join(columns)},
+        {_form('h', 'win_rate')} - {_form('a', 'win_rate')} AS form_diff,
+        {_form('h', 'avg_xg')} - {_form('a', 'avg_xg')} AS xg_diff,
+        {_form('h', 'avg_goals')} - {_form('a', 'avg_goals')} AS goals_diff
+    FROM matches m
+    JOIN team_form h ON h.match_id = m.match_id AND h.is_home
+    JOIN team_form a ON a.match_id = m.match_id AND NOT a.is_home
+    ORDER BY m.date_time
+    """
+
+
+def load_form_features():
+    """Same frame as calculate_rolling_stats, read from the team_form table
+
+    The table is refreshed first, which only recomputes teams with new matches.
+    """
+    try:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                refresh(cur)
+            return pd.read_sql_query(form_features_query(), conn)
+
+    except Exception as e:
+        logger.error(f"Error loading team form: {e}")
+        raise
+
+
+def load_team_form(team_name, n_games=5):
+    """Averages over the last n_games of a team from team_form, None for an unknown team"""
+    averages = ', '.join(f"avg({column}) AS {name}" for name, column in AVERAGES.items())
+    query = f"""
+    SELECT count(*) AS games_played, {averages}
+    FROM (
+        SELECT tf.*
+        FROM team_form tf
+        JOIN teams t ON t.team_id = tf.team_id
+        WHERE t.name = %s
+        ORDER BY tf.date_time DESC
+        LIMIT %s
+    ) recent
+    """
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, (team_name, n_games))
+            row = cur.fetchone()
+            names = [column.name for column in cur.description]
+
+    form = dict(zip(names, row))
+    if not form['games_played']:
+        return None
+    return {name: float(value) if name != 'games_played' else int(value) for name, value in form.items()}
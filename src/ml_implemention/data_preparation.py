@@ -3,6 +3,8 @@ import pandas as pd
 import numpy as np
 import logging
 
+from ..database.stat_normalizer import stat_number
+
 logger = logging.getLogger(__name__)
 
 logging.basicConfig(
@@ -12,11 +14,23 @@ logging.basicConfig(
 
 def clean_numeric_column(series):
     
+    # statistics are numeric since schema migration 4, text is only left in older databases
     if series.dtype == 'object':  
-        series = series.astype(str).str.replace('%', '')
-        series = pd.to_numeric(series, errors='coerce')
+        series = pd.to_numeric(series.map(stat_number), errors='coerce')
     return series
 
+
+def numeric_statistics(df):
+    """Statistic columns as numbers, parsed once per column instead of once per row"""
+    columns = [
+        column for column in df.columns
+        if column.startswith(('home_', 'away_')) and column not in (
+            'home_team_id', 'away_team_id', 'home_team_name', 'away_team_name'
+        )
+    ]
+    df[columns] = df[columns].apply(clean_numeric_column)
+    return df
+
 @staticmethod
 def safe_float(val, default):
     if val is None or pd.isna(val):
@@ -29,13 +43,17 @@ def safe_float(val, default):
 def calculate_rolling_stats(df, n_games = 5):
     # calculate moving average
     
-    df = df.sort_values('date_time').copy()
+    df = numeric_statistics(df.sort_values('date_time').copy())
     
     team_history = {}
     
     result_rows = []
     
     for idx, row in df.iterrows():
+        # matches not played yet have no result, team_form skips them too
+        if pd.isna(row['home_score']) or pd.isna(row['away_score']):
+            continue
+
         home_id = row['home_team_id']
         away_id = row['away_team_id']
     
@@ -163,14 +181,14 @@ def calculate_rolling_stats(df, n_games = 5):
             home_points, away_points = 1, 1
             away_win, home_win = 0, 0
 
-        home_xg = clean_numeric_column(pd.Series([row.get('home_xg', 0)]))[0] or 0
-        away_xg = clean_numeric_column(pd.Series([row.get('away_xg', 0)]))[0] or 0
-        home_shots = clean_numeric_column(pd.Series([row.get('home_total_shots', 10)]))[0] or 10
-        away_shots = clean_numeric_column(pd.Series([row.get('away_total_shots', 10)]))[0] or 10
-        home_poss = clean_numeric_column(pd.Series([row.get('home_ball_possession', 50)]))[0] or 50
-        away_poss = clean_numeric_column(pd.Series([row.get('away_ball_possession', 50)]))[0] or 50
-        home_shots_target = clean_numeric_column(pd.Series([row.get('home_shots_on_target', 4)]))[0] or 4
-        away_shots_target = clean_numeric_column(pd.Series([row.get('away_shots_on_target', 4)]))[0] or 4
+        home_xg = safe_float(row.get('home_xg'), 0)
+        away_xg = safe_float(row.get('away_xg'), 0)
+        home_shots = safe_float(row.get('home_total_shots'), 10)
+        away_shots = safe_float(row.get('away_total_shots'), 10)
+        home_poss = safe_float(row.get('home_ball_possession'), 50)
+        away_poss = safe_float(row.get('away_ball_possession'), 50)
+        home_shots_target = safe_float(row.get('home_shots_on_target'), 4)
+        away_shots_target = safe_float(row.get('away_shots_on_target'), 4)
         
         team_history[home_id].append({
             'goals_for': row['home_score'],
@@ -188,7 +206,7 @@ def calculate_rolling_stats(df, n_games = 5):
         
         team_history[away_id].append({
             'goals_for': row['away_score'],
-            'goals_against': row['away_score'],
+            'goals_against': row['home_score'],
             'xg': away_xg,
             'shots': away_shots,
             'possession': away_poss,
@@ -202,10 +220,11 @@ def calculate_rolling_stats(df, n_games = 5):
         
     return pd.DataFrame(result_rows)
 
-def prepare_data(df, min_games = 3, n_games = 5):
+def prepare_data(df, min_games = 3, n_games = 5, features_df = None):
     
-    # calculate rolling stats
-    features_df = calculate_rolling_stats(df, n_games = n_games)
+    # calculate rolling stats, unless they come precomputed from the team_form table
+    if features_df is None:
+        features_df = calculate_rolling_stats(df, n_games = n_games)
     
     # drop out teams where are not avilable 5 matches in past
     features_df = features_df[features_df['home_games_played'] >= min_games]
@@ -237,9 +256,10 @@ def prepare_data(df, min_games = 3, n_games = 5):
     return X, y, feature_columns
 
 
-def prepare_data_stats(df, min_games = 3, n_games = 5):
+def prepare_data_stats(df, min_games = 3, n_games = 5, features_df = None):
     
-    features_df = calculate_rolling_stats(df, n_games = n_games)
+    if features_df is None:
+        features_df = calculate_rolling_stats(df, n_games = n_games)
     
     features_df = features_df[features_df['home_games_played'] >= min_games]
     features_df = features_df[features_df['away_games_played'] >= min_games]
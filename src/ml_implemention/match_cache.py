@@ -0,0 +1,74 @@
+import logging
+import threading
+
+from ..database.db_connect import connection, DB_STATISTICS_LAYOUT
+from ..database.long_statistics import LongStatistics
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def watermark_query(layout=DB_STATISTICS_LAYOUT):
+    """Row count, newest updated_at of matches and newest created_at of the statistics tables the loads read
+
+    The match upsert moves updated_at and ingestion replaces the statistics rows of a
+    re-scraped match, so both move when a match is scraped again.
+    """
+    tables = []
+    if LongStatistics.writes_wide(layout):
+        tables.append('match_statistics')
+    if LongStatistics.writes_long(layout):
+        tables.append('match_statistic_values')
+    statistics = ', '.join(f"(SELECT max(created_at) FROM {table})" for table in tables)
+    return f"SELECT count(*), max(updated_at), greatest({statistics}) FROM matches"
+
+
+class MatchDataCache:
+    """Loaded match frames kept in memory until new data lands in the database
+
+    Every lookup costs one watermark query, a frame is loaded again only when the
+    watermark moved since it was cached. Callers get a copy, so changing the frame
+    never changes the cached one.
+    """
+
+    def __init__(self):
+        self.frames = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def watermark(self):
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(watermark_query())
+                return cur.fetchone()
+
+    def get(self, key, load):
+        """Frame cached under key, `load()` is called when there is none for the current watermark"""
+        watermark = self.watermark()
+        with self._lock:
+            cached = self.frames.get(key)
+            if cached is not None and cached[0] == watermark:
+                self.hits += 1
+                return cached[1].copy()
+            self.misses += 1
+
+        # read after the watermark, data landing meanwhile only makes the next lookup reload
+        df = load()
+        with self._lock:
+            self.frames[key] = (watermark, df)
+        logger.info(f"Match data cache miss for {key}, {len(df)} rows loaded at watermark {watermark}")
+        return df.copy()
+
+    def invalidate(self):
+        with self._lock:
+            self.frames = {}
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'frames': len(self.frames)}
+
+
+match_cache = MatchDataCache()
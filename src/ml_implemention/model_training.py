@@ -2,8 +2,8 @@ from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, classification_report, mean_absolute_error
 
-from .data_preparation import prepare_data, prepare_data_stats
-from .data_loading import load_match_data 
+from .data_preparation import prepare_data, prepare_data_stats, calculate_rolling_stats
+from .data_loading import load_form_features, load_match_data
 
 import joblib
 import os
@@ -163,14 +163,20 @@ class MatchPredictor:
     def has_stats_models(self):
         return len(self.stats_models) > 0
     
-    def train_models(self):
+    def train_models(self, source='postgres'):
         
-        df = load_match_data()
-
-        X, y, feature_columns = prepare_data(df)
+        if source == 'parquet':
+            # offline training from the snapshot, rolling features are computed here
+            df = load_match_data(source='parquet')
+            features_df = calculate_rolling_stats(df)
+        else:
+            # rolling features are computed in the database, only new matches are added on each run
+            features_df = load_form_features()
+
+        X, y, feature_columns = prepare_data(None, features_df=features_df)
         self.train(X, y, feature_columns)
         
-        X_stats, targets, stats_features = prepare_data_stats(df)
+        X_stats, targets, stats_features = prepare_data_stats(None, features_df=features_df)
         self.train_stats(X_stats, targets, stats_features)
         
         self.save()
\ No newline at end of file
@@ -0,0 +1,154 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+from ..database.db_connect import connection, PARQUET_SNAPSHOT_DIR
+from ..database.watermark import change_watermark, change_sources, changed_condition
+from .data_loading import match_data_query
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+MANIFEST = '_manifest.json'
+
+
+def require_pyarrow():
+    if pq is None:
+        raise RuntimeError("pyarrow is needed for parquet snapshots, install it with 'pip install pyarrow'")
+
+
+def season_of(date_time):
+    """Start year of the season of a match, seasons run from july to june"""
+    if date_time is None or pd.isna(date_time):
+        return None
+    date_time = pd.Timestamp(date_time)
+    return date_time.year if date_time.month >= 7 else date_time.year - 1
+
+
+def read_manifest(directory=PARQUET_SNAPSHOT_DIR):
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return {'exported_until': None, 'rows': 0}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_snapshot(df, until, directory=PARQUET_SNAPSHOT_DIR):
+    """Append the rows of df as one new file per season, returns the written paths
+
+    `until` is the watermark the rows cover, the next export reads changes after it.
+    Files are named by export time, a repeated watermark never overwrites an earlier file.
+    """
+    require_pyarrow()
+    # ms.* repeats match_id, parquet needs unique column names
+    df = df.loc[:, ~df.columns.duplicated()].copy()
+    df['season'] = df['date_time'].map(season_of).astype('Int64')
+
+    stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    paths = []
+    for season, rows in df.groupby('season', dropna=False):
+        label = 'unknown' if pd.isna(season) else int(season)
+        season_dir = os.path.join(directory, f'season={label}')
+        os.makedirs(season_dir, exist_ok=True)
+        path = os.path.join(season_dir, f'part-{stamp}.parquet')
+        table = pa.Table.from_pandas(rows.drop(columns='season'), preserve_index=False)
+        # readers never see half written files
+        pq.write_table(table, path + '.tmp')
+        os.replace(path + '.tmp', path)
+        paths.append(path)
+
+    manifest = read_manifest(directory)
+    manifest['exported_until'] = pd.Timestamp(until).isoformat()
+    manifest['rows'] = manifest.get('rows', 0) + len(df)
+    with open(os.path.join(directory, MANIFEST + '.tmp'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(os.path.join(directory, MANIFEST + '.tmp'), os.path.join(directory, MANIFEST))
+    return paths
+
+
+def export_snapshot(directory=PARQUET_SNAPSHOT_DIR, full=False):
+    """Write matches changed since the last export to the snapshot, returns number of matches written
+
+    Matches count as changed like for team_form: inserted or re-scraped (updated_at)
+    or given new statistics. The manifest keeps the lagged watermark of change_watermark,
+    so matches of the last moments are exported once more next time, read_snapshot
+    keeps their latest copy.
+    """
+    require_pyarrow()
+    if full and os.path.isdir(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory, exist_ok=True)
+
+    since = read_manifest(directory)['exported_until']
+    with connection() as conn:
+        with conn.cursor() as cur:
+            newest, until = change_watermark(cur, change_sources())
+        if newest is None or (since is not None and newest <= datetime.fromisoformat(since)):
+            logger.info("Snapshot is up to date")
+            return 0
+
+        # no upper bound, rows committed after the watermark query are exported now and again next time
+        where, params = '', None
+        if since is not None:
+            where, params = f"WHERE {changed_condition()}", {'since': datetime.fromisoformat(since)}
+        df = pd.read_sql_query(match_data_query(where=where), conn, params=params)
+
+    paths = write_snapshot(df, until, directory)
+    logger.info(f"Exported {len(df)} matches into {len(paths)} season files under {directory}")
+    return len(df)
+
+
+def snapshot_files(directory=PARQUET_SNAPSHOT_DIR, seasons=None):
+    # part files sort by export time, so later copies of a match come last
+    files = sorted(glob.glob(os.path.join(directory, 'season=*', 'part-*.parquet')), key=os.path.basename)
+    if seasons is not None:
+        wanted = {f'season={season}' for season in seasons}
+        files = [path for path in files if os.path.basename(os.path.dirname(path)) in wanted]
+    return files
+
+
+def read_snapshot(directory=PARQUET_SNAPSHOT_DIR, columns=None, seasons=None):
+    """Match history from the snapshot, only `columns` are read from disk and files are memory mapped"""
+    require_pyarrow()
+    files = snapshot_files(directory, seasons)
+    if not files:
+        raise FileNotFoundError(f"No parquet snapshot in {directory}, run 'python -m src.ml_implemention.parquet_snapshot'")
+
+    wanted = None if columns is None else list(dict.fromkeys(['match_id', 'date_time', *columns]))
+    frames = []
+    for path in files:
+        projection = None if wanted is None else [name for name in wanted if name in pq.read_schema(path).names]
+        frames.append(pq.read_table(path, columns=projection, memory_map=True).to_pandas())
+
+    df = pd.concat(frames, ignore_index=True)
+    # a match exported twice keeps its latest copy
+    df = df.drop_duplicates('match_id', keep='last').sort_values('date_time', kind='stable').reset_index(drop=True)
+    return df if columns is None else df[[name for name in columns if name in df.columns]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the match history to a parquet snapshot partitioned by season")
+    parser.add_argument('--dir', default=PARQUET_SNAPSHOT_DIR)
+    parser.add_argument('--full', action='store_true', help="rewrite the snapshot instead of appending changed matches")
+    args = parser.parse_args()
+    export_snapshot(args.dir, full=args.full)
+
+
+if __name__ == "__main__":
+    main()
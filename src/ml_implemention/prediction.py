@@ -1,8 +1,8 @@
 import pandas as pd
-import numpy as np
 import logging
 
-from .data_loading import load_match_data
+from .data_loading import load_match_data, load_team_form
+from ..database.team_form import refresh_team_form
 from .model_training import MatchPredictor
 
 logger = logging.getLogger(__name__)
@@ -13,103 +13,13 @@ logging.basicConfig(
 )
 
 
-def to_float(val, default):
-    if val is None or val == '':
-        return default
-    try:
-        return float(val)
-    except (ValueError, TypeError):
-        return default
-
-
 def get_team_current_form(team_name, n_games=5):
 
-    df = load_match_data()
-    df = df.sort_values('date_time')
-
-    team_matches = df[
-        (df['home_team_name'] == team_name) | 
-        (df['away_team_name'] == team_name)
-    ].tail(n_games)
-    
-    if len(team_matches) == 0:
+    # rolling values are precomputed in the team_form table
+    form = load_team_form(team_name, n_games)
+    if form is None:
         logger.warning(f"Team '{team_name}' not found!")
-        return None
-
-    stats = {
-        'goals_for': [],
-        'goals_against': [],
-        'xg': [],
-        'shots': [],
-        'possession': [],
-        'wins': [],
-        'points': [],
-        'corners': [],
-        'fouls': [],
-        'yellow_cards': [],
-        'shots_on_target': [],
-    }
-
-    for _, row in team_matches.iterrows():
-        if row['home_team_name'] == team_name:
-            stats['goals_for'].append(to_float(row['home_score'], 0))
-            stats['goals_against'].append(to_float(row['away_score'], 0))
-            stats['xg'].append(to_float(row.get('home_xg'), 0))
-            stats['shots'].append(to_float(row.get('home_total_shots'), 10))
-            stats['possession'].append(to_float(row.get('home_ball_possession'), 50))
-            stats['corners'].append(to_float(row.get('home_corner_kicks'), 5))
-            stats['fouls'].append(to_float(row.get('home_fouls'), 12))
-            stats['yellow_cards'].append(to_float(row.get('home_yellow_cards'), 2))
-            stats['shots_on_target'].append(to_float(row.get('home_shots_on_target'), 4))
-            
-            home_score = to_float(row['home_score'], 0)
-            away_score = to_float(row['away_score'], 0)
-            if home_score > away_score:
-                stats['wins'].append(1)
-                stats['points'].append(3)
-            elif home_score < away_score:
-                stats['wins'].append(0)
-                stats['points'].append(0)
-            else:
-                stats['wins'].append(0)
-                stats['points'].append(1)
-        else:
-            stats['goals_for'].append(to_float(row['away_score'], 0))
-            stats['goals_against'].append(to_float(row['home_score'], 0))
-            stats['xg'].append(to_float(row.get('away_xg'), 0))
-            stats['shots'].append(to_float(row.get('away_total_shots'), 10))
-            stats['possession'].append(to_float(row.get('away_ball_possession'), 50))
-            stats['corners'].append(to_float(row.get('away_corner_kicks'), 5))
-            stats['fouls'].append(to_float(row.get('away_fouls'), 12))
-            stats['yellow_cards'].append(to_float(row.get('away_yellow_cards'), 2))
-            stats['shots_on_target'].append(to_float(row.get('away_shots_on_target'), 4))
-            
-            home_score = to_float(row['home_score'], 0)
-            away_score = to_float(row['away_score'], 0)
-            if away_score > home_score:
-                stats['wins'].append(1)
-                stats['points'].append(3)
-            elif away_score < home_score:
-                stats['wins'].append(0)
-                stats['points'].append(0)
-            else:
-                stats['wins'].append(0)
-                stats['points'].append(1)
-    
-    return {
-        'avg_goals': np.mean(stats['goals_for']),
-        'avg_conceded': np.mean(stats['goals_against']),
-        'avg_xg': np.mean(stats['xg']),
-        'avg_shots': np.mean(stats['shots']),
-        'avg_possession': np.mean(stats['possession']),
-        'win_rate': np.mean(stats['wins']),
-        'ppg': np.mean(stats['points']),
-        'games_played': len(team_matches),
-        'avg_corners': np.mean(stats['corners']),
-        'avg_fouls': np.mean(stats['fouls']),
-        'avg_yellow': np.mean(stats['yellow_cards']),
-        'avg_shots_on_target': np.mean(stats['shots_on_target']),
-    }
+    return form
 
 
 def predict_match(home_team: str, away_team: str, model_path='models/match_predictor.pkl'):
@@ -117,6 +27,9 @@ def predict_match(home_team: str, away_team: str, model_path='models/match_predi
     predictor = MatchPredictor()
     predictor.load(model_path)
 
+    # matches scraped since the last refresh are added to the team form first,
+    # without new writes predictions only read
+    refresh_team_form(if_changed=True)
     home_form = get_team_current_form(home_team)
     away_form = get_team_current_form(away_team)
     
@@ -189,7 +102,8 @@ def predict_match(home_team: str, away_team: str, model_path='models/match_predi
 
 def get_all_teams():
 
-    df = load_match_data()
+    # team names only, no statistics needed
+    df = load_match_data(statistics=[])
     home_teams = set(df['home_team_name'].dropna().unique())
     away_teams = set(df['away_team_name'].dropna().unique())
     return sorted(home_teams | away_teams)
\ No newline at end of file
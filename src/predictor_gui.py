@@ -8,6 +8,7 @@ import threading
 from .ml_implemention.prediction import predict_match, get_all_teams
 from .ml_implemention.model_training import MatchPredictor as predictor
 from .scraper.scraper import scraper
+from .scraper.browser_manager import BrowserManager
 
 import logging
 
@@ -25,6 +26,10 @@ class PredictorGui:
         self.root.geometry("1400x700")
         self.teams = get_all_teams()
         
+        # scraper loop and browser live as long as the window, later runs start warm
+        self.scraper_loop = None
+        self.browser_manager = None
+        
         self.setup_ui()
         
     def setup_ui(self):
@@ -70,14 +75,26 @@ class PredictorGui:
         
         self.tree.pack(fill=tk.BOTH, expand=True)
         
+    def get_scraper_loop(self):
+        if self.scraper_loop is None:
+            self.scraper_loop = asyncio.new_event_loop()
+            threading.Thread(target=self.scraper_loop.run_forever, daemon=True).start()
+            self.browser_manager = BrowserManager()
+        return self.scraper_loop
+        
     def scrap(self):
         self.result_var.set("Starting scraper... Please wait")
         self.root.update()
+        
+        loop = self.get_scraper_loop()
 
         def run_scraper():
             try:
-                # async scraper in its own event loop
-                saved = asyncio.run(scraper(start_season_year=2012))
+                # async scraper on the long lived loop, reusing the same browser
+                future = asyncio.run_coroutine_threadsafe(
+                    scraper(start_season_year=2012, browser_manager=self.browser_manager), loop
+                )
+                saved = future.result()
                 messagebox.showinfo("Scraper", f"Scraper finished! Saved {saved} matches")
                 self.result_var.set(f"Scraping finished: {saved} matches saved")
             except Exception as e:
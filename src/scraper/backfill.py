@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+from multiprocessing.connection import wait
+
+from ..database.db_queries import DatabaseOperations
+from ..database.db_connect import connection, close_pool
+from ..database.dimension_cache import DimensionCache
+from .scraper import list_seasons, scrape_season
+from .browser_manager import BrowserManager
+from .network_profile import NetworkProfile
+from .wait_policy import WaitPolicy
+from .snapshot_store import SnapshotStore
+from .frontier import CrawlFrontier
+from .metrics import ScrapeMetrics
+from .config import (
+    SCRAPER_CONCURRENCY,
+    SCRAPER_RATE,
+    SCRAPER_BURST,
+    SCRAPER_SNAPSHOT_DIR,
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+# (FINISHED, worker id) on the queue tells the writer a worker is done
+FINISHED = 'finished'
+
+
+def split_seasons(seasons, workers):
+    """Round robin seasons over workers, so old short and new long seasons mix on every worker"""
+    shards = [[] for _ in range(workers)]
+    for i, season in enumerate(seasons):
+        shards[i % workers].append(season)
+    return [shard for shard in shards if shard]
+
+
+async def _scrape_shard(worker_id, seasons, queue, concurrency, rate, burst, known_matches):
+    network_profile = NetworkProfile()
+    waits = WaitPolicy()
+    snapshots = SnapshotStore() if SCRAPER_SNAPSHOT_DIR else None
+    frontier = CrawlFrontier()
+    metrics = ScrapeMetrics()
+    loop = asyncio.get_running_loop()
+
+    async def send(match_data):
+        # a full queue blocks an executor thread while the writer catches up, pages keep loading
+        await loop.run_in_executor(None, queue.put, match_data)
+
+    async with BrowserManager(network_profile=network_profile) as browser_manager:
+        for season in seasons:
+            # known matches come from the parent, workers never connect to the database
+            produced = await scrape_season(
+                browser_manager, season, send, waits, frontier,
+                snapshots=snapshots, concurrency=concurrency, rate=rate, burst=burst, metrics=metrics,
+                known_matches=known_matches
+            )
+            logger.info(f"Worker {worker_id}: season {season['text']} done, {produced} matches sent to writer")
+
+    logger.info(f"Worker {worker_id} network profile: {network_profile.summary()}")
+    metrics.export(name=f'backfill_worker_{worker_id}')
+    frontier.close()
+
+
+def scrape_worker(worker_id, seasons, queue, concurrency, rate, burst, known_matches):
+    """Process entry point, scrapes its seasons with its own browser and sends matches to the writer"""
+    try:
+        asyncio.run(_scrape_shard(worker_id, seasons, queue, concurrency, rate, burst, known_matches))
+    except Exception as e:
+        logger.error(f"Worker {worker_id} failed: {e}")
+    finally:
+        queue.put((FINISHED, worker_id))
+
+
+def database_writer(queue, workers, result, known_matches):
+    """Process entry point, the only connection to the database during a backfill"""
+    frontier = CrawlFrontier()
+    cache = DimensionCache()
+    known_ids, known_keys = known_matches
+    saved = 0
+    skipped = 0
+    finished_workers = set()
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            while len(finished_workers) < workers:
+                match_data = queue.get()
+                if isinstance(match_data, tuple) and match_data[0] == FINISHED:
+                    # the parent repeats the message of a worker which died, so count each worker once
+                    finished_workers.add(match_data[1])
+                    logger.info(f"Writer: {len(finished_workers)}/{workers} workers finished")
+                    continue
+
+                key = DatabaseOperations.match_key(
+                    match_data.get('home_team'),
+                    match_data.get('away_team'),
+                    match_data.get('date_time')
+                )
+                if match_data.get('match_id') in known_ids or key in known_keys:
+                    skipped += 1
+                    frontier.mark_stored([match_data.get('url')])
+                    continue
+
+                try:
+                    DatabaseOperations.insert_match_data(cur, match_data, cache=cache)
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    cache.invalidate()
+                    logger.error(f"Writer: error inserting match {match_data.get('url')}: {e}")
+                    continue
+
+                saved += 1
+                known_ids.add(match_data.get('match_id'))
+                known_keys.add(key)
+                frontier.mark_stored([match_data.get('url')])
+                if saved % 100 == 0:
+                    logger.info(f"Writer: {saved} matches saved")
+
+    frontier.close()
+    logger.info(f"Writer: saved {saved} matches, skipped {skipped} already stored, dimension cache {cache.stats()}")
+    result.value = saved
+
+
+def wait_for_workers(workers, queue, writer):
+    """Join the scrape processes {worker id: process}, returns ids of workers which died
+
+    A worker killed hard never sends FINISHED, the writer gets it from here instead of
+    waiting forever. When the writer dies the workers are stopped, nothing drains their queue.
+    """
+    pending = dict(workers)
+    died = []
+    while pending:
+        wait([process.sentinel for process in pending.values()] + [writer.sentinel])
+
+        for worker_id, process in list(pending.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            del pending[worker_id]
+            if process.exitcode != 0:
+                logger.error(f"Worker {worker_id} died with exit code {process.exitcode}")
+                died.append(worker_id)
+                queue.put((FINISHED, worker_id))
+
+        if pending and not writer.is_alive():
+            logger.error(f"Writer died with exit code {writer.exitcode}, stopping {len(pending)} workers")
+            for process in pending.values():
+                process.terminate()
+                process.join()
+            died.extend(pending)
+            break
+    return died
+
+
+async def _season_list(start_season_year, end_season_year):
+    async with BrowserManager(network_profile=NetworkProfile()) as browser_manager:
+        return await list_seasons(browser_manager, WaitPolicy(), start_season_year, end_season_year)
+
+
+def worker_rate(rate, workers, per_worker=False):
+    """Requests per second of one worker
+
+    By default `rate` is the budget of the whole backfill on the one host, more workers
+    only split it and add no throughput once it is reached. With `per_worker` every
+    worker gets `rate`, so throughput grows with the workers and so does the load on the site.
+    """
+    return rate if per_worker else rate / workers
+
+
+def backfill(start_season_year=2012, end_season_year=None, workers=None, concurrency=SCRAPER_CONCURRENCY,
+             rate=SCRAPER_RATE, burst=SCRAPER_BURST, rate_per_worker=False):
+    """Scrape seasons in parallel processes, returns number of matches saved"""
+    workers = workers or os.cpu_count() or 1
+    seasons = asyncio.run(_season_list(start_season_year, end_season_year))
+    shards = split_seasons(seasons, workers)
+    if not shards:
+        logger.info("No seasons to backfill")
+        return 0
+
+    # read once here and copied into every process, so scrape workers need no database
+    with connection() as conn:
+        with conn.cursor() as cur:
+            known_matches = DatabaseOperations.load_known_matches(cur)
+    close_pool()
+    logger.info(f"{len(known_matches[0])} matches already stored")
+
+    shard_rate = worker_rate(rate, len(shards), rate_per_worker)
+    logger.info(f"Backfilling {len(seasons)} seasons with {len(shards)} workers, {shard_rate:.2f} req/s each")
+
+    # spawn, a forked playwright driver is not usable in the child
+    mp = multiprocessing.get_context('spawn')
+    queue = mp.Queue(maxsize=1000)
+    result = mp.Value('i', 0)
+
+    writer = mp.Process(target=database_writer, args=(queue, len(shards), result, known_matches), name='backfill-writer')
+    writer.start()
+
+    processes = {}
+    for worker_id, shard in enumerate(shards):
+        process = mp.Process(
+            target=scrape_worker,
+            args=(worker_id, shard, queue, concurrency, shard_rate, burst, known_matches),
+            name=f'backfill-worker-{worker_id}'
+        )
+        process.start()
+        processes[worker_id] = process
+        logger.info(f"Worker {worker_id}: {', '.join(season['text'] for season in shard)}")
+
+    died = wait_for_workers(processes, queue, writer)
+    writer.join()
+    if died:
+        logger.warning(f"Workers {died} did not finish, their seasons resume from the frontier on the next run")
+
+    logger.info(f"Backfill complete, {result.value} matches saved")
+    return result.value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Historical backfill with seasons split across worker processes")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="number of scraping processes")
+    parser.add_argument('--from', dest='start', type=int, default=2012, help="first season start year")
+    parser.add_argument('--to', dest='end', type=int, help="last season start year")
+    parser.add_argument('--concurrency', type=int, default=SCRAPER_CONCURRENCY, help="match pages per worker")
+    parser.add_argument('--rate', type=float, default=SCRAPER_RATE,
+                        help="requests per second shared by all workers, more workers add no throughput at a fixed rate")
+    parser.add_argument('--rate-per-worker', action='store_true',
+                        help="give every worker the full --rate, throughput and load on the site grow with --workers")
+    args = parser.parse_args()
+
+    backfill(args.start, args.end, workers=args.workers, concurrency=args.concurrency, rate=args.rate,
+             rate_per_worker=args.rate_per_worker)
+
+
+if __name__ == "__main__":
+    main()
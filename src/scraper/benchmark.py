@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import tempfile
+import time
+
+from .scraper import scraper
+from .mock_server import MockFlashscoreServer
+from .frontier import CrawlFrontier
+from .pipeline import MatchWriter
+from .metrics import ScrapeMetrics
+from .config import SCRAPER_CONCURRENCY, SCRAPER_BURST
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+FIRST_SEASON = 2021
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process and of its finished children (the browser), in MB"""
+    # linux reports kilobytes, macos bytes
+    scale = 1024 * 1024 if os.uname().sysname == 'Darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return round(own, 1), round(children, 1)
+
+
+async def run_benchmark(seasons=2, matches=40, latency=50, jitter=20, failure_rate=0.0,
+                        concurrency=SCRAPER_CONCURRENCY, rate=100.0, burst=SCRAPER_BURST, recorded_dir=None):
+    """Run scraper() against the mock server with nothing written to the database or to disk
+
+    Generated pages only approximate the site, pass `recorded_dir` (a snapshot directory)
+    to measure extraction and waits against recorded match pages.
+    """
+    metrics = ScrapeMetrics()
+    # matches are only counted, the benchmark measures scraping and not postgres
+    writer = MatchWriter(metrics=metrics, write_batch=lambda batch: [match.get('url') for match in batch])
+
+    with tempfile.TemporaryDirectory() as tmp_dir, MockFlashscoreServer(
+        latency=latency, jitter=jitter, failure_rate=failure_rate,
+        seasons=seasons, matches_per_season=matches, recorded_dir=recorded_dir
+    ) as server:
+        frontier = CrawlFrontier(path=os.path.join(tmp_dir, 'frontier.db'))
+        started = time.monotonic()
+        saved = await scraper(
+            start_season_year=FIRST_SEASON,
+            concurrency=concurrency,
+            rate=rate,
+            burst=burst,
+            frontier=frontier,
+            metrics=metrics,
+            writer=writer,
+            known_matches=(set(), set()),
+            base_url=server.base_url,
+            metrics_dir=None,
+        )
+        elapsed = time.monotonic() - started
+        frontier.close()
+        requests, failures = server.requests, server.failures
+
+    match_stage = metrics.summary()['total']['stages'].get('match', {})
+    own_rss, browser_rss = peak_rss_mb()
+    return {
+        'matches': saved,
+        'seconds': round(elapsed, 2),
+        'matches_per_second': round(saved / elapsed, 2) if elapsed else 0.0,
+        'match_latency_p50': match_stage.get('p50'),
+        'match_latency_p95': match_stage.get('p95'),
+        'peak_rss_mb': own_rss,
+        'peak_browser_rss_mb': browser_rss,
+        'server_requests': requests,
+        'server_failures': failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraper() against the local mock flashscore server")
+    parser.add_argument('--seasons', type=int, default=2)
+    parser.add_argument('--matches', type=int, default=40, help="matches per season")
+    parser.add_argument('--latency', type=float, default=50, help="server delay per request in ms")
+    parser.add_argument('--jitter', type=float, default=20, help="random +/- delay in ms")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="share of match requests answered with 503")
+    parser.add_argument('--concurrency', type=int, default=SCRAPER_CONCURRENCY)
+    parser.add_argument('--rate', type=float, default=100.0, help="requests per second, the mock server needs no politeness")
+    parser.add_argument('--recorded', help="snapshot directory of an earlier scrape, benchmark its match pages")
+    parser.add_argument('--output', help="also write the result as json into this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_benchmark(
+        seasons=args.seasons, matches=args.matches, latency=args.latency, jitter=args.jitter,
+        failure_rate=args.failure_rate, concurrency=args.concurrency, rate=args.rate, recorded_dir=args.recorded
+    ))
+
+    for name, value in result.items():
+        print(f"{name:>22}: {value}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+
+from playwright.async_api import async_playwright
+
+from .config import (
+    SCRAPER_BROWSER_WS,
+    SCRAPER_CONTEXT_MAX_PAGES,
+    SCRAPER_CONTEXT_MAX_HEAP_MB,
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class ManagedContext:
+    """Browser context which swaps itself for a fresh one after too many pages or too much memory
+
+    Pages still open on the old context finish normally, it is closed once they are gone.
+    """
+
+    # js heap is sampled every that many pages, it costs one evaluate round trip
+    MEMORY_CHECK_EVERY = 20
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.context = None
+        self.pages_opened = 0
+        self.retired = []
+        self._lock = asyncio.Lock()
+
+    async def _open(self):
+        self.context = await self.manager.create_context()
+        self.pages_opened = 0
+
+    async def _heap_too_big(self):
+        if self.pages_opened % self.MEMORY_CHECK_EVERY != 0 or not self.context.pages:
+            return False
+        try:
+            heap = await self.context.pages[0].evaluate(
+                "performance.memory ? performance.memory.usedJSHeapSize : 0"
+            )
+        except Exception:
+            return False
+        return heap > self.manager.max_heap_mb * 1024 * 1024
+
+    async def _close_retired(self):
+        for context in list(self.retired):
+            if not context.pages:
+                await context.close()
+                self.retired.remove(context)
+
+    async def new_page(self):
+        async with self._lock:
+            if self.context is None:
+                await self._open()
+            elif self.pages_opened >= self.manager.max_pages or await self._heap_too_big():
+                logger.info(f"Recycling browser context after {self.pages_opened} pages")
+                self.retired.append(self.context)
+                await self._open()
+
+            self.pages_opened += 1
+            await self._close_retired()
+            return await self.context.new_page()
+
+    @property
+    def pages(self):
+        return self.context.pages if self.context else []
+
+    async def close(self):
+        for context in self.retired + ([self.context] if self.context else []):
+            try:
+                await context.close()
+            except Exception as e:
+                logger.debug(f"Closing context failed: {e}")
+        self.retired = []
+        self.context = None
+
+
+class BrowserManager:
+    """Keeps one browser alive for many seasons and runs and hands out isolated contexts
+
+    With `ws_endpoint` (a server started by `npx playwright run-server`) it connects
+    to that browser instead of launching its own, so even a new process starts warm.
+    """
+
+    def __init__(self, ws_endpoint=SCRAPER_BROWSER_WS, max_pages=SCRAPER_CONTEXT_MAX_PAGES,
+                 max_heap_mb=SCRAPER_CONTEXT_MAX_HEAP_MB, network_profile=None, headless=True):
+        self.ws_endpoint = ws_endpoint
+        self.max_pages = max_pages
+        self.max_heap_mb = max_heap_mb
+        self.network_profile = network_profile
+        self.headless = headless
+
+        self.playwright = None
+        self.browser = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        async with self._lock:
+            if self.browser is not None and self.browser.is_connected():
+                return self.browser
+
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+
+            if self.ws_endpoint:
+                logger.info(f"Connecting to browser server {self.ws_endpoint}")
+                self.browser = await self.playwright.chromium.connect(self.ws_endpoint)
+            else:
+                logger.info("Launching browser")
+                self.browser = await self.playwright.chromium.launch(headless=self.headless)
+            return self.browser
+
+    async def create_context(self):
+        browser = await self.start()
+        context = await browser.new_context()
+        if self.network_profile:
+            await self.network_profile.attach(context)
+        return context
+
+    async def new_context(self):
+        """Fresh isolated context, recycled automatically once it has served enough pages"""
+        await self.start()
+        return ManagedContext(self)
+
+    async def stop(self):
+        if self.browser is not None:
+            try:
+                await self.browser.close()
+            except Exception as e:
+                logger.debug(f"Closing browser failed: {e}")
+            self.browser = None
+        if self.playwright is not None:
+            await self.playwright.stop()
+            self.playwright = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
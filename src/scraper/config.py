@@ -0,0 +1,64 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# site root, pointed at the local mock server for offline runs and benchmarks
+FLASHSCORE_BASE_URL = os.getenv("FLASHSCORE_BASE_URL", "https://www.flashscore.pl").rstrip('/')
+
+
+# how many match pages are scraped at the same time
+SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", 4))
+
+# token bucket per host: match pages per second and how many can be opened in a burst
+SCRAPER_RATE = float(os.getenv("SCRAPER_RATE", 1.0))
+SCRAPER_BURST = int(os.getenv("SCRAPER_BURST", 2))
+
+# adaptive controller: outcomes looked at and error rate which triggers backing off
+SCRAPER_ERROR_WINDOW = int(os.getenv("SCRAPER_ERROR_WINDOW", 20))
+SCRAPER_ERROR_THRESHOLD = float(os.getenv("SCRAPER_ERROR_THRESHOLD", 0.2))
+
+# request types aborted on match pages, empty value lets everything through
+SCRAPER_BLOCK_RESOURCES = [t.strip() for t in os.getenv("SCRAPER_BLOCK_RESOURCES", "image,media,font").split(',') if t.strip()]
+
+# domains blocked on top of the built in ads and analytics list
+SCRAPER_EXTRA_BLOCKED_DOMAINS = [d.strip() for d in os.getenv("SCRAPER_EXTRA_BLOCKED_DOMAINS", "").split(',') if d.strip()]
+
+# 'script' reads every page with one page.evaluate, 'dom' walks it element by element,
+# 'feed' takes detailed statistics from the data feed and skips the statistics tab,
+# the summary is still read from the page like in 'script'
+SCRAPER_EXTRACTION_MODE = os.getenv("SCRAPER_EXTRACTION_MODE", "script")
+
+# how long in ms 'feed' mode waits for the statistics feed before opening the tab
+SCRAPER_FEED_TIMEOUT = int(os.getenv("SCRAPER_FEED_TIMEOUT", 5000))
+
+# upper bound in ms for a single wait on a page condition
+SCRAPER_WAIT_TIMEOUT = int(os.getenv("SCRAPER_WAIT_TIMEOUT", 10000))
+
+# statistics tab renders from a separate request and can take longer
+SCRAPER_STATS_TIMEOUT = int(os.getenv("SCRAPER_STATS_TIMEOUT", 20000))
+
+# rendered match pages are kept here for replay, empty value disables snapshots
+SCRAPER_SNAPSHOT_DIR = os.getenv("SCRAPER_SNAPSHOT_DIR", "")
+SCRAPER_SNAPSHOT_COMPRESSION = os.getenv("SCRAPER_SNAPSHOT_COMPRESSION", "gzip")
+
+# local crawl state, lets an interrupted run continue where it stopped
+SCRAPER_FRONTIER_PATH = os.getenv("SCRAPER_FRONTIER_PATH", "crawl_frontier.db")
+SCRAPER_MAX_ATTEMPTS = int(os.getenv("SCRAPER_MAX_ATTEMPTS", 3))
+
+# ws endpoint of a running playwright browser server, empty value launches chromium
+SCRAPER_BROWSER_WS = os.getenv("SCRAPER_BROWSER_WS", "")
+
+# a browser context is replaced after that many pages or that much js heap
+SCRAPER_CONTEXT_MAX_PAGES = int(os.getenv("SCRAPER_CONTEXT_MAX_PAGES", 200))
+SCRAPER_CONTEXT_MAX_HEAP_MB = int(os.getenv("SCRAPER_CONTEXT_MAX_HEAP_MB", 512))
+
+# parsed matches waiting for the database writer, scrapers block when it is full
+SCRAPER_QUEUE_SIZE = int(os.getenv("SCRAPER_QUEUE_SIZE", 100))
+
+# writer commits after that many matches or that many seconds, whichever comes first
+SCRAPER_BATCH_SIZE = int(os.getenv("SCRAPER_BATCH_SIZE", 20))
+SCRAPER_FLUSH_INTERVAL = float(os.getenv("SCRAPER_FLUSH_INTERVAL", 2.0))
+
+# json summary and prometheus text file of every run go here, empty value disables export
+SCRAPER_METRICS_DIR = os.getenv("SCRAPER_METRICS_DIR", "metrics")
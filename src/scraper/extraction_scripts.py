@@ -0,0 +1,116 @@
+# javascript run with page.evaluate, every script reads the whole page in one round trip
+# and returns the same dict shape as the query_selector based extraction in Statistic
+
+_HELPERS = """
+    const clean = (el) => el ? el.innerText.trim() : null;
+
+    const firstText = (selectors) => {
+        for (const selector of selectors) {
+            const el = document.querySelector(selector);
+            if (el) {
+                const value = el.innerText.trim();
+                if (value) {
+                    return value;
+                }
+            }
+        }
+        return null;
+    };
+
+    const readStatistics = (root) => {
+        const stats = {};
+        root.querySelectorAll('[data-testid="wcl-statistics"]').forEach((row) => {
+            const category = row.querySelector('[data-testid="wcl-statistics-category"]');
+            if (!category) {
+                return;
+            }
+            const values = row.querySelectorAll('[data-testid="wcl-statistics-value"]');
+            if (values.length >= 2) {
+                stats[clean(category)] = {home: clean(values[0]), away: clean(values[1])};
+            }
+        });
+        return stats;
+    };
+"""
+
+SUMMARY_SCRIPT = """() => {
+""" + _HELPERS + """
+    const data = {};
+
+    const date = document.querySelector('.duelParticipant__startTime');
+    if (date) {
+        data.date_time = clean(date);
+    }
+
+    data.home_team = firstText([
+        '.duelParticipant__home .participant__participantName a',
+        '.duelParticipant__home .participant__participantName',
+        '[class*="duelParticipant__home"] [class*="participantName"]',
+    ]);
+    data.away_team = firstText([
+        '.duelParticipant__away .participant__participantName a',
+        '.duelParticipant__away .participant__participantName',
+        '[class*="duelParticipant__away"] [class*="participantName"]',
+    ]);
+
+    const scoreWrapper = document.querySelector('.detailScore__wrapper');
+    if (scoreWrapper) {
+        const spans = scoreWrapper.querySelectorAll('span');
+        if (spans.length >= 3) {
+            data.home_score = clean(spans[0]);
+            data.away_score = clean(spans[2]);
+        }
+    }
+
+    data.statistics = readStatistics(document);
+
+    const matchInfo = document.querySelector('.wcl-content_Vkmj9');
+    if (matchInfo) {
+        const values = matchInfo.querySelectorAll('.wcl-infoValue_grawU');
+        const labels = matchInfo.querySelectorAll('.wcl-infoLabelWrapper_DXbvw');
+        const stripParens = (value) => value.replace(/[()]/g, '').trim();
+
+        labels.forEach((labelElement, i) => {
+            if (i >= values.length) {
+                return;
+            }
+            const label = clean(labelElement).toLowerCase();
+            const value = values[i];
+            const spans = value.querySelectorAll('span');
+
+            if (label.includes('sędzia') || label.includes('sedzia')) {
+                if (spans.length >= 1) data.referee_name = clean(spans[0]);
+                if (spans.length >= 2) data.referee_nationality = stripParens(clean(spans[1]));
+            } else if (label.includes('stadion')) {
+                if (spans.length >= 1) data.stadium_name = clean(spans[0]);
+                if (spans.length >= 2) data.stadium_city = stripParens(clean(spans[1]));
+            } else if (label.includes('pojemność') || label.includes('pojemnosc')) {
+                data.capacity = clean(value);
+            } else if (label.includes('frekwencja')) {
+                data.attendance = clean(value);
+            }
+        });
+    }
+
+    const status = document.querySelector('.fixedHeaderDuel__detailStatus');
+    if (status) {
+        data.status = clean(status);
+    }
+
+    return data;
+}"""
+
+DETAILED_STATISTICS_SCRIPT = """() => {
+""" + _HELPERS + """
+    const detailed = {};
+    const wrapper = document.querySelector('div[class*="sectionsWrapper"]') || document;
+
+    wrapper.querySelectorAll('.section').forEach((section) => {
+        const title = section.querySelector('.section__title');
+        if (title) {
+            detailed[clean(title)] = readStatistics(section);
+        }
+    });
+
+    return detailed;
+}"""
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+# flashscore feeds are plain text: records split by '~', fields by '¬', key and value by '÷'
+RECORD_SEP = '~'
+FIELD_SEP = '¬'
+VALUE_SEP = '÷'
+
+# statistics feed of a match, served as /x/feed/df_st_1_<mid>
+STATISTICS_FEED = 'df_st_'
+
+# statistics feed keys: period, section, category, home value, away value
+PERIOD = 'SE'
+SECTION = 'SF'
+CATEGORY = 'SG'
+HOME_VALUE = 'SH'
+AWAY_VALUE = 'SI'
+
+# the statistics tab we would otherwise open shows the whole match, which is the first period
+MATCH_PERIOD = 'Mecz'
+
+
+def feed_name(url):
+    """Feed name like 'df_st_1_<mid>' from a response url, None for anything else"""
+    if '/feed/' not in url:
+        return None
+    return url.split('/feed/')[-1].split('?')[0].strip('/')
+
+
+def parse_feed(text):
+    """Split a feed payload into a list of records, each a dict of its fields"""
+    records = []
+    for raw_record in text.split(RECORD_SEP):
+        record = {}
+        for field in raw_record.split(FIELD_SEP):
+            if VALUE_SEP not in field:
+                continue
+            key, value = field.split(VALUE_SEP, 1)
+            record[key] = value
+        if record:
+            records.append(record)
+    return records
+
+
+def parse_statistics(text, period=MATCH_PERIOD):
+    """Detailed statistics from a df_st feed, same shape as the statistics tab scrape:
+    {section: {category: {'home': value, 'away': value}}}
+    """
+    detailed_stats = {}
+    current_period = None
+    current_section = None
+
+    for record in parse_feed(text):
+        if PERIOD in record:
+            current_period = record[PERIOD]
+            current_section = None
+            continue
+
+        # without a named period the feed only has the match itself
+        if current_period is not None and current_period != period:
+            continue
+
+        if SECTION in record:
+            current_section = record[SECTION].strip()
+            detailed_stats.setdefault(current_section, {})
+            continue
+
+        if CATEGORY in record and current_section is not None:
+            detailed_stats[current_section][record[CATEGORY].strip()] = {
+                'home': record.get(HOME_VALUE, '').strip(),
+                'away': record.get(AWAY_VALUE, '').strip(),
+            }
+
+    # sections without a single row would only look like an empty scrape
+    return {section: stats for section, stats in detailed_stats.items() if stats}
+
+
+class FeedCapture:
+    """Keeps the data feed responses a match page loads in the background
+
+    Attach it before `goto`, then `wait_for('df_st_')` returns the payload as soon as it
+    arrived, without waiting for the page to render it.
+    """
+
+    def __init__(self):
+        self.payloads = {}
+        self._arrived = asyncio.Event()
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+        return self
+
+    async def _on_response(self, response):
+        name = feed_name(response.url)
+        if name is None:
+            return
+        try:
+            self.payloads[name] = await response.text()
+        except Exception as e:
+            logger.debug(f"Could not read feed {name}: {e}")
+            return
+        self._arrived.set()
+
+    def get(self, prefix):
+        for name, payload in self.payloads.items():
+            if name.startswith(prefix):
+                return payload
+        return None
+
+    async def wait_for(self, prefix, timeout):
+        """Payload of the first feed starting with `prefix`, None when it did not come within `timeout` ms"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout / 1000
+        while True:
+            payload = self.get(prefix)
+            if payload is not None:
+                return payload
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                return self.get(prefix)
@@ -0,0 +1,131 @@
+import json
+import logging
+import sqlite3
+import time
+
+from .config import SCRAPER_FRONTIER_PATH, SCRAPER_MAX_ATTEMPTS
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+DISCOVERED = 'discovered'
+FETCHED = 'fetched'
+PARSED = 'parsed'
+STORED = 'stored'
+FAILED = 'failed'
+
+
+class CrawlFrontier:
+    """Local sqlite table with the crawl state of every match url
+
+    discovered -> fetched -> parsed -> stored, or failed at any step.
+    Parsed matches keep their data until they are stored, so a crash
+    between scraping and the database write loses nothing.
+    """
+
+    def __init__(self, path=SCRAPER_FRONTIER_PATH, max_attempts=SCRAPER_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        # backfill workers share the file, wait for their locks instead of failing
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                match_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                season TEXT,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                payload TEXT,
+                error TEXT,
+                updated_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state)")
+        self.conn.commit()
+
+    @staticmethod
+    def key(url):
+        if 'mid=' in url:
+            return url.split('mid=')[-1]
+        return url
+
+    def _set_state(self, url, state, **fields):
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        query = f"UPDATE frontier SET state = ?, updated_at = ?{', ' + columns if columns else ''} WHERE match_id = ?"
+        self.conn.execute(query, (state, time.time(), *fields.values(), self.key(url)))
+        self.conn.commit()
+
+    def discover(self, urls, season=None):
+        """Register urls and return the ones which still have to be scraped, in the given order"""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO frontier (match_id, url, season, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+            [(self.key(url), url, season, DISCOVERED, now) for url in urls]
+        )
+        self.conn.commit()
+
+        keys = [self.key(url) for url in urls]
+        states = {}
+        # sqlite limits the number of parameters, so look states up in chunks
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ', '.join(['?'] * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT match_id, state, attempts FROM frontier WHERE match_id IN ({placeholders})", chunk
+            ).fetchall()
+            states.update({match_id: (state, attempts) for match_id, state, attempts in rows})
+
+        todo = []
+        for url in urls:
+            state, attempts = states[self.key(url)]
+            if state in (STORED, PARSED):
+                continue
+            if state == FAILED and attempts >= self.max_attempts:
+                continue
+            todo.append(url)
+        return todo
+
+    def is_known(self, url):
+        row = self.conn.execute("SELECT state FROM frontier WHERE match_id = ?", (self.key(url),)).fetchone()
+        return row is not None and row[0] in (STORED, PARSED)
+
+    def mark_fetched(self, url):
+        self._set_state(url, FETCHED)
+
+    def mark_parsed(self, url, match_data):
+        self._set_state(url, PARSED, payload=json.dumps(match_data, ensure_ascii=False, default=str))
+
+    def mark_failed(self, url, error=None):
+        self.conn.execute(
+            "UPDATE frontier SET state = ?, attempts = attempts + 1, error = ?, updated_at = ? WHERE match_id = ?",
+            (FAILED, error, time.time(), self.key(url))
+        )
+        self.conn.commit()
+
+    def mark_stored(self, urls):
+        # payload is not needed any more once the match is in the database
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE frontier SET state = ?, payload = NULL, updated_at = ? WHERE match_id = ?",
+            [(STORED, now, self.key(url)) for url in urls]
+        )
+        self.conn.commit()
+
+    def parsed_matches(self, season=None):
+        """Matches scraped in an earlier run which never reached the database"""
+        query = "SELECT payload FROM frontier WHERE state = ?"
+        params = [PARSED]
+        if season is not None:
+            query += " AND season = ?"
+            params.append(season)
+        return [json.loads(payload) for (payload,) in self.conn.execute(query, params) if payload]
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall())
+
+    def close(self):
+        self.conn.close()
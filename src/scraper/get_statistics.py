@@ -1,6 +1,12 @@
 import asyncio
 import logging
 
+from .config import SCRAPER_EXTRACTION_MODE, SCRAPER_STATS_TIMEOUT, SCRAPER_FEED_TIMEOUT
+from .extraction_scripts import SUMMARY_SCRIPT, DETAILED_STATISTICS_SCRIPT
+from .feed_extractor import STATISTICS_FEED, parse_statistics
+from .wait_policy import WaitPolicy
+from .metrics import ScrapeMetrics
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(
     level = logging.INFO,
@@ -8,13 +14,26 @@ logging.basicConfig(
 )
 
 class Statistic:
-    async def extract_detailed_statistics(match_page, max_retries=3):
+    
+    @staticmethod
+    async def wait_for_sections(match_page, waits, attempt):
+        # first look waits for section titles, retries wait until pending requests settle
+        if attempt == 0:
+            await waits.selector(match_page, '.section .section__title', name='statistics sections')
+        else:
+            await waits.load_state(match_page, 'networkidle', name='statistics retry', timeout=5000)
+    
+    @staticmethod
+    async def extract_detailed_statistics(match_page, max_retries=3, waits=None, metrics=None):
+        waits = waits or WaitPolicy()
+        metrics = metrics or ScrapeMetrics()
         detailed_stats = {}
         
         for attempt in range(max_retries):
+            if attempt > 0:
+                metrics.incr('stats_retries')
             try:
-                # wait before attempting extraction
-                await asyncio.sleep(1 + attempt * 0.5)
+                await Statistic.wait_for_sections(match_page, waits, attempt)
                 sections_wrapper = await match_page.query_selector('div[class*="sectionsWrapper"]')
                 
                 if not sections_wrapper:
@@ -64,7 +83,46 @@ class Statistic:
         return detailed_stats
     
     @staticmethod
-    async def extract_match_data(match_page):
+    async def extract_detailed_statistics_script(match_page, max_retries=3, waits=None, metrics=None):
+        """Same result as extract_detailed_statistics but read with one page.evaluate per attempt"""
+        waits = waits or WaitPolicy()
+        metrics = metrics or ScrapeMetrics()
+        detailed_stats = {}
+        
+        for attempt in range(max_retries):
+            if attempt > 0:
+                metrics.incr('stats_retries')
+            try:
+                await Statistic.wait_for_sections(match_page, waits, attempt)
+                detailed_stats = await match_page.evaluate(DETAILED_STATISTICS_SCRIPT)
+                
+                if detailed_stats:
+                    logger.info(f"Successfully extracted {len(detailed_stats)} sections")
+                    break
+                logger.info(f"Attempt {attempt + 1}: sections not found")
+                
+            except Exception as e:
+                logger.error(f"Attempt error extracting detailed statistics: {e}")
+        
+        return detailed_stats or {}
+    
+    @staticmethod
+    async def extract_summary_script(match_page, waits=None):
+        """Teams, score, basic statistics, referee, stadium and status in one round trip"""
+        waits = waits or WaitPolicy()
+        await waits.selector(match_page, '.wcl-content_Vkmj9', name='match info', timeout=1000)
+        match_data = await match_page.evaluate(SUMMARY_SCRIPT)
+        
+        if not match_data.get('home_team'):
+            logger.warning(f"Failed to extract home team from: {match_page.url}")
+        if not match_data.get('away_team'):
+            logger.warning(f"Failed to extract away team from: {match_page.url}")
+            
+        return match_data
+    
+    @staticmethod
+    async def extract_summary(match_page, waits=None):
+        waits = waits or WaitPolicy()
         match_data = {}
         
         try:   
@@ -74,33 +132,6 @@ class Statistic:
             else:
                 logger.warning("Could not find date_time element")
 
-            # Extract home team with multiple selector attempts
-            home_team_element = await match_page.query_selector('.duelParticipant__home .participant__participantName a')
-            if not home_team_element:
-                home_team_element = await match_page.query_selector('.duelParticipant__home .participant__participantName')
-            if not home_team_element:
-                home_team_element = await match_page.query_selector('[class*="participant__home"] [class*="participantName"]')
-            
-            if home_team_element:
-                match_data['home_team'] = (await home_team_element.inner_text()).strip()
-                logger.debug(f"Extracted home team: {match_data['home_team']}")
-            else:
-                logger.warning("Could not find home team element")
-                match_data['home_team'] = None
-
-            # Extract away team with multiple selector attempts
-            away_team_element = await match_page.query_selector('.duelParticipant__away .participant__participantName a')
-            if not away_team_element:
-                away_team_element = await match_page.query_selector('.duelParticipant__away .participant__participantName')
-            if not away_team_element:
-                away_team_element = await match_page.query_selector('[class*="participant__away"] [class*="participantName"]')
-            
-            if away_team_element:
-                match_data['away_team'] = (await away_team_element.inner_text()).strip()
-                logger.debug(f"Extracted away team: {match_data['away_team']}")
-            else:
-                logger.warning("Could not find away team element")
-                match_data['away_team'] = None
             # team names with robust error handling
             home_team_name = None
             for selector in [
@@ -171,9 +202,8 @@ class Statistic:
             
             match_data['statistics'] = stats
             
-            await asyncio.sleep(0.5)
-            
             # get reffere and stadium
+            await waits.selector(match_page, '.wcl-content_Vkmj9', name='match info', timeout=1000)
             match_info = await match_page.query_selector('.wcl-content_Vkmj9')
 
             if match_info:
@@ -218,71 +248,124 @@ class Statistic:
             if status_element:
                 match_data['status'] = (await status_element.inner_text()).strip()
                 
-            try:
-                current_url = match_page.url
-                logger.info(f"Current URL: {current_url}")
+        except Exception as e:
+            logger.error(f"Error extracting match data: {e}")
+        
+        return match_data
+    
+    @staticmethod
+    async def open_statistics_page(match_page, waits=None, metrics=None):
+        """Navigate from match summary to its statistics tab, returns True when statistics rendered"""
+        waits = waits or WaitPolicy()
+        metrics = metrics or ScrapeMetrics()
+        current_url = match_page.url
+        logger.info(f"Current URL: {current_url}")
 
-                if '/mecz/' in current_url:
-                    # remove query parameters temporarily
-                    base_url = current_url.split('?')[0]
-                    query_params = current_url.split('?')[1] if '?' in current_url else ''
-                    
-                    # remove trailing slash if exists
-                    base_url = base_url.rstrip('/')
-                    
-                    # construct statistics URL
-                    stats_url = f"{base_url}/szczegoly/statystyki/ogolnie/"
-                    if query_params:
-                        stats_url += f"?{query_params}"
-                    
-                    logger.info(f"Navigating to statistics: {stats_url}")
-                    
-                    try:
-                        if match_page.is_closed():
-                            logger.error("Match page is already closed before stats navigation!")
-                            match_data['detailed_statistic'] = {}
-                            return match_data
-                        
-                        await match_page.goto(stats_url, wait_until="domcontentloaded", timeout=30000)
-                        
-                        # wait longer for statistics with more retries
-                        await asyncio.sleep(2)
-                        
-                        stats_loaded = False
-                        for attempt in range(5):  
-                            try:
-                                await match_page.wait_for_selector('[data-testid="wcl-statistics"]', timeout=8000) 
-                                logger.info(f"Statistics elements appeared (attempt {attempt+1})")
-                                stats_loaded = True
-                                break
-                            except Exception as wait_err:
-                                if attempt < 4:
-                                    wait_time = 2 + attempt
-                                    logger.warning(f"Statistics not loaded yet, retry {attempt+1}/4 (waiting {wait_time}s): {wait_err}")
-                                    await asyncio.sleep(wait_time)
-                                else:
-                                    logger.warning(f"Statistics elements did not appear after 3 attempts: {wait_err}")
-                        
-                        if not stats_loaded:
-                            logger.error(f"Failed to load statistics for URL: {stats_url}")
-                            match_data['detailed_statistic'] = {}
-                            return match_data
-                        
-                        # now scrape detailed statistics with retry logic
-                        detailed_stats = await Statistic.extract_detailed_statistics(match_page)
-                        logger.info(f"Extracted detailed stats: {len(detailed_stats)} sections")
-                        
-                        match_data['detailed_statistic'] = detailed_stats
-                        
-                    except Exception as nav_error:
-                        logger.error(f"Error navigating to statistics URL: {nav_error}")
-                        match_data['detailed_statistic'] = {}
+        if '/mecz/' not in current_url:
+            logger.warning(f"Unexpected URL format: {current_url}")
+            return False
+            
+        # remove query parameters temporarily
+        base_url = current_url.split('?')[0]
+        query_params = current_url.split('?')[1] if '?' in current_url else ''
+        
+        # remove trailing slash if exists
+        base_url = base_url.rstrip('/')
+        
+        # construct statistics URL
+        stats_url = f"{base_url}/szczegoly/statystyki/ogolnie/"
+        if query_params:
+            stats_url += f"?{query_params}"
+        
+        logger.info(f"Navigating to statistics: {stats_url}")
+        
+        if match_page.is_closed():
+            logger.error("Match page is already closed before stats navigation!")
+            return False
+        
+        await match_page.goto(stats_url, wait_until="domcontentloaded", timeout=30000)
+        
+        if await waits.selector(match_page, '[data-testid="wcl-statistics"]', name='statistics tab', timeout=SCRAPER_STATS_TIMEOUT):
+            logger.info("Statistics elements appeared")
+            return True
+        
+        # one reload covers a feed request which got lost on the way
+        logger.warning(f"Statistics not loaded yet, reloading {stats_url}")
+        metrics.incr('stats_reloads')
+        await match_page.reload(wait_until="domcontentloaded", timeout=30000)
+        if await waits.selector(match_page, '[data-testid="wcl-statistics"]', name='statistics tab reload', timeout=SCRAPER_STATS_TIMEOUT):
+            logger.info("Statistics elements appeared after reload")
+            return True
+        
+        logger.error(f"Failed to load statistics for URL: {stats_url}")
+        return False
+    
+    @staticmethod
+    async def statistics_from_feed(feed, snapshots=None, match_id=None):
+        """Detailed statistics from the captured statistics feed, empty dict when the feed has none"""
+        payload = await feed.wait_for(STATISTICS_FEED, SCRAPER_FEED_TIMEOUT)
+        if payload is None:
+            logger.info("Statistics feed did not arrive")
+            return {}
+        
+        if snapshots and match_id:
+            await asyncio.to_thread(snapshots.save, match_id, 'statistics-feed', payload)
+        return parse_statistics(payload)
+    
+    @staticmethod
+    async def extract_match_data(match_page, mode=SCRAPER_EXTRACTION_MODE, waits=None, snapshots=None, match_id=None, feed=None, metrics=None):
+        """Full match dict, mode 'script' reads each page with one page.evaluate, 'dom' element by element
+
+        Mode 'feed' takes detailed statistics straight from the data feed the summary page
+        loads (`feed` is a FeedCapture attached before navigation) and only opens the
+        statistics tab when the feed has none. The summary (teams, score, date, referee,
+        stadium, top statistics) is still read from the rendered page like in 'script'
+        mode, only the statistics feed is parsed so far.
+        With a SnapshotStore the rendered summary and statistics html is kept for replay.
+        """
+        waits = waits or WaitPolicy()
+        metrics = metrics or ScrapeMetrics()
+        match_data = {}
+        
+        try:
+            if mode == 'dom':
+                match_data = await Statistic.extract_summary(match_page, waits=waits)
+            else:
+                match_data = await Statistic.extract_summary_script(match_page, waits=waits)
+            if snapshots:
+                await snapshots.capture(match_page, match_id, 'summary')
+            
+            if mode == 'feed' and feed is not None:
+                with metrics.timer('stats_feed'):
+                    detailed_stats = await Statistic.statistics_from_feed(feed, snapshots=snapshots, match_id=match_id)
+                if detailed_stats:
+                    # no second navigation, the feed already had everything the tab would show
+                    logger.info(f"Extracted detailed stats from feed: {len(detailed_stats)} sections")
+                    match_data['detailed_statistic'] = detailed_stats
+                    return match_data
+                logger.info("No statistics in feed, opening statistics tab")
+                
+            try:
+                with metrics.timer('stats_navigation'):
+                    stats_opened = await Statistic.open_statistics_page(match_page, waits=waits, metrics=metrics)
+                if stats_opened:
+                    # now scrape detailed statistics with retry logic
+                    with metrics.timer('stats_extraction'):
+                        if mode != 'dom':
+                            detailed_stats = await Statistic.extract_detailed_statistics_script(match_page, waits=waits, metrics=metrics)
+                        else:
+                            detailed_stats = await Statistic.extract_detailed_statistics(match_page, waits=waits, metrics=metrics)
+                    logger.info(f"Extracted detailed stats: {len(detailed_stats)} sections")
+                    match_data['detailed_statistic'] = detailed_stats
+                    if snapshots:
+                        await snapshots.capture(match_page, match_id, 'statistics')
                 else:
-                    logger.warning(f"Unexpected URL format: {current_url}")
+                    metrics.incr('stats_missing')
                     match_data['detailed_statistic'] = {}
                     
             except Exception as e:
                 logger.error(f"Error processing statistics: {e}")
+                metrics.incr('stats_missing')
                 match_data['detailed_statistic'] = {}
                 
             logger.info(f"Extracted data for {match_data.get('home_team', 'Unknown')} vs {match_data.get('away_team', 'Unknown')}")
@@ -290,4 +373,4 @@ class Statistic:
         except Exception as e:
             logger.error(f"Error extracting match data: {e}")
         
-        return match_data
\ No newline at end of file
+        return match_data
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import time
+from collections import defaultdict, Counter
+from contextlib import contextmanager
+
+from .config import SCRAPER_METRICS_DIR
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+# everything recorded outside of a season, like the archive listing
+NO_SEASON = 'all'
+
+
+def percentile(ordered, p):
+    """Nearest rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+class SeasonMetrics:
+
+    def __init__(self):
+        self.started = None
+        self.finished = None
+        self.stages = defaultdict(list)
+        self.counters = Counter()
+
+    def duration(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def summary(self):
+        duration = self.duration()
+        stages = {}
+        for stage, durations in self.stages.items():
+            ordered = sorted(durations)
+            stages[stage] = {
+                'count': len(durations),
+                'total': round(sum(durations), 3),
+                'avg': round(sum(durations) / len(durations), 3),
+                'p50': round(percentile(ordered, 50), 3),
+                'p95': round(percentile(ordered, 95), 3),
+                'max': round(max(durations), 3),
+            }
+        return {
+            'duration': round(duration, 3),
+            'pages_per_minute': round(self.counters['pages'] / duration * 60, 2) if duration else 0.0,
+            'counters': dict(self.counters),
+            'stages': stages,
+        }
+
+
+class ScrapeMetrics:
+    """Stage timings and counters of a scrape run, grouped by season
+
+    Stages are timed with `with metrics.timer('goto'):`, counters are bumped with
+    `metrics.incr('pages')`. Both go to the season set by `start_season` unless
+    a season is passed explicitly, the database writer does that since it runs behind.
+    `export()` writes a JSON summary and a Prometheus text file.
+    """
+
+    def __init__(self):
+        self.seasons = defaultdict(SeasonMetrics)
+        self.current_season = NO_SEASON
+
+    def start_season(self, season):
+        self.current_season = season
+        self.seasons[season].started = time.monotonic()
+
+    def end_season(self, season=None):
+        season = season or self.current_season
+        self.seasons[season].finished = time.monotonic()
+        self.current_season = NO_SEASON
+
+    def observe(self, stage, seconds, season=None):
+        self.seasons[season or self.current_season].stages[stage].append(seconds)
+
+    def incr(self, counter, value=1, season=None):
+        self.seasons[season or self.current_season].counters[counter] += value
+
+    @contextmanager
+    def timer(self, stage, season=None):
+        season = season or self.current_season
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.monotonic() - start, season)
+
+    def summary(self):
+        total = SeasonMetrics()
+        for season in self.seasons.values():
+            total.counters.update(season.counters)
+            for stage, durations in season.stages.items():
+                total.stages[stage].extend(durations)
+        summary = total.summary()
+        summary['duration'] = round(sum(season.duration() for season in self.seasons.values()), 3)
+        if summary['duration']:
+            summary['pages_per_minute'] = round(total.counters['pages'] / summary['duration'] * 60, 2)
+
+        return {
+            'seasons': {name: season.summary() for name, season in self.seasons.items()},
+            'total': summary,
+        }
+
+    @staticmethod
+    def _label(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+    def to_prometheus(self):
+        """Prometheus text exposition format, suited for the node exporter textfile collector"""
+        lines = [
+            '# HELP scraper_stage_seconds Time spent in a scrape stage',
+            '# TYPE scraper_stage_seconds summary',
+        ]
+        for name, season in self.seasons.items():
+            for stage, durations in season.stages.items():
+                labels = f'season="{self._label(name)}",stage="{self._label(stage)}"'
+                lines.append(f'scraper_stage_seconds_sum{{{labels}}} {sum(durations):.6f}')
+                lines.append(f'scraper_stage_seconds_count{{{labels}}} {len(durations)}')
+
+        lines += [
+            '# HELP scraper_events_total Pages, retries, failures and bytes counted while scraping',
+            '# TYPE scraper_events_total counter',
+        ]
+        for name, season in self.seasons.items():
+            for counter, value in season.counters.items():
+                lines.append(f'scraper_events_total{{season="{self._label(name)}",event="{self._label(counter)}"}} {value}')
+
+        lines += [
+            '# HELP scraper_pages_per_minute Match pages scraped per minute',
+            '# TYPE scraper_pages_per_minute gauge',
+        ]
+        for name, season in self.seasons.items():
+            lines.append(f'scraper_pages_per_minute{{season="{self._label(name)}"}} {season.summary()["pages_per_minute"]}')
+
+        return '\n'.join(lines) + '\n'
+
+    def export(self, directory=SCRAPER_METRICS_DIR, name='scrape_metrics'):
+        """Write <name>.json and <name>.prom into `directory`, returns both paths"""
+        if not directory:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        json_path = os.path.join(directory, f'{name}.json')
+        prom_path = os.path.join(directory, f'{name}.prom')
+
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+        # textfile collectors may read at any moment, so replace the file in one step
+        with open(prom_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(prom_path + '.tmp', prom_path)
+
+        logger.info(f"Metrics written to {json_path} and {prom_path}")
+        return json_path, prom_path
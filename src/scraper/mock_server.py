@@ -0,0 +1,396 @@
+import argparse
+import html
+import json
+import logging
+import random
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from .snapshot_store import SnapshotStore, SCRIPT_TAG
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+LEAGUE_PATH = '/pilka-nozna/polska/pko-bp-ekstraklasa'
+ARCHIVE_PATH = f'{LEAGUE_PATH}/archiwum/'
+
+TEAMS = [
+    'Legia Warszawa', 'Lech Poznań', 'Raków Częstochowa', 'Jagiellonia Białystok',
+    'Pogoń Szczecin', 'Górnik Zabrze', 'Śląsk Wrocław', 'Cracovia',
+    'Widzew Łódź', 'Zagłębie Lubin', 'Piast Gliwice', 'Korona Kielce',
+    'Radomiak Radom', 'Puszcza Niepołomice', 'Stal Mielec', 'Warta Poznań',
+]
+REFEREES = [('Szymon Marciniak', 'Pol'), ('Bartosz Frankowski', 'Pol'), ('Daniel Stefański', 'Pol')]
+
+# season results page renders that many rows and one more batch per 'show more' click
+ROWS_PER_PAGE = 20
+
+SEASON_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title></head><body>
+<div id="live-table"><div><div><div><a href="#" class="event__more">Pokaż więcej meczów</a></div></div></div>
+<div class="sportName soccer" id="rows"></div></div>
+<script>
+const matches = {matches};
+let shown = 0;
+const render = () => {{
+    const rows = document.getElementById('rows');
+    for (const [href, text] of matches.slice(shown, shown + {per_page})) {{
+        const link = document.createElement('a');
+        link.className = 'eventRowLink';
+        link.href = href;
+        link.textContent = text;
+        rows.appendChild(link);
+    }}
+    shown += {per_page};
+    if (shown >= matches.length) {{
+        document.querySelector('#live-table > div > div > div > a')?.remove();
+    }}
+}};
+document.querySelector('#live-table > div > div > div > a').addEventListener('click', (event) => {{
+    event.preventDefault();
+    setTimeout(render, {render_delay});
+}});
+render();
+</script>
+</body></html>"""
+
+STAT_ROW = """<div data-testid="wcl-statistics"><div data-testid="wcl-statistics-value">{home}</div>\
+<div data-testid="wcl-statistics-category">{category}</div><div data-testid="wcl-statistics-value">{away}</div></div>"""
+
+
+def slug(text):
+    # ascii only, like the real site urls
+    text = unicodedata.normalize('NFKD', text.lower().replace('ł', 'l'))
+    return ''.join(c if c.isalnum() else '-' for c in text.encode('ascii', 'ignore').decode())
+
+
+class MockSite:
+    """Deterministic fake league: seasons, fixtures and statistics derived from a seed"""
+
+    def __init__(self, base_url, seasons=3, matches_per_season=60, first_season=2021, seed=0):
+        self.base_url = base_url.rstrip('/')
+        self.seasons = [first_season + i for i in range(seasons)]
+        self.matches_per_season = matches_per_season
+        self.seed = seed
+
+    @staticmethod
+    def season_name(year):
+        return f"{year}/{year + 1}"
+
+    def season_path(self, year):
+        return f"{LEAGUE_PATH}-{year}-{year + 1}/"
+
+    def match_id(self, year, index):
+        return f"m{year}{index:04d}"
+
+    def match(self, mid):
+        year, index = int(mid[1:5]), int(mid[5:])
+        rng = random.Random(f"{self.seed}-{mid}")
+        home, away = rng.sample(TEAMS, 2)
+        # spread from late july to may, a later index kicks off on a later day
+        day = datetime(year, 7, 20) + timedelta(days=index * 300 // self.matches_per_season)
+        referee = REFEREES[index % len(REFEREES)]
+        possession = rng.randint(30, 70)
+        passes_home, passes_away = rng.randint(250, 600), rng.randint(250, 600)
+        done_home, done_away = int(passes_home * rng.uniform(0.6, 0.9)), int(passes_away * rng.uniform(0.6, 0.9))
+        return {
+            'mid': mid,
+            'home_team': home,
+            'away_team': away,
+            'date_time': f"{day:%d.%m.%Y} {rng.choice([15, 17, 20])}:30",
+            'home_score': rng.randint(0, 4),
+            'away_score': rng.randint(0, 3),
+            'referee': referee,
+            'stadium': (f"Stadion {home.split()[-1]}", home.split()[-1]),
+            'attendance': rng.randint(3000, 30000),
+            'sections': {
+                'Najważniejsze statystyki': [
+                    ('Oczekiwane gole (xG)', f"{rng.uniform(0.2, 3):.2f}", f"{rng.uniform(0.2, 3):.2f}"),
+                    ('Posiadanie piłki', f"{possession}%", f"{100 - possession}%"),
+                    ('Sytuacje bramkowe', rng.randint(2, 20), rng.randint(2, 20)),
+                ],
+                'Strzały': [
+                    ('Strzały na bramkę', rng.randint(0, 10), rng.randint(0, 10)),
+                    ('Strzały niecelne', rng.randint(0, 10), rng.randint(0, 10)),
+                ],
+                'Podania': [
+                    ('Podania', f"{done_home * 100 // passes_home}% ({done_home}/{passes_home})",
+                     f"{done_away * 100 // passes_away}% ({done_away}/{passes_away})"),
+                ],
+            },
+        }
+
+    def match_url(self, match):
+        return f"{self.base_url}/mecz/pilka-nozna/{slug(match['home_team'])}/{slug(match['away_team'])}/?mid={match['mid']}"
+
+    def archive_page(self):
+        items = ''.join(
+            f'<div class="archiveLatte__season"><a class="archiveLatte__text archiveLatte__text--clickable" '
+            f'href="{self.season_path(year)}">PKO BP Ekstraklasa {self.season_name(year)}</a></div>'
+            for year in reversed(self.seasons)
+        )
+        return f'<!DOCTYPE html><html><head><meta charset="utf-8"></head><body><div class="archive">{items}</div></body></html>'
+
+    def season_rows(self, year):
+        """[match url, row text] of every match of the season, newest first like the real list"""
+        # later index, later kick off
+        matches = [self.match(self.match_id(year, i)) for i in reversed(range(self.matches_per_season))]
+        return [[self.match_url(m), f"{m['home_team']} - {m['away_team']}"] for m in matches]
+
+    def season_page(self, year, render_delay=50):
+        return SEASON_PAGE.format(
+            title=html.escape(self.season_name(year)),
+            matches=json.dumps(self.season_rows(year), ensure_ascii=False),
+            per_page=ROWS_PER_PAGE,
+            render_delay=render_delay,
+        )
+
+    def summary_page(self, match):
+        e = html.escape
+        top = ''.join(
+            STAT_ROW.format(category=e(c), home=e(str(h)), away=e(str(a)))
+            for c, h, a in match['sections']['Najważniejsze statystyki']
+        )
+        referee, nationality = match['referee']
+        stadium, city = match['stadium']
+        return f"""<!DOCTYPE html><html><head><meta charset="utf-8"></head><body>
+<div class="fixedHeaderDuel__detailStatus">Koniec</div>
+<div class="duelParticipant">
+<div class="duelParticipant__startTime"><div>{match['date_time']}</div></div>
+<div class="duelParticipant__home"><div class="participant__participantName"><a href="#">{e(match['home_team'])}</a></div></div>
+<div class="detailScore__wrapper"><span>{match['home_score']}</span><span>-</span><span>{match['away_score']}</span></div>
+<div class="duelParticipant__away"><div class="participant__participantName"><a href="#">{e(match['away_team'])}</a></div></div>
+</div>
+<div class="stats">{top}</div>
+<div class="wcl-content_Vkmj9">
+<div class="wcl-infoLabelWrapper_DXbvw">Sędzia:</div><div class="wcl-infoValue_grawU"><span>{e(referee)}</span><span>({nationality})</span></div>
+<div class="wcl-infoLabelWrapper_DXbvw">Stadion:</div><div class="wcl-infoValue_grawU"><span>{e(stadium)}</span><span>({e(city)})</span></div>
+<div class="wcl-infoLabelWrapper_DXbvw">Frekwencja:</div><div class="wcl-infoValue_grawU">{match['attendance']}</div>
+</div>
+<script>fetch('/x/feed/df_st_1_{match['mid']}');</script>
+</body></html>"""
+
+    def statistics_page(self, match):
+        e = html.escape
+        sections = ''.join(
+            f'<div class="section"><div class="section__title">{e(title)}</div>'
+            + ''.join(STAT_ROW.format(category=e(c), home=e(str(h)), away=e(str(a))) for c, h, a in rows)
+            + '</div>'
+            for title, rows in match['sections'].items()
+        )
+        return f"""<!DOCTYPE html><html><head><meta charset="utf-8"></head><body>
+<div class="sectionsWrapper_mock">{sections}</div>
+</body></html>"""
+
+    def statistics_feed(self, match):
+        records = ['SA÷1¬', 'SE÷Mecz¬']
+        for title, rows in match['sections'].items():
+            records.append(f'SF÷{title}¬')
+            for category, home, away in rows:
+                records.append(f'SG÷{category}¬SH÷{home}¬SI÷{away}¬')
+        return '~'.join(records) + '~'
+
+    def route(self, path, query):
+        """(content type, body) for a request path or None when nothing lives there"""
+        if path == ARCHIVE_PATH:
+            return 'text/html', self.archive_page()
+
+        for year in self.seasons:
+            if path == f"{self.season_path(year)}wyniki/":
+                return 'text/html', self.season_page(year)
+
+        if path.startswith('/x/feed/df_st_1_'):
+            return 'text/plain', self.statistics_feed(self.match(path.rsplit('_', 1)[-1]))
+
+        mid = query.get('mid', [None])[0]
+        if path.startswith('/mecz/') and mid:
+            match = self.match(mid)
+            if '/szczegoly/statystyki/' in path:
+                return 'text/html', self.statistics_page(match)
+            return 'text/html', self.summary_page(match)
+
+        return None
+
+
+class RecordedSite(MockSite):
+    """Match pages recorded by the scraper in a SnapshotStore, served as one season
+
+    Summary and statistics pages are the rendered html the scraper saved, so
+    extraction and waits run against the real markup. Their scripts are removed
+    like in replay; a summary with a recorded statistics feed gets a fetch of it
+    instead, so 'feed' mode sees the feed request. Only match pages are recorded,
+    the archive and season list around them are still generated.
+    """
+
+    def __init__(self, base_url, store, first_season=2021):
+        self.store = store
+        self.recorded = [
+            match_id for match_id in store.match_ids()
+            if store.load_meta(match_id).get('latest', {}).get('summary')
+        ]
+        super().__init__(base_url, seasons=1, matches_per_season=len(self.recorded), first_season=first_season)
+
+    def season_rows(self, year):
+        rows = []
+        for match_id in self.recorded:
+            url = urlsplit(self.store.load_meta(match_id).get('url') or '')
+            path = url.path if url.path.startswith('/mecz/') else f"/mecz/pilka-nozna/{match_id}/"
+            rows.append([f"{self.base_url}{path}?mid={match_id}", match_id])
+        return rows
+
+    def recorded_page(self, match_id, kind):
+        page = self.store.load(match_id, kind)
+        if page is None:
+            return None
+        page = SCRIPT_TAG.sub('', page)
+        if kind == 'summary' and self.store.load_meta(match_id).get('latest', {}).get('statistics-feed'):
+            page = page.replace('</body>', f"<script>fetch('/x/feed/df_st_1_{match_id}');</script></body>", 1)
+        return page
+
+    def route(self, path, query):
+        if path.startswith('/x/feed/df_st_1_'):
+            feed = self.store.load(path.rsplit('_', 1)[-1], 'statistics-feed')
+            return None if feed is None else ('text/plain', feed)
+
+        mid = query.get('mid', [None])[0]
+        if path.startswith('/mecz/') and mid:
+            page = self.recorded_page(mid, 'statistics' if '/szczegoly/statystyki/' in path else 'summary')
+            return None if page is None else ('text/html', page)
+
+        return super().route(path, query)
+
+
+class MockFlashscoreServer:
+    """Local stand-in for flashscore.pl with latency, jitter and failure injection
+
+    Point the scraper at it with FLASHSCORE_BASE_URL=<server.base_url>.
+    `latency` and `jitter` are in milliseconds, `failure_rate` is the share of
+    page requests answered with 503, archive and season pages never fail.
+    With `recorded_dir`, a snapshot directory of an earlier scrape, match pages are
+    the recorded ones instead of generated.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, jitter=0, failure_rate=0.0,
+                 seasons=3, matches_per_season=60, seed=0, recorded_dir=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        if recorded_dir:
+            self.site = RecordedSite(self.base_url, SnapshotStore(root=recorded_dir))
+        else:
+            self.site = MockSite(self.base_url, seasons=seasons, matches_per_season=matches_per_season, seed=seed)
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _delay(self):
+        with self._lock:
+            jitter = self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0
+        return max(0, self.latency + jitter) / 1000
+
+    def _should_fail(self, path):
+        if path == ARCHIVE_PATH or path.endswith('/wyniki/'):
+            return False
+        with self._lock:
+            return self.rng.random() < self.failure_rate
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                with server._lock:
+                    server.requests += 1
+                time.sleep(server._delay())
+
+                if server._should_fail(parts.path):
+                    with server._lock:
+                        server.failures += 1
+                    self.send_error(503)
+                    return
+
+                try:
+                    page = server.site.route(parts.path, parse_qs(parts.query))
+                except ValueError:
+                    # match id which the fake league cannot decode
+                    page = None
+                if page is None:
+                    self.send_error(404)
+                    return
+
+                content_type, body = page
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='mock-flashscore', daemon=True)
+        self.thread.start()
+        logger.info(f"Mock flashscore serving on {self.base_url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake flashscore pages for offline scraper runs")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0, help="added delay per request in ms")
+    parser.add_argument('--jitter', type=float, default=0, help="random +/- delay in ms")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="share of match requests answered with 503")
+    parser.add_argument('--seasons', type=int, default=3)
+    parser.add_argument('--matches', type=int, default=60, help="matches per season")
+    parser.add_argument('--recorded', help="snapshot directory of an earlier scrape, serves its match pages")
+    args = parser.parse_args()
+
+    server = MockFlashscoreServer(
+        port=args.port, latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+        seasons=args.seasons, matches_per_season=args.matches, recorded_dir=args.recorded
+    )
+    server.start()
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import logging
+from collections import Counter, deque
+from urllib.parse import urlparse
+
+from .config import SCRAPER_BLOCK_RESOURCES, SCRAPER_EXTRA_BLOCKED_DOMAINS
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+# third party ads and analytics seen on flashscore.pl
+DEFAULT_BLOCKED_DOMAINS = (
+    'doubleclick.net',
+    'googlesyndication.com',
+    'googletagservices.com',
+    'googletagmanager.com',
+    'google-analytics.com',
+    'adservice.google.com',
+    'amazon-adsystem.com',
+    'adnxs.com',
+    'criteo.com',
+    'criteo.net',
+    'pubmatic.com',
+    'rubiconproject.com',
+    'taboola.com',
+    'outbrain.com',
+    'scorecardresearch.com',
+    'gemius.pl',
+    'hotjar.com',
+    'facebook.net',
+)
+
+# blocked requests kept in the summary, the newest ones
+BLOCKED_SAMPLE_SIZE = 50
+
+
+class NetworkProfile:
+    """Aborts requests the scraper does not need, attached with page.route / context.route
+
+    Counters are kept for the whole run, so one profile should be shared by every context.
+    Aborted requests are never downloaded, so the bytes they would have cost cannot be
+    measured; they are counted per type and domain and the newest are kept with their url.
+    Bytes are what the allowed requests really transferred, headers and encoded body as
+    reported by the browser, which also covers chunked responses without content-length.
+    """
+
+    def __init__(self, blocked_resource_types=SCRAPER_BLOCK_RESOURCES, blocked_domains=None):
+        if blocked_domains is None:
+            blocked_domains = DEFAULT_BLOCKED_DOMAINS + tuple(SCRAPER_EXTRA_BLOCKED_DOMAINS)
+        self.blocked_resource_types = set(blocked_resource_types)
+        self.blocked_domains = tuple(blocked_domains)
+
+        self.blocked_requests = 0
+        self.blocked_by_type = Counter()
+        self.blocked_by_domain = Counter()
+        self.blocked_sample = deque(maxlen=BLOCKED_SAMPLE_SIZE)
+        self.allowed_requests = 0
+        self.transferred_bytes = 0
+        self.transferred_by_type = Counter()
+
+    def _blocked_domain(self, url):
+        host = urlparse(url).hostname or ''
+        for domain in self.blocked_domains:
+            if host == domain or host.endswith('.' + domain):
+                return domain
+        return None
+
+    def should_block(self, resource_type, url):
+        if resource_type in self.blocked_resource_types:
+            return True
+        return self._blocked_domain(url) is not None
+
+    async def _handle_route(self, route):
+        request = route.request
+        try:
+            if self.should_block(request.resource_type, request.url):
+                self.blocked_requests += 1
+                self.blocked_by_type[request.resource_type] += 1
+                self.blocked_sample.append((request.resource_type, request.url))
+                domain = self._blocked_domain(request.url)
+                if domain:
+                    self.blocked_by_domain[domain] += 1
+                await route.abort()
+            else:
+                self.allowed_requests += 1
+                await route.continue_()
+        except Exception as e:
+            # page can be closed while the request is still routed
+            logger.debug(f"Route handling failed for {request.url}: {e}")
+
+    async def _on_request_finished(self, request):
+        try:
+            sizes = await request.sizes()
+        except Exception as e:
+            # sizes are gone once the page is closed
+            logger.debug(f"No transfer size for {request.url}: {e}")
+            return
+        transferred = max(sizes.get('responseHeadersSize', 0), 0) + max(sizes.get('responseBodySize', 0), 0)
+        self.transferred_bytes += transferred
+        self.transferred_by_type[request.resource_type] += transferred
+
+    async def attach(self, target):
+        """Apply the profile to a page or a whole browser context"""
+        await target.route("**/*", self._handle_route)
+        target.on("requestfinished", self._on_request_finished)
+
+    def summary(self):
+        return {
+            'blocked_requests': self.blocked_requests,
+            'blocked_by_type': dict(self.blocked_by_type),
+            'blocked_by_domain': dict(self.blocked_by_domain),
+            'blocked_sample': [f"{resource_type} {url}" for resource_type, url in self.blocked_sample],
+            'allowed_requests': self.allowed_requests,
+            'transferred_bytes': self.transferred_bytes,
+            'transferred_by_type': dict(self.transferred_by_type),
+        }
@@ -0,0 +1,176 @@
+import asyncio
+import inspect
+import logging
+import time
+
+from ..database.db_queries import DatabaseOperations
+from ..database.bulk_ingest import BulkIngestion
+from ..database.dimension_cache import DimensionCache
+from ..database.db_connect import connection, async_connection
+from .metrics import ScrapeMetrics
+from .config import (
+    SCRAPER_QUEUE_SIZE,
+    SCRAPER_BATCH_SIZE,
+    SCRAPER_FLUSH_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class MatchWriter:
+    """Database stage of the scrape pipeline
+
+    Scrapers `await put(match_data)` onto a bounded queue, so when the database
+    falls behind they wait instead of piling matches up in memory. The writer
+    commits micro-batches of `batch_size` matches, or whatever arrived within
+    `flush_interval` seconds, so every match is durable a few seconds after it is parsed.
+    Batches go in with BulkIngestion on a pooled async connection, so the event loop
+    keeps scraping while postgres works, a batch it rejects is retried match by match.
+    `write_batch(batch)` can be replaced with a plain function, which runs in a thread,
+    or a coroutine function. By default it inserts into postgres and returns the urls
+    which are in the database afterwards.
+    """
+
+    def __init__(self, frontier=None, queue_size=SCRAPER_QUEUE_SIZE, batch_size=SCRAPER_BATCH_SIZE,
+                 flush_interval=SCRAPER_FLUSH_INTERVAL, write_batch=None, metrics=None):
+        self.frontier = frontier
+        self.metrics = metrics or ScrapeMetrics()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_batch = write_batch or self._write_batch
+        # team, referee and stadium ids of the match by match fallback, kept between batches;
+        # bulk batches resolve them set based and never use it
+        self.cache = DimensionCache()
+        self.task = None
+        self.saved = 0
+        self.batches = 0
+
+    async def put(self, match_data):
+        await self.queue.put(match_data)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+        return self
+
+    async def close(self):
+        """Flush everything still queued and stop the writer, returns number of matches saved"""
+        if self.task is not None:
+            await self.queue.put(None)
+            await self.task
+            self.task = None
+        return self.saved
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _run(self):
+        finished = False
+        while not finished:
+            batch = []
+            deadline = None
+
+            while len(batch) < self.batch_size:
+                # first match of a batch may wait forever, the rest only until the deadline
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    match_data = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if match_data is None:
+                    finished = True
+                    break
+                batch.append(match_data)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch):
+        try:
+            if inspect.iscoroutinefunction(self.write_batch):
+                stored_urls = await self.write_batch(batch)
+            else:
+                stored_urls = await asyncio.to_thread(self.write_batch, batch)
+        except Exception as e:
+            # matches stay parsed in the frontier, the next run stores them
+            logger.error(f"Writing batch of {len(batch)} matches failed: {e}")
+            self.metrics.incr('db_failures', len(batch))
+            return
+
+        self.batches += 1
+        self.saved += len(stored_urls)
+        if self.frontier:
+            self.frontier.mark_stored([url for url in stored_urls if url])
+        logger.info(f"Committed batch {self.batches}: {len(stored_urls)}/{len(batch)} matches, {self.saved} saved in total")
+
+    async def _write_batch(self, batch):
+        # whole batch with COPY and set based upserts, one match at a time only when that fails
+        try:
+            with self.metrics.timer('db_bulk_insert'):
+                async with async_connection() as conn:
+                    async with conn.cursor() as cur:
+                        await BulkIngestion.ingest_async(cur, batch)
+            for match_data in batch:
+                self.metrics.incr('stored', season=match_data.get('season'))
+            return [match_data.get('url') for match_data in batch if match_data.get('match_id')]
+        except Exception as e:
+            logger.warning(f"Bulk insert of {len(batch)} matches failed, inserting one by one: {e}")
+            self.metrics.incr('db_bulk_fallbacks')
+            # rare path, stays synchronous so it shares the dimension cache with other writers
+            return await asyncio.to_thread(self._write_each, batch)
+
+    def _write_each(self, batch):
+        try:
+            with connection() as conn:
+                return self._insert_each(conn, batch)
+        except Exception:
+            # ids inserted in the rolled back transaction do not exist any more
+            self.cache.invalidate()
+            raise
+
+    def _insert_each(self, conn, batch):
+        stored_urls = []
+        with conn.transaction():
+            with conn.cursor() as cur:
+                # every unseen team, referee and stadium of the batch in one insert per table
+                self.cache.resolve_matches(cur, batch)
+                for match_data in batch:
+                    home_team = match_data.get('home_team', 'Unknown')
+                    away_team = match_data.get('away_team', 'Unknown')
+                    exists = DatabaseOperations.check_match_exist(
+                        cur,
+                        match_id=match_data.get('match_id'),
+                        home_team=match_data.get('home_team'),
+                        away_team=match_data.get('away_team'),
+                        date_time=match_data.get('date_time')
+                    )
+                    if exists:
+                        logger.info(f'Skipping already existing match, {home_team} vs {away_team}')
+                        stored_urls.append(match_data.get('url'))
+                        continue
+
+                    # savepoint per match, one bad match does not roll back the batch
+                    season = match_data.get('season')
+                    try:
+                        with self.metrics.timer('db_insert', season=season):
+                            with conn.transaction():
+                                DatabaseOperations.insert_match_data(cur, match_data, cache=self.cache)
+                    except Exception as e:
+                        logger.error(f"Error inserting match {home_team} vs {away_team}: {e}")
+                        self.metrics.incr('db_failures', season=season)
+                        continue
+                    self.metrics.incr('stored', season=season)
+                    stored_urls.append(match_data.get('url'))
+        return stored_urls
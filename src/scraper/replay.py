@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import json
+import logging
+
+from playwright.async_api import async_playwright
+from ..database.bulk_ingest import BulkIngestion
+from ..database.db_connect import connection
+from .get_statistics import Statistic
+from .snapshot_store import SnapshotStore, SCRIPT_TAG
+from .feed_extractor import parse_statistics
+from .wait_policy import WaitPolicy
+from .config import SCRAPER_SNAPSHOT_DIR, SCRAPER_EXTRACTION_MODE
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+async def extract_snapshot(page, store, match_id, mode=SCRAPER_EXTRACTION_MODE, waits=None):
+    """Run the normal extraction against stored html of one match"""
+    waits = waits or WaitPolicy(max_timeout=50)
+
+    summary_html = store.load(match_id, 'summary')
+    if summary_html is None:
+        logger.warning(f"No summary snapshot for {match_id}")
+        return None
+
+    await page.set_content(SCRIPT_TAG.sub('', summary_html))
+    if mode == 'dom':
+        match_data = await Statistic.extract_summary(page, waits=waits)
+    else:
+        match_data = await Statistic.extract_summary_script(page, waits=waits)
+
+    statistics_html = store.load(match_id, 'statistics')
+    statistics_feed = store.load(match_id, 'statistics-feed') if mode == 'feed' else None
+    if statistics_feed is not None:
+        match_data['detailed_statistic'] = parse_statistics(statistics_feed)
+    elif statistics_html is not None:
+        await page.set_content(SCRIPT_TAG.sub('', statistics_html))
+        if mode != 'dom':
+            match_data['detailed_statistic'] = await Statistic.extract_detailed_statistics_script(page, max_retries=1, waits=waits)
+        else:
+            match_data['detailed_statistic'] = await Statistic.extract_detailed_statistics(page, max_retries=1, waits=waits)
+    else:
+        match_data['detailed_statistic'] = {}
+
+    meta = store.load_meta(match_id)
+    match_data['match_id'] = match_id
+    match_data['url'] = meta.get('url')
+    return match_data
+
+
+async def replay(store=None, mode=SCRAPER_EXTRACTION_MODE, on_match=None):
+    """Re-parse every stored match without touching the network, returns number of matches parsed"""
+    store = store or SnapshotStore()
+    parsed = 0
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context()
+        # nothing in a snapshot is allowed to reach the network
+        await context.route("**/*", lambda route: route.abort())
+        page = await context.new_page()
+
+        try:
+            for match_id in store.match_ids():
+                try:
+                    match_data = await extract_snapshot(page, store, match_id, mode=mode)
+                except Exception as e:
+                    logger.error(f"Replay failed for {match_id}: {e}")
+                    continue
+
+                if match_data is None:
+                    continue
+                parsed += 1
+                if on_match:
+                    on_match(match_data)
+        finally:
+            await browser.close()
+
+    logger.info(f"Replayed {parsed} matches from {store.root}")
+    return parsed
+
+
+def save_matches(matches):
+    """Upsert replayed matches, running it again for the same snapshots changes nothing"""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            saved = BulkIngestion.ingest(cur, matches)
+    logger.info(f"Saved {saved}/{len(matches)} replayed matches")
+    return saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run match extraction against stored html snapshots")
+    parser.add_argument('--dir', default=SCRAPER_SNAPSHOT_DIR or 'snapshots', help="snapshot directory")
+    parser.add_argument('--mode', default=SCRAPER_EXTRACTION_MODE, choices=['script', 'dom', 'feed'])
+    parser.add_argument('--output', help="write parsed matches as json lines into this file")
+    parser.add_argument('--save', action='store_true', help="upsert the replayed matches into the database")
+    args = parser.parse_args()
+
+    matches = []
+    asyncio.run(replay(SnapshotStore(root=args.dir), mode=args.mode, on_match=matches.append))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for match_data in matches:
+                f.write(json.dumps(match_data, ensure_ascii=False) + '\n')
+        logger.info(f"Wrote {len(matches)} matches to {args.output}")
+
+    if args.save:
+        save_matches(matches)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,23 @@
 import asyncio
-import gc
+import inspect
 import logging
-
-from playwright.async_api import async_playwright
-from psycopg import connect
+import time
 
 from ..database.db_queries import DatabaseOperations
-from ..database.db_connect import CONNECTION_INFO
+from ..database.async_db_queries import AsyncDatabaseOperations
+from ..database.db_connect import async_connection, close_async_pool
 from .get_statistics import Statistic
+from .worker_pool import MatchWorkerPool
+from .network_profile import NetworkProfile
+from .wait_policy import WaitPolicy
+from .snapshot_store import SnapshotStore
+from .frontier import CrawlFrontier
+from .pipeline import MatchWriter
+from .metrics import ScrapeMetrics
+from .browser_manager import BrowserManager
+from .feed_extractor import FeedCapture
+from .config import FLASHSCORE_BASE_URL, SCRAPER_SNAPSHOT_DIR, SCRAPER_EXTRACTION_MODE
+from .config import SCRAPER_CONCURRENCY, SCRAPER_RATE, SCRAPER_BURST, SCRAPER_METRICS_DIR
 
 
 logger = logging.getLogger(__name__)
@@ -19,32 +29,47 @@ logging.basicConfig(
 class Scraper:
     
     @staticmethod
-    async def scrape_single_match(browser, match_href, match_num, total_matches):
+    def match_id_from_url(match_href):
+        if '?mid=' in match_href:
+            return match_href.split('?mid=')[-1]
+        elif 'mid=' in match_href:
+            return match_href.split('mid=')[-1]
+        return None
+    
+    @staticmethod
+    async def scrape_single_match(context, match_href, match_num, total_matches, waits=None, snapshots=None, frontier=None, metrics=None):
+        waits = waits or WaitPolicy()
+        metrics = metrics or ScrapeMetrics()
         match_page = None
+        started = time.monotonic()
         try:
             logger.info(f"Loading match {match_num}/{total_matches}")
 
-            match_page = await browser.new_page()
-            await match_page.goto(match_href, wait_until="domcontentloaded", timeout=30000)
+            match_page = await context.new_page()
+            # feed responses are only seen by listeners attached before navigation
+            feed = FeedCapture().attach(match_page) if SCRAPER_EXTRACTION_MODE == 'feed' else None
+            with metrics.timer('goto'):
+                await match_page.goto(match_href, wait_until="domcontentloaded", timeout=30000)
+            metrics.incr('pages')
+            if frontier:
+                frontier.mark_fetched(match_href)
             
             # wait for teams elements to be present before extracting data
-            try:
-                await match_page.wait_for_selector('.duelParticipant__home', timeout=5000)
-                await asyncio.sleep(0.5)
-            except Exception as e:
-                logger.warning(f"Team elements not found quickly for match {match_num}: {e}")
-                await asyncio.sleep(1)
+            with metrics.timer('wait'):
+                teams_found = await waits.selector(match_page, '.duelParticipant__home', name='match teams', timeout=5000)
+            if not teams_found:
+                logger.warning(f"Team elements not found quickly for match {match_num}")
             
             logger.info(f"Successfully loaded match {match_num}")
             
             # get match data
-            match_data = await Statistic.extract_match_data(match_page)
+            match_id = Scraper.match_id_from_url(match_href)
+            with metrics.timer('extraction'):
+                match_data = await Statistic.extract_match_data(match_page, waits=waits, snapshots=snapshots, match_id=match_id, feed=feed, metrics=metrics)
             match_data['url'] = match_href
 
-            if '?mid=' in match_href:
-                match_data['match_id'] = match_href.split('?mid=')[-1]
-            elif 'mid=' in match_href:
-                match_data['match_id'] = match_href.split('mid=')[-1]
+            if match_id:
+                match_data['match_id'] = match_id
 
             
             await match_page.close() 
@@ -52,67 +77,28 @@ class Scraper:
                 
         except Exception as e:
             logger.error(f"Error loading match {match_num}: {str(e)}")
+            metrics.incr('failures')
             if match_page and not match_page.is_closed():
                 try:
                     await match_page.close()
                 except:
                     pass
             return None
-        
-    @staticmethod
-    def save_season_to_database(season_matches, season_name):
-        """Save all matches from one season into database"""
-        saved_count = 0
-        try:
-            with connect(CONNECTION_INFO) as conn: 
-                with conn.cursor() as cur:
-                    for idx, match_data in enumerate(season_matches):
-                        try:
-                            home_team = match_data.get('home_team', 'Unknown')
-                            away_team = match_data.get('away_team', 'Unknown')
-                            logger.info(f"Inserting match {idx+1}/{len(season_matches)}: {home_team} vs {away_team}")
-                            # check if match already exists
-                            exists = DatabaseOperations.check_match_exist(
-                                cur,
-                                match_id=match_data.get('match_id'),
-                                home_team=match_data.get('home_team'),
-                                away_team=match_data.get('away_team'),
-                                date_time=match_data.get('date_time')
-                            )
-                            # counting the duplicates when is 4 or more matches already exist close connection and saved matches
-                            if exists:
-                                duplicates += 1
-                                logger.info(f'Skipping already existing match, {home_team} vs {away_team}')
-                                if duplicates >= 4:
-                                    logger.info(f'We got {duplicates}, stopping season scraping')
-                                    conn.commit()
-                                    return saved_count
-                                continue
-                            
-                            # reset counter when we got match
-                            duplicates = 0
-                            DatabaseOperations.insert_match_data(cur, match_data)
-                            saved_count += 1
-                        except Exception as e:
-                            logger.error(f"Error inserting match {home_team} vs {away_team}: {e}")
-                            logger.error(f"Match data keys: {match_data.keys()}")
-                            continue
-                    conn.commit()
-            logger.info(f"Saved {saved_count}/{len(season_matches)} matches for season {season_name}")
-        except Exception as e:
-            logger.error(f"Database error for season {season_name}: {e}")
-        return saved_count                    
-    
-async def scraper(start_season_year=2012):
+        finally:
+            metrics.observe('match', time.monotonic() - started)
+
+
+ARCHIVE_PATH = "/pilka-nozna/polska/pko-bp-ekstraklasa/archiwum/"
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)  
-        page = await browser.new_page()
-      
-        url = "https://www.flashscore.pl/pilka-nozna/polska/pko-bp-ekstraklasa/archiwum/"
 
-        await page.goto(url, wait_until="networkidle")
-        await asyncio.sleep(2)
+async def list_seasons(browser_manager, waits, start_season_year=2012, end_season_year=None, base_url=FLASHSCORE_BASE_URL):
+    """Seasons from the archive page with start year in the given range"""
+    listing_context = await browser_manager.new_context()
+    try:
+        page = await listing_context.new_page()
+
+        await page.goto(f"{base_url}{ARCHIVE_PATH}", wait_until="networkidle")
+        await waits.selector(page, ".archiveLatte__season", name='archive seasons')
         
         # get for every one season links
         season_links = await page.query_selector_all(".archiveLatte__season")
@@ -135,7 +121,7 @@ async def scraper(start_season_year=2012):
                 else:
                     start_year = year_text
                 
-                season_url = f"https://www.flashscore.pl{href}wyniki/"
+                season_url = f"{base_url}{href}wyniki/"
                 # append into list
                 seasons_data.append({
                     'index': i,
@@ -147,136 +133,264 @@ async def scraper(start_season_year=2012):
                 logger.info(f"{i+1}. {text.strip()}  year: {start_year}")
                 
         logger.info(f"Total found seasons: {len(seasons_data)}")
+    finally:
+        await listing_context.close()
+
+    # seasons by year
+    return [
+        s for s in seasons_data 
+        if s['year'].isdigit() and int(s['year']) >= start_season_year
+        and (end_season_year is None or int(s['year']) <= end_season_year)
+    ]
+
+
+async def stream_match_urls(page, waits):
+    """Yield lists of match hrefs as they appear, the first list right away and one more per 'show more' click
+
+    Newest matches come first, so callers can start scraping them while older rows still load.
+    """
+    seen = 0
+    
+    # adverts opened by the season page would steal focus from the button
+    def close_popup(popup):
+        logger.info("Closed add")
+        asyncio.ensure_future(popup.close())
+    page.on("popup", close_popup)
+    
+    try:
+        while True:
+            # hrefs of rows which were not reported yet, rows are only ever appended
+            hrefs = await page.evaluate(
+                "(seen) => Array.from(document.querySelectorAll('.eventRowLink')).slice(seen).map((row) => row.getAttribute('href'))",
+                seen
+            )
+            seen += len(hrefs)
+            new_urls = [href for href in hrefs if href]
+            if new_urls:
+                logger.info(f"Founded {len(new_urls)} new matches ({seen} in total)")
+                yield new_urls
+            
+            # found out button to show more matches 
+            try:
+                show_more = await page.query_selector('//*[@id="live-table"]/div[1]/div/div/a')
+
+                if show_more:
+                    await show_more.click()
+                    rows_after = await waits.row_count_change(page, '.eventRowLink', seen, name='show more')
+                    logger.info(f"Founded button to show more ({seen} -> {rows_after} matches)")
+                    if rows_after == seen:
+                        logger.warning("No new matches appeared after show more, stopping expansion")
+                        break
+                    
+                else:
+                    logger.info("All matches loaded")
+                    break
+
+            except Exception as e:
+                logger.error(f"Error with clicking into button: {e}")
+                break
+    finally:
+        page.remove_listener("popup", close_popup)
+
+
+async def collect_match_urls(page, waits):
+    """Expand the season results with 'show more' and return all match hrefs"""
+    match_urls = []
+    async for new_urls in stream_match_urls(page, waits):
+        match_urls.extend(new_urls)
+    logger.info(f'Founded {len(match_urls)} matches')
+    return match_urls
 
-        # seasons by year
-        filtered_seasons = [
-            s for s in seasons_data 
-            if s['year'].isdigit() and int(s['year']) >= start_season_year
-        ]
 
-        res = [d.get('href') for d in filtered_seasons if 'href' in d]
-        season_names = [d.get('text', f'Season {i}') for i, d in enumerate(filtered_seasons)]
+async def scrape_season(browser_manager, season, on_match, waits, frontier, snapshots=None,
+                        concurrency=SCRAPER_CONCURRENCY, rate=SCRAPER_RATE, burst=SCRAPER_BURST, metrics=None,
+                        known_matches=None):
+    """Scrape every new match of one season, `on_match` gets each parsed match dict
+
+    `known_matches` is a (match ids, match keys) pair to use instead of reading them from the database.
+    Returns number of matches handed to `on_match`.
+    """
+    season_name = season['text']
+    metrics = metrics or ScrapeMetrics()
+    produced = 0
+    
+    async def emit(match_data):
+        nonlocal produced
+        produced += 1
+        # async consumers apply backpressure, the scrape waits while they are full
+        result = on_match(match_data)
+        if inspect.isawaitable(result):
+            await result
+    
+    # all match pages of the season share one isolated context
+    context = await browser_manager.new_context()
+    network_profile = browser_manager.network_profile
+    bytes_before = network_profile.transferred_bytes if network_profile else 0
+    metrics.start_season(season_name)
+    try:
+        # everything already in the database is loaded once, checks below are set lookups
+        if known_matches is None:
+            async with async_connection() as conn:
+                async with conn.cursor() as cur:
+                    known_matches = await AsyncDatabaseOperations.load_known_matches(cur)
+        known_ids, known_keys = known_matches
         
-        await browser.close()
+        # matches scraped in an earlier run but never saved go first
+        leftovers = frontier.parsed_matches(season_name)
+        for match_data in leftovers:
+            await emit(match_data)
+        logger.info(f"{len(leftovers)} matches from earlier runs waiting for database")
         
-        total_saved_all_seasons = 0  # total across all seasons
+        page = await context.new_page()
+        logger.info(f"Starting season: {season_name}")
         
-        for season_idx, (link, season_name) in enumerate(zip(res, season_names)):
-            logger.info(f"Starting season {season_idx+1}/{len(res)}: {season_name}")
-            
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            season_matches = []
-            logger.info(f"Starting season: {season_name}")
-            
-            await page.goto(link, wait_until="networkidle")
-            await asyncio.sleep(1)
-            
-            # exit extra pages like adds pages
-            while True:
+        await page.goto(season['href'], wait_until="networkidle")
+        await waits.selector(page, '.eventRowLink', name='season matches')
+        
+        discovered = 0
+        
+        async def new_match_urls():
+            """Matches to scrape, fed to the pool while the season list is still expanding"""
+            nonlocal discovered
+            async for found_urls in stream_match_urls(page, waits):
+                # skip matches finished in earlier runs or already in the database
+                match_urls = frontier.discover(found_urls, season_name)
+                known_urls = [url for url in match_urls if Scraper.match_id_from_url(url) in known_ids]
+                if known_urls:
+                    frontier.mark_stored(known_urls)
+                match_urls = [url for url in match_urls if Scraper.match_id_from_url(url) not in known_ids]
+                logger.info(f"{len(found_urls) - len(match_urls)} of {len(found_urls)} new rows already done, {len(match_urls)} queued")
                 
-                if len(page.context.pages) > 1:
-                    for extra_page in page.context.pages[1:]:
-                        await extra_page.close()
-                    logger.info("Closed add")
-                    
-                # found out button to show more matches 
-                try:
-                    show_more = await page.query_selector('//*[@id="live-table"]/div[1]/div/div/a')
-
-                    if show_more:
-                        await asyncio.sleep(0.5)
-                        await show_more.click()
-                        await asyncio.sleep(1.5)
-                        logger.info("Founded button to show more")
-                        
-                    else:
-                        logger.info("All matches loaded")
-                        break
+                discovered += len(match_urls)
+                for url in match_urls:
+                    yield url
+        
+        # matches are scraped by a pool of pages, rate limited per host
+        duplicates = 0
 
-                except Exception as e:
-                    logger.error(f"Error with clicking into button: {e}")
-                    break
-                    
-            # found match links and extract hrefs immediately
-            match_elements = await page.query_selector_all('.eventRowLink')
-            logger.info(f'Founded {len(match_elements)} matches')
+        async def handle_result(url, match_data):
+            nonlocal duplicates
 
-            match_urls = []
+            if not match_data:
+                logger.error(f"Match {url} failed to scrape")
+                frontier.mark_failed(url, "scrape failed")
+                return True
+
+            if not match_data.get('home_team') or not match_data.get('away_team'):
+                logger.warning(f"Skipping match with missing team data: Home={match_data.get('home_team')}, Away={match_data.get('away_team')}, URL={match_data.get('url')}")
+                frontier.mark_failed(url, "missing team data")
+                return True
+            
+            # check if match already exists in database, stored under another id
+            key = DatabaseOperations.match_key(
+                match_data.get('home_team'),
+                match_data.get('away_team'),
+                match_data.get('date_time')
+            )
             
-            for match in match_elements:
-                try:  
-                    href = await match.get_attribute('href')
-                    if href:
-                        match_href = href
-                        match_urls.append(match_href)
-                        
-                except Exception as e:
-                    logger.error(f"Error extracting href: {e}")
+            if key in known_keys:
+                duplicates += 1
+                frontier.mark_stored([url])
+                logger.info(f"Match already in DB: {match_data.get('home_team')} vs {match_data.get('away_team')} ({duplicates} consecutive duplicates)")
+                if duplicates >= 4:
+                    logger.info(f"Found {duplicates} consecutive duplicates, stopping season {season_name}")
+                    return False
+                return True
             
-            # process matches sequentially (one by one) for reliability
-            total_matches = len(match_urls)
+            # reset counter when we got new match
             duplicates = 0
+            known_keys.add(key)
             
-            with connect(CONNECTION_INFO) as conn:
-                with conn.cursor() as cur:
-                    for match_idx, url in enumerate(match_urls):
-                        logger.info(f"Processing match {match_idx+1}/{total_matches}")
-                        
-                        match_data = await Scraper.scrape_single_match(browser, url, match_idx + 1, total_matches)
-                        
-                        if match_data:
-                            if not match_data.get('home_team') or not match_data.get('away_team'):
-                                logger.warning(f"Skipping match with missing team data: Home={match_data.get('home_team')}, Away={match_data.get('away_team')}, URL={match_data.get('url')}")
-                                continue
-                            
-                            # check if match already exists in database
-                            exists = DatabaseOperations.check_match_exist(
-                                cur,
-                                home_team=match_data.get('home_team'),
-                                away_team=match_data.get('away_team'),
-                                date_time=match_data.get('date_time')
-                            )
-                            
-                            if exists:
-                                duplicates += 1
-                                logger.info(f"Match already in DB: {match_data.get('home_team')} vs {match_data.get('away_team')} ({duplicates} consecutive duplicates)")
-                                if duplicates >= 4:
-                                    logger.info(f"Found {duplicates} consecutive duplicates, stopping season {season_name}")
-                                    break
-                                continue
-                            
-                            # reset counter when we got new match
-                            duplicates = 0
-                            
-                            # validate detailed statistics were extracted
-                            ds = match_data.get('detailed_statistic', {})
-                            if len(ds) == 0:
-                                logger.warning(f"Match {match_idx+1} has empty detailed_statistic!")
-                            
-                            match_data['season'] = season_name
-                            season_matches.append(match_data)
-                            logger.info(f"Match {match_idx+1} scraped successfully (detailed sections: {len(ds)})")
-                        else:
-                            logger.error(f"Match {match_idx+1} failed to scrape")
-                        
-                        # delay between matches to avoid rate limiting
-                        await asyncio.sleep(2)
-                
-            # season to database
-            saved = Scraper.save_season_to_database(season_matches, season_name)
-            total_saved_all_seasons += saved
-            logger.info(f"Season {season_name} complete: {saved}/{len(season_matches)} saved")
+            # validate detailed statistics were extracted
+            ds = match_data.get('detailed_statistic', {})
+            if len(ds) == 0:
+                logger.warning(f"Match {url} has empty detailed_statistic!")
             
-            await browser.close()
-            logger.info(f"Closed browser for season {season_name} (fresh start for next season)")
+            match_data['season'] = season_name
+            frontier.mark_parsed(url, match_data)
+            await emit(match_data)
+            logger.info(f"Match {url} scraped successfully (detailed sections: {len(ds)})")
+            return True
+
+        # short queue keeps expansion only a little ahead of scraping, a run which stops
+        # on duplicates does not have to expand the whole season first
+        pool = MatchWorkerPool(
+            context,
+            lambda ctx, url, match_num: Scraper.scrape_single_match(ctx, url, match_num, discovered, waits=waits, snapshots=snapshots, frontier=frontier, metrics=metrics),
+            concurrency=concurrency,
+            rate=rate,
+            burst=burst,
+            queue_size=concurrency * 2,
+        )
+        await pool.run(new_match_urls(), handle_result)
+        
+    finally:
+        await context.close()
+        if network_profile:
+            metrics.incr('bytes', network_profile.transferred_bytes - bytes_before, season=season_name)
+        metrics.end_season(season_name)
+        logger.info(f"Closed context for season {season_name}")
+    
+    return produced
+
+
+async def scraper(start_season_year=2012, concurrency=SCRAPER_CONCURRENCY, rate=SCRAPER_RATE, burst=SCRAPER_BURST,
+                  network_profile=None, waits=None, snapshots=None, frontier=None, browser_manager=None,
+                  end_season_year=None, metrics=None, writer=None, known_matches=None, base_url=FLASHSCORE_BASE_URL,
+                  metrics_dir=SCRAPER_METRICS_DIR):
+
+    # images, fonts, ads and trackers are aborted, counters cover the whole run
+    if network_profile is None:
+        network_profile = NetworkProfile()
+    # page conditions are awaited instead of fixed sleeps, timings kept for the whole run
+    waits = waits or WaitPolicy()
+    # rendered pages are kept for replay when a snapshot directory is configured
+    if snapshots is None and SCRAPER_SNAPSHOT_DIR:
+        snapshots = SnapshotStore()
+    # crawl state survives crashes, reruns only fetch what is not stored yet
+    frontier = frontier or CrawlFrontier()
+    # stage timings and counters per season, exported into metrics_dir when the run ends, None skips the export
+    metrics = metrics or ScrapeMetrics()
+
+    # one browser serves the listing and every season, callers can keep it alive between runs
+    own_browser = browser_manager is None
+    browser_manager = browser_manager or BrowserManager()
+    browser_manager.network_profile = network_profile
+    await browser_manager.start()
+
+    try:
+        seasons = await list_seasons(browser_manager, waits, start_season_year, end_season_year, base_url=base_url)
+        
+        # parsed matches stream into the database in small batches while scraping goes on
+        writer = writer or MatchWriter(frontier=frontier, metrics=metrics)
+        writer.start()
+        try:
+            for season_idx, season in enumerate(seasons):
+                season_name = season['text']
+                logger.info(f"Starting season {season_idx+1}/{len(seasons)}: {season_name}")
+                
+                produced = await scrape_season(
+                    browser_manager, season, writer.put, waits, frontier,
+                    snapshots=snapshots, concurrency=concurrency, rate=rate, burst=burst, metrics=metrics,
+                    known_matches=known_matches
+                )
+                logger.info(f"Season {season_name} complete: {produced} matches sent to database ({writer.saved} saved so far)")
+        finally:
+            total_saved_all_seasons = await writer.close()
             
-            season_matches.clear()
-            gc.collect()
         logger.info(f"Scraping complete {total_saved_all_seasons}")
+        logger.info(f"Network profile: {network_profile.summary()}")
+        logger.info(f"Waits: {waits.summary()}")
+        logger.info(f"Frontier: {frontier.counts()}")
         
         return total_saved_all_seasons
+    
+    finally:
+        metrics.export(directory=metrics_dir)
+        # pooled async connections belong to this event loop
+        await close_async_pool()
+        if own_browser:
+            await browser_manager.stop()
                 
 if __name__ == "__main__":
-    asyncio.run(scraper)
\ No newline at end of file
+    asyncio.run(scraper())
@@ -0,0 +1,127 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+
+from .config import SCRAPER_SNAPSHOT_DIR, SCRAPER_SNAPSHOT_COMPRESSION
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+# stored pages are already rendered, their scripts would only try to reach the network
+SCRIPT_TAG = re.compile(r'<script\b[^>]*>.*?</script>', re.IGNORECASE | re.DOTALL)
+
+
+class SnapshotStore:
+    """Compressed rendered HTML of match pages on disk, addressed by match id and content hash
+
+    Layout: <root>/<shard>/<match_id>/<kind>-<sha256 prefix>.html.<gz|zst>
+    where shard is the first two hex chars of the match id hash, so no directory
+    ends up with thousands of entries. The same content is written only once.
+    """
+
+    def __init__(self, root=SCRAPER_SNAPSHOT_DIR, compression=SCRAPER_SNAPSHOT_COMPRESSION):
+        if compression == 'zstd' and zstandard is None:
+            logger.warning("zstandard is not installed, falling back to gzip snapshots")
+            compression = 'gzip'
+        if compression not in ('gzip', 'zstd'):
+            raise ValueError(f"Unknown snapshot compression: {compression}")
+
+        self.root = root
+        self.compression = compression
+        self.extension = 'zst' if compression == 'zstd' else 'gz'
+
+    def _match_dir(self, match_id):
+        shard = hashlib.sha1(match_id.encode()).hexdigest()[:2]
+        return os.path.join(self.root, shard, match_id)
+
+    def _compress(self, data):
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    @staticmethod
+    def _decompress(path, data):
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise RuntimeError(f"zstandard is needed to read {path}")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def save(self, match_id, kind, html, url=None):
+        """Store html for one page of the match, returns the snapshot path"""
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:16]
+
+        match_dir = self._match_dir(match_id)
+        os.makedirs(match_dir, exist_ok=True)
+
+        filename = f"{kind}-{digest}.html.{self.extension}"
+        path = os.path.join(match_dir, filename)
+        if not os.path.exists(path):
+            # write to temp file first, so a crash never leaves half a snapshot behind
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(self._compress(data))
+            os.replace(tmp_path, path)
+
+        # meta keeps the url and which snapshot of every page is the newest
+        meta = self.load_meta(match_id)
+        meta.setdefault('latest', {})[kind] = filename
+        if url:
+            meta['url'] = url
+        meta_path = os.path.join(match_dir, 'meta.json')
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        return path
+
+    def load(self, match_id, kind):
+        """Newest html stored for that page of the match or None"""
+        filename = self.load_meta(match_id).get('latest', {}).get(kind)
+        if filename is None:
+            return None
+
+        path = os.path.join(self._match_dir(match_id), filename)
+        with open(path, 'rb') as f:
+            return self._decompress(path, f.read()).decode('utf-8')
+
+    def load_meta(self, match_id):
+        meta_path = os.path.join(self._match_dir(match_id), 'meta.json')
+        if not os.path.exists(meta_path):
+            return {'match_id': match_id}
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def match_ids(self):
+        if not os.path.isdir(self.root):
+            return
+        for shard in sorted(os.listdir(self.root)):
+            shard_dir = os.path.join(self.root, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for match_id in sorted(os.listdir(shard_dir)):
+                yield match_id
+
+    async def capture(self, page, match_id, kind):
+        """Save the currently rendered page, never fails the scrape"""
+        if not match_id:
+            return None
+        try:
+            html = await page.content()
+            url = page.url if kind == 'summary' else None
+            return await asyncio.to_thread(self.save, match_id, kind, html, url)
+        except Exception as e:
+            logger.warning(f"Could not store {kind} snapshot for {match_id}: {e}")
+            return None
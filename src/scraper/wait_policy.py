@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict, Counter
+
+from .config import SCRAPER_WAIT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class WaitPolicy:
+    """Waits for concrete page conditions instead of fixed sleeps
+
+    Every wait has a name, its real duration is kept in `timings` and
+    waits which ran into their timeout are counted in `timeouts`.
+    Waits never raise, they return False (or the unchanged value) on timeout.
+    `max_timeout` caps every wait, replay of static snapshots uses it to never wait long.
+    """
+
+    def __init__(self, timeout=SCRAPER_WAIT_TIMEOUT, max_timeout=None):
+        self.timeout = timeout
+        self.max_timeout = max_timeout
+        self.timings = defaultdict(list)
+        self.timeouts = Counter()
+
+    def _timeout(self, timeout):
+        # 0 is a valid timeout, only None falls back to the default
+        timeout = self.timeout if timeout is None else timeout
+        if self.max_timeout is not None:
+            timeout = min(timeout, self.max_timeout)
+        return timeout
+
+    async def _timed(self, name, awaitable):
+        start = time.monotonic()
+        try:
+            await awaitable
+            return True
+        except Exception as e:
+            self.timeouts[name] += 1
+            logger.debug(f"Wait '{name}' gave up: {e}")
+            return False
+        finally:
+            self.timings[name].append(time.monotonic() - start)
+
+    async def selector(self, page, selector, name=None, timeout=None, state='attached'):
+        """Wait until `selector` is present on the page"""
+        return await self._timed(
+            name or selector,
+            page.wait_for_selector(selector, state=state, timeout=self._timeout(timeout))
+        )
+
+    async def row_count_change(self, page, selector, previous, name=None, timeout=None):
+        """Wait until the number of elements matching `selector` differs from `previous`, returns the new count"""
+        changed = await self._timed(
+            name or f"count {selector}",
+            page.wait_for_function(
+                "([selector, previous]) => document.querySelectorAll(selector).length !== previous",
+                arg=[selector, previous],
+                timeout=self._timeout(timeout)
+            )
+        )
+        if not changed:
+            return previous
+        return await page.evaluate("(selector) => document.querySelectorAll(selector).length", selector)
+
+    async def load_state(self, page, state='networkidle', name=None, timeout=None):
+        return await self._timed(
+            name or state,
+            page.wait_for_load_state(state, timeout=self._timeout(timeout))
+        )
+
+    async def requests_idle(self, page, url_part, idle_time=0.5, name=None, timeout=None):
+        """Wait until no request containing `url_part` was in flight for `idle_time` seconds"""
+        in_flight = set()
+        last_activity = time.monotonic()
+
+        def started(request):
+            nonlocal last_activity
+            if url_part in request.url:
+                in_flight.add(request)
+                last_activity = time.monotonic()
+
+        def finished(request):
+            nonlocal last_activity
+            if request in in_flight:
+                in_flight.discard(request)
+                last_activity = time.monotonic()
+
+        async def idle():
+            while in_flight or time.monotonic() - last_activity < idle_time:
+                await asyncio.sleep(0.05)
+
+        page.on("request", started)
+        page.on("requestfinished", finished)
+        page.on("requestfailed", finished)
+        try:
+            return await self._timed(
+                name or f"idle {url_part}",
+                asyncio.wait_for(idle(), self._timeout(timeout) / 1000)
+            )
+        finally:
+            page.remove_listener("request", started)
+            page.remove_listener("requestfinished", finished)
+            page.remove_listener("requestfailed", finished)
+
+    def summary(self):
+        result = {}
+        for name, durations in self.timings.items():
+            result[name] = {
+                'count': len(durations),
+                'total': round(sum(durations), 3),
+                'avg': round(sum(durations) / len(durations), 3),
+                'max': round(max(durations), 3),
+                'timeouts': self.timeouts.get(name, 0),
+            }
+        return result
@@ -0,0 +1,215 @@
+import asyncio
+import inspect
+import logging
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+from .config import (
+    SCRAPER_CONCURRENCY,
+    SCRAPER_RATE,
+    SCRAPER_BURST,
+    SCRAPER_ERROR_WINDOW,
+    SCRAPER_ERROR_THRESHOLD,
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second with bursts up to `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate):
+        self._refill()
+        self.rate = rate
+
+    async def acquire(self):
+        # lock keeps waiters in order, so nobody starves while others refill
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """One token bucket for every host we talk to"""
+
+    def __init__(self, rate=SCRAPER_RATE, burst=SCRAPER_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+
+    def set_rate(self, rate):
+        self.rate = rate
+        for bucket in self.buckets.values():
+            bucket.set_rate(rate)
+
+    async def acquire(self, url):
+        host = urlparse(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+            self.buckets[host] = bucket
+        await bucket.acquire()
+
+
+class AdaptiveController:
+    """Backs off concurrency and rate when failures rise, recovers slowly when pages load fine"""
+
+    def __init__(self, max_concurrency=SCRAPER_CONCURRENCY, max_rate=SCRAPER_RATE,
+                 window=SCRAPER_ERROR_WINDOW, error_threshold=SCRAPER_ERROR_THRESHOLD,
+                 min_concurrency=1, min_rate=0.1):
+        self.max_concurrency = max_concurrency
+        self.max_rate = max_rate
+        self.min_concurrency = min_concurrency
+        self.min_rate = min(min_rate, max_rate)
+        self.error_threshold = error_threshold
+        self.outcomes = deque(maxlen=window)
+
+        self.concurrency = max_concurrency
+        self.rate = max_rate
+
+    def record(self, success):
+        self.outcomes.append(bool(success))
+        if len(self.outcomes) < self.outcomes.maxlen:
+            return
+
+        error_rate = self.outcomes.count(False) / len(self.outcomes)
+
+        if error_rate > self.error_threshold:
+            self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+            self.rate = max(self.min_rate, self.rate / 2)
+            logger.warning(f"Error rate {error_rate:.0%}, backing off to {self.concurrency} pages at {self.rate:.2f}/s")
+            self.outcomes.clear()
+        elif error_rate == 0 and (self.concurrency < self.max_concurrency or self.rate < self.max_rate):
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            self.rate = min(self.max_rate, self.rate * 1.5)
+            logger.info(f"Pages loading fine, raising to {self.concurrency} pages at {self.rate:.2f}/s")
+            self.outcomes.clear()
+
+
+class MatchWorkerPool:
+    """Scrapes match urls with a bounded number of workers sharing one browser context
+
+    `handler(context, url, match_num)` scrapes one match and returns its data or None,
+    `on_result(url, match_data)` gets every outcome and can return False to stop the pool,
+    it may be a coroutine function, a slow consumer then holds the worker back.
+    """
+
+    def __init__(self, context, handler, concurrency=SCRAPER_CONCURRENCY, rate=SCRAPER_RATE,
+                 burst=SCRAPER_BURST, controller=None, limiter=None, queue_size=0):
+        self.context = context
+        self.handler = handler
+        self.controller = controller or AdaptiveController(max_concurrency=concurrency, max_rate=rate)
+        self.limiter = limiter or HostRateLimiter(rate=self.controller.rate, burst=burst)
+        # bounded queue makes an async url producer wait for the workers, 0 means unbounded
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.stopped = False
+        self.closed = False
+        self.processed = 0
+
+    async def _worker(self, worker_idx, on_result):
+        while not self.stopped:
+            # workers above the current limit stay idle until the controller recovers
+            if worker_idx >= self.controller.concurrency:
+                if self.closed and self.queue.empty():
+                    return
+                await asyncio.sleep(0.5)
+                continue
+
+            try:
+                match_num, url = await asyncio.wait_for(self.queue.get(), timeout=0.5)
+            except asyncio.TimeoutError:
+                if self.closed:
+                    return
+                continue
+
+            try:
+                if self.stopped:
+                    return
+
+                await self.limiter.acquire(url)
+                try:
+                    match_data = await self.handler(self.context, url, match_num)
+                except Exception as e:
+                    logger.error(f"Worker {worker_idx} failed on {url}: {e}")
+                    match_data = None
+
+                success = bool(match_data and match_data.get('home_team') and match_data.get('away_team'))
+                self.controller.record(success)
+                if self.limiter.rate != self.controller.rate:
+                    self.limiter.set_rate(self.controller.rate)
+
+                self.processed += 1
+                result = on_result(url, match_data)
+                if inspect.isawaitable(result):
+                    result = await result
+                if result is False:
+                    self.stopped = True
+            finally:
+                self.queue.task_done()
+
+    async def _put(self, item):
+        # a stopped pool takes nothing more, so a full queue must not block forever
+        while not self.stopped:
+            try:
+                await asyncio.wait_for(self.queue.put(item), timeout=0.5)
+                return True
+            except asyncio.TimeoutError:
+                continue
+        return False
+
+    async def run(self, urls, on_result):
+        """Feed `urls` (list or async iterator) to the workers and wait until all are done"""
+        workers = [
+            asyncio.create_task(self._worker(i, on_result))
+            for i in range(self.controller.max_concurrency)
+        ]
+
+        try:
+            match_num = 0
+            if hasattr(urls, '__aiter__'):
+                try:
+                    async for url in urls:
+                        match_num += 1
+                        if not await self._put((match_num, url)):
+                            break
+                finally:
+                    # producer may hold a page or listeners, let it clean up right away
+                    if hasattr(urls, 'aclose'):
+                        await urls.aclose()
+            else:
+                for url in urls:
+                    match_num += 1
+                    if not await self._put((match_num, url)):
+                        break
+            self.closed = True
+
+            await asyncio.gather(*workers)
+        finally:
+            self.closed = True
+            for worker in workers:
+                if not worker.done():
+                    worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        return self.processed
@@ -0,0 +1,52 @@
+import logging
+import uuid
+
+import psycopg
+import pytest
+from psycopg.conninfo import make_conninfo
+
+from ..src.database.schema import apply_migrations
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+@pytest.fixture(scope='session')
+def postgres_server(tmp_path_factory):
+    """Throwaway postgres started by pgserver from requirements-dev.txt, tests which need it are skipped without it"""
+    pgserver = pytest.importorskip('pgserver')
+    server = pgserver.get_server(str(tmp_path_factory.mktemp('postgres')), cleanup_mode='stop')
+    yield server
+    server.cleanup()
+
+
+@pytest.fixture
+def db(postgres_server):
+    """Connection to a new database with every migration applied, dropped after the test"""
+    uri = postgres_server.get_uri()
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    with psycopg.connect(uri, autocommit=True) as admin:
+        admin.execute(f"CREATE DATABASE {name}")
+    try:
+        with psycopg.connect(make_conninfo(uri, dbname=name)) as conn:
+            apply_migrations(conn)
+            yield conn
+    finally:
+        with psycopg.connect(uri, autocommit=True) as admin:
+            admin.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+
+
+@pytest.fixture
+async def browser():
+    """Headless chromium of playwright, tests which need it are skipped when it cannot start"""
+    async_api = pytest.importorskip('playwright.async_api')
+    async with async_api.async_playwright() as playwright:
+        try:
+            browser = await playwright.chromium.launch()
+        except Exception as e:
+            pytest.skip(f"chromium not available: {e}")
+        yield browser
+        await browser.close()
@@ -0,0 +1,80 @@
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+from ..src.scraper.backfill import split_seasons, wait_for_workers, worker_rate, FINISHED
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def test_split_seasons_round_robin():
+    seasons = [{'text': str(year)} for year in range(2012, 2019)]
+
+    shards = split_seasons(seasons, 3)
+
+    assert [[s['text'] for s in shard] for shard in shards] == [
+        ['2012', '2015', '2018'],
+        ['2013', '2016'],
+        ['2014', '2017'],
+    ]
+
+
+def test_split_seasons_more_workers_than_seasons():
+    seasons = [{'text': '2023'}, {'text': '2024'}]
+
+    shards = split_seasons(seasons, 8)
+
+    assert len(shards) == 2
+    assert sum(len(shard) for shard in shards) == 2
+
+
+class ListQueue(list):
+    def put(self, item):
+        self.append(item)
+
+
+def test_rate_is_shared_unless_given_per_worker():
+    assert worker_rate(2.0, 4) == 0.5
+    assert worker_rate(2.0, 4, per_worker=True) == 2.0
+
+
+def test_wait_for_workers_reports_workers_which_died():
+    mp = multiprocessing.get_context('fork')
+    writer = mp.Process(target=time.sleep, args=(30,))
+    writer.start()
+    workers = {
+        0: mp.Process(target=sys.exit, args=(0,)),
+        # killed hard, never gets to send FINISHED itself
+        1: mp.Process(target=os._exit, args=(1,)),
+    }
+    for process in workers.values():
+        process.start()
+    queue = ListQueue()
+
+    try:
+        died = wait_for_workers(workers, queue, writer)
+    finally:
+        writer.terminate()
+        writer.join()
+
+    assert died == [1]
+    assert queue == [(FINISHED, 1)]
+
+
+def test_wait_for_workers_stops_workers_when_writer_dies():
+    mp = multiprocessing.get_context('fork')
+    writer = mp.Process(target=os._exit, args=(1,))
+    writer.start()
+    workers = {0: mp.Process(target=time.sleep, args=(30,))}
+    workers[0].start()
+
+    died = wait_for_workers(workers, ListQueue(), writer)
+
+    assert died == [0]
+    assert not workers[0].is_alive()
@@ -0,0 +1,109 @@
+import logging
+
+import pytest
+
+from ..src.scraper.browser_manager import ManagedContext
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class FakePage:
+    def __init__(self, context, heap=0):
+        self.context = context
+        self.heap = heap
+
+    async def evaluate(self, script):
+        return self.heap
+
+    async def close(self):
+        self.context.pages.remove(self)
+
+
+class FakeContext:
+    def __init__(self, heap=0):
+        self.pages = []
+        self.closed = False
+        self.heap = heap
+
+    async def new_page(self):
+        page = FakePage(self, self.heap)
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeManager:
+    """Stands in for BrowserManager, hands out fake contexts and keeps them"""
+
+    def __init__(self, max_pages=3, max_heap_mb=512, heap=0):
+        self.max_pages = max_pages
+        self.max_heap_mb = max_heap_mb
+        self.heap = heap
+        self.contexts = []
+
+    async def create_context(self):
+        self.contexts.append(FakeContext(self.heap))
+        return self.contexts[-1]
+
+
+@pytest.mark.asyncio
+async def test_context_rotates_after_max_pages():
+    manager = FakeManager(max_pages=3)
+    managed = ManagedContext(manager)
+
+    pages = [await managed.new_page() for _ in range(7)]
+
+    assert len(manager.contexts) == 3
+    assert [page.context for page in pages] == [manager.contexts[0]] * 3 + [manager.contexts[1]] * 3 + [manager.contexts[2]]
+    assert managed.pages_opened == 1
+
+
+@pytest.mark.asyncio
+async def test_retired_context_closes_once_its_pages_are_done():
+    manager = FakeManager(max_pages=2)
+    managed = ManagedContext(manager)
+    first, second = await managed.new_page(), await managed.new_page()
+
+    await managed.new_page()
+    old = manager.contexts[0]
+    # pages of the old context are still scraping
+    assert managed.retired == [old] and not old.closed
+
+    await first.close()
+    await managed.new_page()
+    assert not old.closed
+
+    await second.close()
+    # the fifth page also rotates the second context, it still has its pages open
+    await managed.new_page()
+    assert old.closed and managed.retired == [manager.contexts[1]]
+
+
+@pytest.mark.asyncio
+async def test_context_rotates_when_js_heap_grows_too_big():
+    manager = FakeManager(max_pages=1000, max_heap_mb=1, heap=2 * 1024 * 1024)
+    managed = ManagedContext(manager)
+
+    for _ in range(ManagedContext.MEMORY_CHECK_EVERY + 1):
+        await managed.new_page()
+
+    assert len(manager.contexts) == 2
+
+
+@pytest.mark.asyncio
+async def test_close_closes_current_and_retired_contexts():
+    manager = FakeManager(max_pages=1)
+    managed = ManagedContext(manager)
+    await managed.new_page()
+    await managed.new_page()
+
+    await managed.close()
+
+    assert all(context.closed for context in manager.contexts)
+    assert managed.pages == []
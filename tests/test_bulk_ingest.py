@@ -0,0 +1,157 @@
+import logging
+
+import pytest
+
+from ..src.database.bulk_ingest import BulkIngestion
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def make_match(match_id, possession='55%', home_score='2'):
+    return {
+        'match_id': match_id,
+        'url': f"https://www.flashscore.pl/mecz/pilka-nozna/a/b/?mid={match_id}",
+        'date_time': '21.07.2023 20:30',
+        'home_team': 'Legia Warszawa',
+        'away_team': 'Lech Poznań',
+        'home_score': home_score,
+        'away_score': '1',
+        'statistics': {'Posiadanie piłki': {'home': possession, 'away': '45%'}},
+        'detailed_statistic': {
+            'Strzały': {'Strzały na bramkę': {'home': '6', 'away': '2'}},
+            # same category in two sections, the first one is kept
+            'Najważniejsze statystyki': {'Posiadanie piłki': {'home': '99%', 'away': '1%'}},
+        },
+    }
+
+
+def test_match_rows_are_unique_per_match_id():
+    rows = BulkIngestion.match_rows([make_match('abc', home_score='1'), make_match('abc', home_score='3'), make_match('def')])
+
+    assert len(rows) == 2
+    columns = list(BulkIngestion.MATCH_FIELDS)
+    abc = dict(zip(columns, rows[0]))
+    # retried match replaces the earlier copy in the same batch
+    assert abc['home_score'] == '3'
+    assert abc['date_time'] == '2023-07-21 20:30'
+
+
+def test_match_without_id_is_skipped():
+    match = make_match(None)
+
+    assert BulkIngestion.match_rows([match]) == []
+    assert BulkIngestion.statistic_rows([match]) == []
+
+
+def test_statistic_rows_long_format():
+    rows = BulkIngestion.statistic_rows([make_match('abc')])
+
+    # values are normalised to numbers before they are staged
+    assert sorted(rows) == [
+        ('abc', 'away_ball_possession', '45.0'),
+        ('abc', 'away_shots_on_target', '2.0'),
+        ('abc', 'home_ball_possession', '55.0'),
+        ('abc', 'home_shots_on_target', '6.0'),
+    ]
+
+
+class FakeCopy:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+
+class AsyncFakeCopy(FakeCopy):
+    async def write_row(self, row):
+        self.rows.append(row)
+
+
+class FakeCursor:
+    """Records statements, answers the column type queries and counts upserted matches"""
+
+    TYPES = {
+        'matches': [('match_id', 'character varying'), ('url', 'character varying'), ('date_time', 'timestamp'),
+                    ('home_score', 'integer'), ('away_score', 'integer'), ('status', 'character varying'),
+                    ('attendance', 'integer')],
+        'match_statistics': [('match_id', 'character varying'), ('home_ball_possession', 'double precision'),
+                             ('away_ball_possession', 'double precision')],
+    }
+
+    def __init__(self, copy_class=FakeCopy):
+        self.statements = []
+        self.copied = {}
+        self.copy_class = copy_class
+        self.description = None
+        self.rowcount = -1
+        self.result = []
+
+    def _run(self, query, params=None):
+        self.statements.append(query)
+        self.description = None
+        self.rowcount = 0
+        if query == BulkIngestion.COLUMN_TYPES_QUERY:
+            self.description = [('attname',), ('format_type',)]
+            self.result = self.TYPES[params[0]]
+        elif 'INSERT INTO matches' in query:
+            self.rowcount = len(self.copied['staging_matches'])
+
+    def execute(self, query, params=None):
+        self._run(query, params)
+
+    def fetchall(self):
+        return self.result
+
+    def copy(self, query):
+        self.statements.append(query)
+        return self.copy_class(self.copied.setdefault(query.split()[1], []))
+
+
+class AsyncFakeCursor(FakeCursor):
+    def __init__(self):
+        super().__init__(copy_class=AsyncFakeCopy)
+
+    async def execute(self, query, params=None):
+        self._run(query, params)
+
+    async def fetchall(self):
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_sync_and_async_ingest_run_the_same_statements():
+    matches = [make_match('abc'), make_match('def')]
+    cur, async_cur = FakeCursor(), AsyncFakeCursor()
+
+    written = BulkIngestion.ingest(cur, matches)
+    async_written = await BulkIngestion.ingest_async(async_cur, matches)
+
+    assert written == async_written == 2
+    assert cur.statements == async_cur.statements
+    assert cur.copied == async_cur.copied
+    assert len(cur.copied['staging_matches']) == 2
+
+
+def test_concurrent_writers_skip_dimension_rows_they_both_insert():
+    for statement in BulkIngestion.DIMENSION_STATEMENTS:
+        assert 'ON CONFLICT' in statement and 'DO NOTHING' in statement
+    # conflict targets are the unique indexes of schema migration 2
+    assert "ON CONFLICT (name, coalesce(nationality, ''))" in BulkIngestion.DIMENSION_STATEMENTS[1]
+    assert "ON CONFLICT (name, coalesce(city, ''))" in BulkIngestion.DIMENSION_STATEMENTS[2]
@@ -0,0 +1,119 @@
+import logging
+import math
+import struct
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from ..src.database.bulk_ingest import BulkIngestion
+from ..src.ml_implemention import copy_loader
+from ..src.ml_implemention.copy_loader import COPY_SIGNATURE, INT4_NULL, header_size, decode_rows, iter_chunks
+from ..src.ml_implemention.data_loading import match_data_query
+from ..src.ml_implemention.data_preparation import calculate_rolling_stats
+from .test_team_form import fixture_matches
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def binary_copy(rows, types):
+    """What postgres sends for COPY ... TO STDOUT (FORMAT BINARY) of int4 and float8 columns"""
+    data = COPY_SIGNATURE + struct.pack('>ii', 0, 0)
+    for row in rows:
+        data += struct.pack('>h', len(row))
+        for value, name in zip(row, types):
+            data += struct.pack('>ii', 4, value) if name == 'int4' else struct.pack('>id', 8, value)
+    return data + struct.pack('>h', -1)
+
+
+class FakeCopy:
+    def __init__(self, data, piece):
+        self.pieces = [data[i:i + piece] for i in range(0, len(data), piece)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def __iter__(self):
+        return iter(self.pieces)
+
+
+class FakeCursor:
+    def __init__(self, data, piece):
+        self.data = data
+        self.piece = piece
+        self.queries = []
+
+    def copy(self, query):
+        self.queries.append(query)
+        return FakeCopy(self.data, self.piece)
+
+
+def test_decode_rows_reads_whole_tuples():
+    types = ['int4', 'float8']
+    data = binary_copy([(1, 2.5), (INT4_NULL, math.nan)], types)
+    header = header_size(data)
+
+    values, used = decode_rows(data[header:], types)
+
+    assert header == 19
+    assert values[0].dtype == np.int32 and values[1].dtype == np.float64
+    assert values[0].tolist() == [1, INT4_NULL]
+    assert values[1][0] == 2.5 and math.isnan(values[1][1])
+    # only the trailer is left
+    assert len(data) - header - used == 2
+
+
+def test_iter_chunks_splits_stream_into_bounded_chunks():
+    rows = [(i, i * 2, float(i) / 4) for i in range(10)]
+    # pieces cut through the header and through tuples
+    cur = FakeCursor(binary_copy(rows, ['int4', 'int4', 'float8']), piece=7)
+
+    chunks = list(iter_chunks(cur, ['home_score', 'away_score', 'home_xg'], ['xg'], chunk_size=4))
+
+    assert [len(chunk[0]) for chunk in chunks] == [4, 4, 2]
+    columns = [np.concatenate([chunk[i] for chunk in chunks]).tolist() for i in range(3)]
+    assert list(zip(*columns)) == rows
+    assert 'FORMAT BINARY' in cur.queries[0]
+    assert "coalesce(CAST(ms.home_xg AS float8), 'NaN')" in cur.queries[0]
+    assert f"coalesce(CAST(m.home_score AS int4), {INT4_NULL})" in cur.queries[0]
+
+
+def test_load_columns_matches_read_sql(db, monkeypatch):
+    monkeypatch.setattr(copy_loader, 'connection', contextmanager(lambda: (yield db)))
+    matches = fixture_matches(count=6)
+    # not played yet, no score
+    matches[-1].update(home_score=None, away_score=None)
+    with db.cursor() as cur:
+        BulkIngestion.ingest(cur, matches)
+    db.commit()
+
+    columns = ['match_id', 'home_team_id', 'home_score', 'away_score', 'date_time', 'home_xg', 'away_ball_possession']
+    loaded = copy_loader.load_columns(columns, chunk_size=4)
+    expected = pd.read_sql_query(match_data_query(), db)
+    expected = expected.loc[:, ~expected.columns.duplicated()][columns]
+
+    assert str(loaded['home_score'].dtype) == 'Int32' and loaded['home_xg'].dtype == np.float64
+    assert loaded['home_score'].isna().tolist() == [False] * 5 + [True]
+    pd.testing.assert_frame_equal(loaded, expected, check_dtype=False)
+
+
+def test_typed_columns_feed_calculate_rolling_stats(db, monkeypatch):
+    monkeypatch.setattr(copy_loader, 'connection', contextmanager(lambda: (yield db)))
+    matches = fixture_matches(count=8)
+    matches[-1].update(home_score=None, away_score=None)
+    with db.cursor() as cur:
+        BulkIngestion.ingest(cur, matches)
+    db.commit()
+
+    from_copy = calculate_rolling_stats(copy_loader.load_columns())
+    history = pd.read_sql_query(match_data_query(), db)
+    from_sql = calculate_rolling_stats(history.loc[:, ~history.columns.duplicated()])
+
+    pd.testing.assert_frame_equal(from_copy, from_sql[from_copy.columns], check_dtype=False)
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+
+import psycopg
+
+from ..src.database import db_connect
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def open_connections(uri):
+    with psycopg.connect(uri) as conn:
+        cur = conn.execute("SELECT count(*) FROM pg_stat_activity WHERE backend_type = 'client backend' AND pid <> pg_backend_pid()")
+        return cur.fetchone()[0]
+
+
+def test_async_pool_is_published_open_and_replaced_pools_are_closed(postgres_server, monkeypatch):
+    uri = postgres_server.get_uri()
+    monkeypatch.setattr(db_connect, 'CONNECTION_INFO', uri)
+
+    async def concurrent_callers():
+        pools = await asyncio.gather(*(db_connect.get_async_pool() for _ in range(5)))
+        # every caller waited for the one pool, and only got it once open
+        assert all(pool is pools[0] for pool in pools)
+        async with db_connect.async_connection() as conn:
+            await conn.execute("SELECT 1")
+        return pools[0]
+
+    # the first run ends without close_async_pool, its loop is gone afterwards
+    first = asyncio.run(concurrent_callers())
+    assert open_connections(uri) > 0
+
+    second = asyncio.run(concurrent_callers())
+    assert second is not first
+    # only the connections of the second pool are left
+    assert open_connections(uri) == len(db_connect._async_pool_connections)
+
+    asyncio.run(db_connect.close_async_pool())
+    assert open_connections(uri) == 0
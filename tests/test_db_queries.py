@@ -0,0 +1,44 @@
+import logging
+from datetime import datetime
+
+from ..src.database.bulk_ingest import BulkIngestion
+from ..src.database.db_queries import DatabaseOperations
+from .test_team_form import fixture_matches
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def test_match_key_same_for_scraped_text_and_timestamps():
+    scraped = DatabaseOperations.match_key('Legia Warszawa', 'Lech Poznań', '02.03.2024 20:30')
+
+    assert scraped == ('Legia Warszawa', 'Lech Poznań', '2024-03-02 20:30')
+    assert DatabaseOperations.match_key('Legia Warszawa', 'Lech Poznań', datetime(2024, 3, 2, 20, 30)) == scraped
+    assert DatabaseOperations.match_key('Legia Warszawa', 'Lech Poznań', '2024-03-02 20:30:00') == scraped
+    assert DatabaseOperations.match_key('Legia Warszawa', 'Lech Poznań', ' 02.03.2024 20:30 ') == scraped
+    # other kick off, other match
+    assert DatabaseOperations.match_key('Legia Warszawa', 'Lech Poznań', '02.03.2024 18:00') != scraped
+
+
+def test_known_matches_skips_keys_of_incomplete_rows():
+    ids, keys = DatabaseOperations.known_matches([
+        (101, 'Legia Warszawa', 'Lech Poznań', datetime(2024, 3, 2, 20, 30)),
+        ('KpW2Xq0e', None, 'Lech Poznań', datetime(2024, 3, 9, 18, 0)),
+    ])
+
+    assert ids == {'101', 'KpW2Xq0e'}
+    assert keys == {('Legia Warszawa', 'Lech Poznań', '2024-03-02 20:30')}
+
+
+def test_load_known_matches_keys_match_scraped_text(db):
+    matches = fixture_matches(count=4)
+    with db.cursor() as cur:
+        BulkIngestion.ingest(cur, matches)
+        ids, keys = DatabaseOperations.load_known_matches(cur)
+
+    assert ids == {match['match_id'] for match in matches}
+    for match in matches:
+        assert DatabaseOperations.match_key(match['home_team'], match['away_team'], match['date_time']) in keys
@@ -0,0 +1,95 @@
+import logging
+
+from ..src.database.dimension_cache import DimensionCache
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class FakeCursor:
+    """Answers the cache queries from in-memory tables and records every statement"""
+
+    def __init__(self, teams):
+        self.teams = dict(teams)
+        self.queries = []
+        self.result = []
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if 'FROM teams GROUP BY' in query:
+            self.result = [(name, team_id) for name, team_id in self.teams.items()]
+        elif 'INSERT INTO teams' in query:
+            new = [name for name in params[0] if name not in self.teams]
+            for name in new:
+                self.teams[name] = max(self.teams.values(), default=0) + 1
+            self.result = [(self.teams[name],) for name in new]
+        elif 'JOIN teams' in query:
+            self.result = [(name, self.teams[name]) for name in params[0] if name in self.teams]
+        else:
+            self.result = []
+
+    def fetchall(self):
+        return self.result
+
+
+def test_known_names_need_no_queries():
+    cur = FakeCursor({'Legia Warszawa': 1, 'Lech Poznań': 2})
+    cache = DimensionCache()
+
+    assert cache.team_id(cur, 'Legia Warszawa') == 1
+    queries_after_warm = len(cur.queries)
+
+    assert cache.team_id(cur, 'Lech Poznań') == 2
+    assert cache.team_id(cur, 'Legia Warszawa') == 1
+    assert len(cur.queries) == queries_after_warm
+    assert cache.hits == 3
+
+
+def test_unseen_names_inserted_in_one_batch():
+    cur = FakeCursor({'Legia Warszawa': 1})
+    cache = DimensionCache()
+    cache.warm(cur)
+    cur.queries.clear()
+
+    matches = [
+        {'home_team': 'Legia Warszawa', 'away_team': 'Cracovia'},
+        {'home_team': 'Widzew Łódź', 'away_team': 'Cracovia'},
+    ]
+    cache.resolve_matches(cur, matches)
+
+    team_queries = [query for query in cur.queries if 'teams' in query]
+    # advisory lock, insert and read back, nothing per match
+    assert len(team_queries) == 2
+    assert len(cur.queries) == 3
+    # unseen names are inserted as a set, their order is not fixed
+    assert {cache.team_id(cur, 'Cracovia'), cache.team_id(cur, 'Widzew Łódź')} == {2, 3}
+
+
+def test_invalidate_forgets_ids():
+    cur = FakeCursor({'Legia Warszawa': 1})
+    cache = DimensionCache()
+    cache.team_id(cur, 'Legia Warszawa')
+
+    cache.invalidate()
+
+    assert not cache.warmed
+    assert cache.ids['teams'] == {}
+
+
+def test_missing_nationality_and_empty_one_share_a_referee(db):
+    with db.cursor() as cur:
+        cur.execute("INSERT INTO referees (name, nationality) VALUES ('Szymon Marciniak', NULL), ('Bartosz Frankowski', '')")
+        cache = DimensionCache()
+        # the cache knows the referees under the other spelling, the stadium not at all
+        cache.warm(cur)
+        cur.execute("INSERT INTO stadiums (name, city) VALUES ('Stadion Miejski', NULL) RETURNING stadium_id")
+        stadium_id = cur.fetchone()[0]
+
+        assert cache.referee_id(cur, 'Szymon Marciniak', '') is not None
+        assert cache.referee_id(cur, 'Bartosz Frankowski', None) is not None
+        assert cache.stadium_id(cur, 'Stadion Miejski', '') == stadium_id
+        cur.execute("SELECT count(*) FROM referees")
+        assert cur.fetchone()[0] == 2
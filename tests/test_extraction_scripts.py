@@ -0,0 +1,73 @@
+import logging
+
+import pytest
+
+from ..src.scraper.get_statistics import Statistic
+from ..src.scraper.mock_server import MockSite
+from ..src.scraper.wait_policy import WaitPolicy
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+# summary as the real page renders it in corner cases: no link around the away team,
+# referee without nationality, capacity label and a statistic row with one value
+EDGE_SUMMARY = """<!DOCTYPE html><html><head><meta charset="utf-8"></head><body>
+<div class="duelParticipant__startTime"><div> 02.03.2024 20:30 </div></div>
+<div class="duelParticipant__home"><div class="participant__participantName"><a href="#">Legia Warszawa</a></div></div>
+<div class="detailScore__wrapper"><span>2</span><span>-</span><span>1</span></div>
+<div class="duelParticipant__away_x"><div class="participantName_y">Lech Poznań</div></div>
+<div data-testid="wcl-statistics">
+  <div data-testid="wcl-statistics-value">55%</div>
+  <div data-testid="wcl-statistics-category">Posiadanie piłki</div>
+  <div data-testid="wcl-statistics-value">45%</div>
+</div>
+<div data-testid="wcl-statistics">
+  <div data-testid="wcl-statistics-category">Spalone</div>
+  <div data-testid="wcl-statistics-value">3</div>
+</div>
+<div class="wcl-content_Vkmj9">
+<div class="wcl-infoLabelWrapper_DXbvw">Sędzia:</div><div class="wcl-infoValue_grawU"><span>Szymon Marciniak</span></div>
+<div class="wcl-infoLabelWrapper_DXbvw">Stadion:</div><div class="wcl-infoValue_grawU"><span>Stadion Miejski</span><span>(Warszawa)</span></div>
+<div class="wcl-infoLabelWrapper_DXbvw">Pojemność:</div><div class="wcl-infoValue_grawU">31 103</div>
+</div>
+</body></html>"""
+
+
+@pytest.fixture
+async def page(browser):
+    page = await browser.new_page()
+    yield page
+    await page.close()
+
+
+def summaries():
+    site = MockSite('http://127.0.0.1', seasons=1, matches_per_season=3)
+    return [site.summary_page(site.match(site.match_id(2021, i))) for i in range(3)] + [EDGE_SUMMARY]
+
+
+async def test_summary_script_matches_dom_extraction(page):
+    waits = WaitPolicy()
+    for html in summaries():
+        await page.set_content(html)
+
+        from_dom = await Statistic.extract_summary(page, waits=waits)
+        from_script = await Statistic.extract_summary_script(page, waits=waits)
+
+        assert from_script == from_dom
+        assert from_dom['home_team'] and from_dom['statistics']
+
+
+async def test_detailed_statistics_script_matches_dom_extraction(page):
+    site = MockSite('http://127.0.0.1', seasons=1, matches_per_season=3)
+    waits = WaitPolicy()
+    for i in range(3):
+        await page.set_content(site.statistics_page(site.match(site.match_id(2021, i))))
+
+        from_dom = await Statistic.extract_detailed_statistics(page, waits=waits)
+        from_script = await Statistic.extract_detailed_statistics_script(page, waits=waits)
+
+        assert from_script == from_dom
+        assert len(from_dom) > 1
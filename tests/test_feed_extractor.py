@@ -0,0 +1,65 @@
+import logging
+import os
+
+import pytest
+
+from ..src.scraper.feed_extractor import FeedCapture, feed_name, parse_feed, parse_statistics
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class FakeResponse:
+    def __init__(self, url, body):
+        self.url = url
+        self.body = body
+
+    async def text(self):
+        return self.body
+
+
+def test_feed_name():
+    assert feed_name("https://local-global.flashscore.ninja/2/x/feed/df_st_1_KpW2Xq0e") == "df_st_1_KpW2Xq0e"
+    assert feed_name("https://www.flashscore.pl/res/image/data/logo.png") is None
+
+
+def test_parse_feed_records():
+    records = parse_feed("SE÷Mecz¬~SG÷Strzały¬SH÷6¬SI÷2¬~")
+
+    assert records == [{'SE': 'Mecz'}, {'SG': 'Strzały', 'SH': '6', 'SI': '2'}]
+
+
+def test_parse_statistics_from_recorded_feed():
+    stats = parse_statistics(load_fixture("df_st_1_KpW2Xq0e.txt"))
+
+    assert list(stats) == ["Najważniejsze statystyki", "Strzały", "Podania"]
+    # values of the whole match, not of the halves listed after it
+    assert stats["Najważniejsze statystyki"]["Posiadanie piłki"] == {'home': '58%', 'away': '42%'}
+    assert stats["Podania"]["Podania"] == {'home': '84% (412/490)', 'away': '76% (268/352)'}
+    assert stats["Strzały"]["Strzały na bramkę"] == {'home': '6', 'away': '2'}
+
+
+def test_parse_statistics_empty_feed():
+    assert parse_statistics("SA÷1¬~") == {}
+
+
+@pytest.mark.asyncio
+async def test_capture_waits_for_feed():
+    capture = FeedCapture()
+
+    assert await capture.wait_for("df_st_", timeout=50) is None
+
+    await capture._on_response(FakeResponse("https://www.flashscore.pl/res/font.woff", "binary"))
+    await capture._on_response(FakeResponse("https://x.flashscore.ninja/2/x/feed/df_st_1_KpW2Xq0e", "SA÷1¬~"))
+
+    assert await capture.wait_for("df_st_", timeout=50) == "SA÷1¬~"
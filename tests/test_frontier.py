@@ -0,0 +1,45 @@
+import pytest
+import logging
+from ..src.scraper.frontier import CrawlFrontier
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+URLS = [
+    "https://www.flashscore.pl/mecz/pilka-nozna/a/b/?mid=first",
+    "https://www.flashscore.pl/mecz/pilka-nozna/c/d/?mid=second",
+    "https://www.flashscore.pl/mecz/pilka-nozna/e/f/?mid=third",
+]
+
+
+def test_frontier_resumes_after_restart(tmp_path):
+    path = str(tmp_path / "frontier.db")
+
+    frontier = CrawlFrontier(path=path)
+    assert frontier.discover(URLS, "2024/2025") == URLS
+
+    frontier.mark_fetched(URLS[0])
+    frontier.mark_parsed(URLS[0], {'match_id': 'first', 'home_team': 'A', 'away_team': 'B'})
+    frontier.mark_parsed(URLS[1], {'match_id': 'second', 'home_team': 'C', 'away_team': 'D'})
+    frontier.mark_stored([URLS[1]])
+    frontier.close()
+
+    # a new run only scrapes what was never parsed and gets back unsaved matches
+    frontier = CrawlFrontier(path=path)
+    assert frontier.discover(URLS, "2024/2025") == [URLS[2]]
+    assert frontier.parsed_matches("2024/2025") == [{'match_id': 'first', 'home_team': 'A', 'away_team': 'B'}]
+    assert frontier.counts() == {'parsed': 1, 'stored': 1, 'discovered': 1}
+
+
+def test_frontier_gives_up_after_max_attempts(tmp_path):
+    frontier = CrawlFrontier(path=str(tmp_path / "frontier.db"), max_attempts=2)
+    frontier.discover(URLS[:1])
+
+    frontier.mark_failed(URLS[0], "timeout")
+    assert frontier.discover(URLS[:1]) == URLS[:1]
+
+    frontier.mark_failed(URLS[0], "timeout")
+    assert frontier.discover(URLS[:1]) == []
@@ -0,0 +1,55 @@
+import logging
+
+from ..src.database.long_statistics import LongStatistics
+from ..src.database.bulk_ingest import BulkIngestion
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def test_statistic_values_pairs_home_and_away():
+    values = LongStatistics.statistic_values({
+        'home_ball_possession': 58.0,
+        'away_ball_possession': 42.0,
+        'home_passes_completed': 412.0,
+        'away_xg': 0.62,
+    })
+
+    assert values == {
+        'ball_possession': (58.0, 42.0),
+        'passes_completed': (412.0, None),
+        'xg': (None, 0.62),
+    }
+
+
+def test_pivot_query_reads_only_requested_statistics():
+    query = LongStatistics.pivot_query(['xg', 'ball_possession'])
+
+    assert '"home_xg"' in query and '"away_ball_possession"' in query
+    assert "d.name IN ('xg', 'ball_possession')" in query
+    assert 'corner_kicks' not in query
+
+
+def test_layouts_select_statistics_statements():
+    match_types = {'match_id': 'character varying'}
+    statistic_types = {'match_id': 'character varying', 'home_xg': 'double precision'}
+
+    wide = BulkIngestion.statistics_statements(match_types, statistic_types, ['home_xg'], layout='wide')
+    long = BulkIngestion.statistics_statements(match_types, statistic_types, [], layout='long')
+    both = BulkIngestion.statistics_statements(match_types, statistic_types, ['home_xg'], layout='both')
+
+    assert all('match_statistic_values' not in statement for statement in wide)
+    assert all('INSERT INTO match_statistics ' not in statement for statement in long)
+    assert len(both) == len(wide) + len(long)
+
+
+def test_long_layout_stages_statistics_without_a_column():
+    match = {'match_id': 'abc', 'statistics': {'Nowa statystyka': {'home': '3', 'away': '1'}}}
+
+    rows, columns = BulkIngestion.staged_statistics([match], {'match_id': 'character varying'}, layout='long')
+
+    assert sorted(rows) == [('abc', 'away_nowa_statystyka', '1.0'), ('abc', 'home_nowa_statystyka', '3.0')]
+    assert columns == []
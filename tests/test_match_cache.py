@@ -0,0 +1,60 @@
+import logging
+
+import pandas as pd
+
+from ..src.ml_implemention.match_cache import MatchDataCache, watermark_query
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class FixedWatermarkCache(MatchDataCache):
+    """Watermark set by the test instead of read from the database"""
+
+    def __init__(self, watermark):
+        super().__init__()
+        self.current = watermark
+
+    def watermark(self):
+        return self.current
+
+
+def test_frame_is_loaded_again_only_when_watermark_moves():
+    cache = FixedWatermarkCache((10, '2026-01-01', None))
+    loads = []
+
+    def load():
+        loads.append(1)
+        return pd.DataFrame({'match_id': [str(i) for i in range(len(loads) * 10)]})
+
+    assert len(cache.get('all', load)) == 10
+    assert len(cache.get('all', load)) == 10
+    assert len(loads) == 1
+
+    cache.current = (11, '2026-01-02', None)
+    assert len(cache.get('all', load)) == 20
+    assert len(loads) == 2
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'frames': 1}
+
+
+def test_callers_cannot_change_cached_frame():
+    cache = FixedWatermarkCache((1, None, None))
+    load = lambda: pd.DataFrame({'home_score': [1]})
+
+    df = cache.get('all', load)
+    df['home_score'] = 5
+    df['extra'] = 1
+
+    cached = cache.get('all', load)
+    assert cached['home_score'].tolist() == [1]
+    assert 'extra' not in cached.columns
+
+
+def test_watermark_reads_statistics_tables_of_layout():
+    assert 'match_statistic_values' not in watermark_query('wide')
+    assert 'FROM match_statistics)' not in watermark_query('long')
+    both = watermark_query('both')
+    assert 'FROM match_statistics)' in both and 'match_statistic_values' in both
@@ -0,0 +1,57 @@
+import json
+import logging
+
+from ..src.scraper.metrics import ScrapeMetrics
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def test_metrics_grouped_by_season():
+    metrics = ScrapeMetrics()
+
+    metrics.start_season("2023/2024")
+    with metrics.timer('goto'):
+        pass
+    metrics.observe('goto', 0.5)
+    metrics.incr('pages', 2)
+    metrics.incr('stats_retries')
+    metrics.end_season()
+
+    # writer reports late, with the season of the match
+    metrics.observe('db_insert', 0.1, season="2023/2024")
+    metrics.incr('pages', season="2022/2023")
+
+    summary = metrics.summary()
+    season = summary['seasons']["2023/2024"]
+    assert season['counters'] == {'pages': 2, 'stats_retries': 1}
+    assert season['stages']['goto']['count'] == 2
+    assert season['stages']['goto']['max'] == 0.5
+    assert season['stages']['db_insert']['count'] == 1
+    assert season['pages_per_minute'] > 0
+    assert summary['total']['counters']['pages'] == 3
+
+
+def test_metrics_export(tmp_path):
+    metrics = ScrapeMetrics()
+    metrics.start_season('2023/2024')
+    metrics.observe('goto', 1.25)
+    metrics.incr('bytes', 2048)
+    metrics.end_season()
+
+    json_path, prom_path = metrics.export(str(tmp_path))
+
+    with open(json_path) as f:
+        assert json.load(f)['total']['counters']['bytes'] == 2048
+    with open(prom_path) as f:
+        prom = f.read()
+    assert 'scraper_stage_seconds_sum{season="2023/2024",stage="goto"} 1.250000' in prom
+    assert 'scraper_stage_seconds_count{season="2023/2024",stage="goto"} 1' in prom
+    assert 'scraper_events_total{season="2023/2024",event="bytes"} 2048' in prom
+
+
+def test_export_disabled_without_directory():
+    assert ScrapeMetrics().export('') is None
@@ -0,0 +1,89 @@
+import json
+import logging
+import os
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+import pytest
+
+from ..src.scraper.mock_server import MockFlashscoreServer, ARCHIVE_PATH
+from ..src.scraper.feed_extractor import parse_statistics
+from ..src.scraper.snapshot_store import SnapshotStore
+from ..src.scraper.scraper import Scraper
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def fetch(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.read().decode('utf-8')
+
+
+def test_mock_server_serves_league_pages():
+    with MockFlashscoreServer(seasons=2, matches_per_season=5) as server:
+        archive = fetch(server.base_url + ARCHIVE_PATH)
+        assert 'PKO BP Ekstraklasa 2022/2023' in archive
+        assert 'PKO BP Ekstraklasa 2021/2022' in archive
+
+        season = fetch(server.base_url + server.site.season_path(2021) + 'wyniki/')
+        assert '?mid=m20210004' in season
+        # newest first like the real list
+        assert season.index('?mid=m20210004') < season.index('?mid=m20210000')
+        dates = [datetime.strptime(server.site.match(Scraper.match_id_from_url(url))['date_time'], '%d.%m.%Y %H:%M')
+                 for url, _ in server.site.season_rows(2021)]
+        assert dates == sorted(dates, reverse=True)
+
+        match = server.site.match('m20210004')
+        summary = fetch(server.site.match_url(match))
+        assert match['home_team'] in summary
+
+        feed = fetch(server.base_url + '/x/feed/df_st_1_m20210004')
+        assert parse_statistics(feed)['Strzały']['Strzały na bramkę']['home'] == str(match['sections']['Strzały'][0][1])
+
+        with pytest.raises(urllib.error.HTTPError):
+            fetch(server.base_url + '/nothing/here/')
+
+
+def test_mock_server_failure_injection():
+    with MockFlashscoreServer(failure_rate=1.0, seasons=1, matches_per_season=2) as server:
+        # listing pages stay up so a run can always start
+        fetch(server.base_url + ARCHIVE_PATH)
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            fetch(server.site.match_url(server.site.match('m20210001')))
+        assert error.value.code == 503
+        assert server.failures == 1
+
+
+def test_mock_server_serves_recorded_match_pages(tmp_path):
+    fixture = os.path.join(os.path.dirname(__file__), 'fixtures', 'df_st_1_KpW2Xq0e.txt')
+    with open(fixture, encoding='utf-8') as f:
+        feed = f.read()
+    store = SnapshotStore(root=str(tmp_path))
+    store.save(
+        'KpW2Xq0e', 'summary',
+        '<html><body><div class="duelParticipant__home">Legia</div><script>track()</script></body></html>',
+        url='https://www.flashscore.pl/mecz/pilka-nozna/legia/lech/?mid=KpW2Xq0e'
+    )
+    store.save('KpW2Xq0e', 'statistics-feed', feed)
+
+    with MockFlashscoreServer(recorded_dir=str(tmp_path)) as server:
+        season = fetch(server.base_url + server.site.season_path(2021) + 'wyniki/')
+        match_url = f"{server.base_url}/mecz/pilka-nozna/legia/lech/?mid=KpW2Xq0e"
+        assert json.dumps(match_url)[1:-1] in season
+
+        summary = fetch(match_url)
+        assert 'duelParticipant__home' in summary
+        assert 'track()' not in summary
+        assert "fetch('/x/feed/df_st_1_KpW2Xq0e')" in summary
+
+        assert fetch(server.base_url + '/x/feed/df_st_1_KpW2Xq0e') == feed
+
+        # statistics page was never recorded
+        with pytest.raises(urllib.error.HTTPError):
+            fetch(f"{server.base_url}/mecz/pilka-nozna/legia/lech/szczegoly/statystyki/ogolnie/?mid=KpW2Xq0e")
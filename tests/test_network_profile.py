@@ -0,0 +1,74 @@
+import logging
+
+import pytest
+
+from ..src.scraper.network_profile import NetworkProfile
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type, sizes=None):
+        self.url = url
+        self.resource_type = resource_type
+        self._sizes = sizes
+
+    async def sizes(self):
+        if self._sizes is None:
+            raise RuntimeError("Target page, context or browser has been closed")
+        return self._sizes
+
+
+class FakeRoute:
+    def __init__(self, request):
+        self.request = request
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = 'aborted'
+
+    async def continue_(self):
+        self.outcome = 'continued'
+
+
+@pytest.mark.asyncio
+async def test_blocked_requests_are_counted_with_their_urls():
+    profile = NetworkProfile(blocked_resource_types=['image'], blocked_domains=['doubleclick.net'])
+    routes = [
+        FakeRoute(FakeRequest('https://www.flashscore.pl/res/logo.png', 'image')),
+        FakeRoute(FakeRequest('https://ad.doubleclick.net/tag.js', 'script')),
+        FakeRoute(FakeRequest('https://www.flashscore.pl/mecz/', 'document')),
+    ]
+
+    for route in routes:
+        await profile._handle_route(route)
+
+    assert [route.outcome for route in routes] == ['aborted', 'aborted', 'continued']
+    summary = profile.summary()
+    assert summary['blocked_requests'] == 2
+    assert summary['blocked_by_type'] == {'image': 1, 'script': 1}
+    assert summary['blocked_by_domain'] == {'doubleclick.net': 1}
+    assert summary['blocked_sample'] == ['image https://www.flashscore.pl/res/logo.png', 'script https://ad.doubleclick.net/tag.js']
+
+
+@pytest.mark.asyncio
+async def test_transferred_bytes_come_from_request_sizes():
+    profile = NetworkProfile(blocked_resource_types=[], blocked_domains=[])
+
+    # chunked response, no content-length but the browser knows what came over the wire
+    await profile._on_request_finished(FakeRequest('https://www.flashscore.pl/mecz/', 'document', {
+        'requestBodySize': 0, 'requestHeadersSize': 300, 'responseBodySize': 5000, 'responseHeadersSize': 400,
+    }))
+    # served from cache, sizes are -1
+    await profile._on_request_finished(FakeRequest('https://www.flashscore.pl/app.js', 'script', {
+        'requestBodySize': 0, 'requestHeadersSize': 300, 'responseBodySize': -1, 'responseHeadersSize': -1,
+    }))
+    # page already closed
+    await profile._on_request_finished(FakeRequest('https://www.flashscore.pl/x/feed/df_st_1_x', 'fetch'))
+
+    assert profile.transferred_bytes == 5400
+    assert profile.summary()['transferred_by_type'] == {'document': 5400, 'script': 0}
@@ -0,0 +1,74 @@
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from ..src.database.bulk_ingest import BulkIngestion
+from ..src.ml_implemention import parquet_snapshot
+from ..src.ml_implemention.parquet_snapshot import season_of, write_snapshot, read_snapshot, snapshot_files, read_manifest
+from .test_team_form import fixture_matches
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def test_season_starts_in_july():
+    assert season_of(datetime(2023, 7, 21, 20, 30)) == 2023
+    assert season_of(datetime(2024, 5, 25, 17, 30)) == 2023
+    assert season_of(None) is None
+
+
+def history(*rows):
+    return pd.DataFrame([
+        {'match_id': match_id, 'date_time': pd.Timestamp(date_time), 'home_score': score, 'home_xg': 1.5}
+        for match_id, date_time, score in rows
+    ])
+
+
+def test_snapshot_appends_and_projects_columns(tmp_path):
+    pytest.importorskip('pyarrow')
+    directory = str(tmp_path)
+
+    write_snapshot(history(('a', '2023-08-01', 1), ('b', '2024-03-01', 2)), datetime(2024, 3, 2), directory)
+    # later export with a new match and a re-exported one
+    write_snapshot(history(('b', '2024-03-01', 3), ('c', '2024-08-10', 0)), datetime(2024, 8, 11), directory)
+
+    assert len(snapshot_files(directory)) == 3
+    df = read_snapshot(directory, columns=['home_score'])
+    assert list(df.columns) == ['home_score']
+    assert df['home_score'].tolist() == [1, 3, 0]
+
+    season = read_snapshot(directory, seasons=[2024])
+    assert season['match_id'].tolist() == ['c']
+
+
+def test_export_follows_rescraped_matches(db, tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    directory = str(tmp_path)
+    monkeypatch.setattr(parquet_snapshot, 'connection', contextmanager(lambda: (yield db)))
+    matches = fixture_matches(count=4)
+    with db.cursor() as cur:
+        BulkIngestion.ingest(cur, matches)
+    db.commit()
+
+    assert parquet_snapshot.export_snapshot(directory) == 4
+    with db.cursor() as cur:
+        cur.execute("SELECT max(updated_at) FROM matches")
+        newest = cur.fetchone()[0]
+    # the watermark stays behind rows this fresh, transactions still running may commit older ones
+    assert datetime.fromisoformat(read_manifest(directory)['exported_until']) < newest
+
+    with db.cursor() as cur:
+        BulkIngestion.ingest(cur, [dict(matches[0], home_score=matches[0]['home_score'] + 5)])
+    db.commit()
+    parquet_snapshot.export_snapshot(directory)
+
+    df = read_snapshot(directory, columns=['home_score'])
+    assert len(df) == 4
+    first = read_snapshot(directory).set_index('match_id').loc['fx000', 'home_score']
+    assert first == matches[0]['home_score'] + 5
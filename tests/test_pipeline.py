@@ -0,0 +1,93 @@
+import asyncio
+import logging
+
+import pytest
+
+from ..src.scraper.pipeline import MatchWriter
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class FakeFrontier:
+    def __init__(self):
+        self.stored = []
+
+    def mark_stored(self, urls):
+        self.stored.extend(urls)
+
+
+def recording_writer(batches):
+    def write_batch(batch):
+        batches.append([match['url'] for match in batch])
+        return [match['url'] for match in batch]
+    return write_batch
+
+
+@pytest.mark.asyncio
+async def test_writer_commits_full_batches():
+    batches = []
+    frontier = FakeFrontier()
+    writer = MatchWriter(frontier=frontier, batch_size=3, flush_interval=10, write_batch=recording_writer(batches))
+
+    async with writer:
+        for i in range(7):
+            await writer.put({'url': f'm{i}'})
+
+    assert batches == [['m0', 'm1', 'm2'], ['m3', 'm4', 'm5'], ['m6']]
+    assert writer.saved == 7
+    assert frontier.stored == [f'm{i}' for i in range(7)]
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_partial_batch_after_interval():
+    batches = []
+    writer = MatchWriter(batch_size=100, flush_interval=0.1, write_batch=recording_writer(batches)).start()
+
+    await writer.put({'url': 'm0'})
+    await asyncio.sleep(0.3)
+
+    # committed long before the batch was full
+    assert batches == [['m0']]
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_blocks_producer():
+    batches = []
+
+    def slow_write(batch):
+        batches.append(len(batch))
+        return []
+
+    writer = MatchWriter(queue_size=2, batch_size=1, flush_interval=10, write_batch=slow_write)
+    for i in range(2):
+        await writer.put({'url': f'm{i}'})
+
+    # writer not started, a third match has to wait for room in the queue
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(writer.put({'url': 'm2'}), 0.1)
+
+    writer.start()
+    await writer.close()
+    assert sum(batches) == 2
+
+
+@pytest.mark.asyncio
+async def test_writer_awaits_coroutine_write_batch():
+    batches = []
+
+    async def write_batch(batch):
+        await asyncio.sleep(0)
+        batches.append([match['url'] for match in batch])
+        return [match['url'] for match in batch]
+
+    async with MatchWriter(batch_size=2, flush_interval=10, write_batch=write_batch) as writer:
+        for i in range(3):
+            await writer.put({'url': f'm{i}'})
+
+    assert batches == [['m0', 'm1'], ['m2']]
+    assert writer.saved == 3
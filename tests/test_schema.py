@@ -0,0 +1,51 @@
+import logging
+
+from ..src.database.schema import MIGRATIONS, statistic_columns, pending_migrations, plan_scans, uses_indexes
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def test_statistic_columns_cover_both_sides():
+    columns = statistic_columns()
+    assert columns[:2] == ['home_xg', 'away_xg']
+    assert 'away_prevented_goals' in columns
+    assert len(columns) == len(set(columns))
+
+
+def test_pending_migrations_skip_applied_versions():
+    pending = pending_migrations({1})
+    assert [version for version, _, _ in pending] == sorted(v for v in MIGRATIONS if v != 1)
+    assert pending_migrations(set(MIGRATIONS)) == []
+
+
+def test_plan_scans_walks_nested_plans():
+    plan = {
+        'Node Type': 'Nested Loop',
+        'Plans': [
+            {'Node Type': 'Index Scan', 'Relation Name': 'teams'},
+            {'Node Type': 'Bitmap Heap Scan', 'Relation Name': 'matches', 'Plans': [
+                {'Node Type': 'Bitmap Index Scan', 'Index Name': 'matches_home_team_date_idx'},
+            ]},
+        ],
+    }
+    scans = plan_scans(plan)
+
+    assert ('Index Scan', 'teams') in scans
+    assert ('Bitmap Index Scan', 'matches_home_team_date_idx') in scans
+    assert uses_indexes(scans)
+    assert not uses_indexes(scans + [('Seq Scan', 'matches')])
+    assert not uses_indexes([])
+
+
+def test_dedupe_groups_keys_like_the_unique_indexes():
+    _, statements = MIGRATIONS[2]
+    for table, keys in (('teams', "name"), ('referees', "name, coalesce(nationality, '')"), ('stadiums', "name, coalesce(city, '')")):
+        index = next(s for s in statements if s.startswith(f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_"))
+        assert index.endswith(f"ON {table} ({keys})")
+        # a NULL and an empty city are one key for the index, so the dedupe has to merge them
+        dedupe = [s for s in statements if f"FROM {table}\n" in s]
+        assert dedupe and all(f"PARTITION BY {keys})" in s for s in dedupe)
@@ -0,0 +1,48 @@
+import logging
+import os
+from datetime import datetime
+
+from ..src.database.db_queries import DatabaseOperations
+from ..src.scraper.frontier import CrawlFrontier
+from ..src.scraper.metrics import ScrapeMetrics
+from ..src.scraper.mock_server import MockFlashscoreServer
+from ..src.scraper.network_profile import NetworkProfile
+from ..src.scraper.pipeline import MatchWriter
+from ..src.scraper.scraper import scraper, Scraper
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+async def test_scraper_skips_preloaded_matches(browser, tmp_path):
+    metrics = ScrapeMetrics()
+    written = []
+
+    def write_batch(batch):
+        written.extend(match['url'] for match in batch)
+        return [match['url'] for match in batch]
+
+    writer = MatchWriter(metrics=metrics, write_batch=write_batch)
+
+    with MockFlashscoreServer(seasons=1, matches_per_season=6) as server:
+        site = server.site
+        stored_ids = {site.match_id(2021, 0), site.match_id(2021, 1)}
+        # stored under another id, found by teams and kick off as the database returns them
+        moved = site.match(site.match_id(2021, 2))
+        _, stored_keys = DatabaseOperations.known_matches([
+            ('other-id', moved['home_team'], moved['away_team'], datetime.strptime(moved['date_time'], '%d.%m.%Y %H:%M'))
+        ])
+
+        frontier = CrawlFrontier(path=os.path.join(tmp_path, 'frontier.db'))
+        await scraper(
+            start_season_year=2021, rate=100.0, network_profile=NetworkProfile(), frontier=frontier,
+            metrics=metrics, writer=writer, known_matches=(stored_ids, stored_keys),
+            base_url=server.base_url, metrics_dir=None,
+        )
+        frontier.close()
+
+    scraped_ids = {Scraper.match_id_from_url(url) for url in written}
+    assert scraped_ids == {site.match_id(2021, i) for i in range(3, 6)}
@@ -0,0 +1,44 @@
+import gzip
+import os
+
+import pytest
+import logging
+from ..src.scraper.snapshot_store import SnapshotStore
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def test_snapshot_roundtrip(tmp_path):
+    store = SnapshotStore(root=str(tmp_path), compression='gzip')
+    html = "<html><body><div class='duelParticipant__home'>Korona Kielce</div></body></html>"
+
+    path = store.save('voGiNirK', 'summary', html, url='https://www.flashscore.pl/mecz/?mid=voGiNirK')
+
+    assert path.endswith('.html.gz')
+    assert gzip.decompress(open(path, 'rb').read()).decode() == html
+    assert store.load('voGiNirK', 'summary') == html
+    assert store.load('voGiNirK', 'statistics') is None
+    assert store.load_meta('voGiNirK')['url'].endswith('mid=voGiNirK')
+    assert list(store.match_ids()) == ['voGiNirK']
+
+
+def test_snapshot_is_content_addressed(tmp_path):
+    store = SnapshotStore(root=str(tmp_path))
+
+    first = store.save('abc', 'summary', '<p>1</p>')
+    again = store.save('abc', 'summary', '<p>1</p>')
+    changed = store.save('abc', 'summary', '<p>2</p>')
+
+    assert first == again
+    assert changed != first
+    assert len([f for f in os.listdir(os.path.dirname(first)) if f.startswith("summary-")]) == 2
+    assert store.load('abc', 'summary') == '<p>2</p>'
+
+
+def test_unknown_compression_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        SnapshotStore(root=str(tmp_path), compression='lz4')
@@ -0,0 +1,47 @@
+import logging
+
+from ..src.database.stat_normalizer import stat_number, stat_fraction, normalize_statistics
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def test_stat_number_reads_scraped_formats():
+    assert stat_number('58%') == 58.0
+    assert stat_number('1.84') == 1.84
+    assert stat_number('1,84') == 1.84
+    assert stat_number('84% (412/490)') == 84.0
+    assert stat_number('412/490 (84%)') == 84.0
+    assert stat_number(7) == 7.0
+    assert stat_number(None) is None
+    assert stat_number('-') is None
+    assert stat_number('') is None
+
+
+def test_stat_fraction():
+    assert stat_fraction('84% (412/490)') == (412.0, 490.0)
+    assert stat_fraction('58%') == (None, None)
+    assert stat_fraction(None) == (None, None)
+
+
+def test_normalize_statistics_splits_ratio_statistics():
+    normalized = normalize_statistics({
+        'home_passes': '84% (412/490)',
+        'away_passes': None,
+        'home_ball_possession': '58%',
+        'home_xg': '1.84',
+    })
+
+    assert normalized == {
+        'home_passes': 84.0,
+        'home_passes_completed': 412.0,
+        'home_passes_attempted': 490.0,
+        'away_passes': None,
+        'away_passes_completed': None,
+        'away_passes_attempted': None,
+        'home_ball_possession': 58.0,
+        'home_xg': 1.84,
+    }
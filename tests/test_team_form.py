@@ -0,0 +1,192 @@
+import logging
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from ..src.database import bulk_ingest
+from ..src.database.team_form import refresh, refresh_query, changed_since_refresh, AVERAGES
+from ..src.database.watermark import change_sources
+from ..src.database.bulk_ingest import BulkIngestion
+from ..src.ml_implemention.data_loading import match_data_query, form_features_query
+from ..src.ml_implemention.data_preparation import calculate_rolling_stats
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class FakeCursor:
+    """Answers the watermark queries of refresh and records every statement"""
+
+    def __init__(self, refreshed_until, latest, horizon=None):
+        self.refreshed_until = refreshed_until
+        self.latest = latest
+        # database clock minus the watermark lag
+        self.horizon = horizon or latest + timedelta(hours=1)
+        self.queries = []
+        self.result = None
+        self.rowcount = 4
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+        if 'FROM feature_refresh' in query:
+            self.result = (self.refreshed_until,) if self.refreshed_until else None
+        elif 'greatest' in query:
+            self.result = (self.latest, self.horizon)
+        else:
+            self.result = None
+
+    def fetchone(self):
+        return self.result
+
+
+def test_refresh_query_averages_previous_matches_only():
+    query = refresh_query(games=5)
+
+    assert 'ROWS BETWEEN 5 PRECEDING AND 1 PRECEDING' in query
+    for name in AVERAGES:
+        assert f' AS {name}' in query
+    assert 'ON CONFLICT (team_id, match_id) DO UPDATE' in query
+
+
+def test_long_layout_reads_and_follows_statistic_values():
+    query = refresh_query(layout='long')
+
+    assert 'FROM match_statistic_values' in query
+    assert 'match_statistics ' not in query
+    assert ('match_statistic_values', 'created_at') in change_sources('long')
+    assert ('match_statistics', 'created_at') not in change_sources('long')
+    assert len(change_sources('both')) == 3
+
+
+def test_refresh_without_new_matches_writes_nothing():
+    stamp = datetime(2024, 8, 18, 20, 0)
+    cur = FakeCursor(refreshed_until=stamp, latest=stamp)
+
+    assert refresh(cur) == 0
+    assert not any('INSERT INTO team_form' in query for query, _ in cur.queries)
+
+
+def test_refresh_starts_at_watermark_and_moves_it():
+    cur = FakeCursor(refreshed_until=datetime(2024, 8, 18, 20, 0), latest=datetime(2024, 8, 25, 18, 0))
+
+    assert refresh(cur) == 4
+    upsert = next(params for query, params in cur.queries if 'INSERT INTO team_form' in query)
+    assert upsert == {'since': datetime(2024, 8, 18, 20, 0)}
+    watermark = next(params for query, params in cur.queries if 'INSERT INTO feature_refresh' in query)
+    assert watermark == (datetime(2024, 8, 25, 18, 0),)
+    assert not any('TRUNCATE' in query for query, _ in cur.queries)
+
+
+def test_watermark_stays_behind_transactions_which_may_still_commit():
+    latest = datetime(2024, 8, 25, 18, 0)
+    cur = FakeCursor(refreshed_until=datetime(2024, 8, 18, 20, 0), latest=latest, horizon=latest - timedelta(minutes=1))
+
+    refresh(cur)
+
+    watermark = next(params for query, params in cur.queries if 'INSERT INTO feature_refresh' in query)
+    assert watermark == (latest - timedelta(minutes=1),)
+
+
+TEAMS = ['Legia Warszawa', 'Lech Poznań', 'Raków Częstochowa', 'Pogoń Szczecin']
+
+
+def fixture_matches(count=16, seed=3):
+    """Round robin of finished matches with statistics, some missing to exercise the defaults"""
+    rng = random.Random(seed)
+    matches = []
+    for i in range(count):
+        home, away = rng.sample(TEAMS, 2)
+        statistics = {
+            'Oczekiwane gole (xG)': {'home': f"{rng.uniform(0, 3):.2f}", 'away': f"{rng.uniform(0, 3):.2f}"},
+            'Posiadanie piłki': {'home': f"{(p := rng.randint(30, 70))}%", 'away': f"{100 - p}%"},
+            'Strzały łącznie': {'home': str(rng.randint(3, 20)), 'away': str(rng.randint(3, 20))},
+            'Rzuty rożne': {'home': str(rng.randint(0, 10)), 'away': str(rng.randint(0, 10))},
+        }
+        if i % 3 == 0:
+            statistics = {}
+        matches.append({
+            'match_id': f'fx{i:03d}',
+            'url': f'https://www.flashscore.pl/mecz/?mid=fx{i:03d}',
+            'date_time': (datetime(2023, 8, 1, 18, 0) + timedelta(days=3 * i)).strftime('%d.%m.%Y %H:%M'),
+            'home_team': home,
+            'away_team': away,
+            'home_score': rng.randint(0, 4),
+            'away_score': rng.randint(0, 3),
+            'statistics': statistics,
+            'detailed_statistic': {},
+        })
+    return matches
+
+
+def test_team_form_matches_calculate_rolling_stats(db):
+    with db.cursor() as cur:
+        BulkIngestion.ingest(cur, fixture_matches())
+        refresh(cur)
+    db.commit()
+
+    from_table = pd.read_sql_query(form_features_query(), db)
+    history = pd.read_sql_query(match_data_query(), db)
+    # ms.* repeats match_id
+    history = history.loc[:, ~history.columns.duplicated()]
+    in_memory = calculate_rolling_stats(history)
+
+    columns = [column for column in in_memory.columns if column in from_table.columns]
+    assert 'away_avg_conceded_last_5' in columns and 'home_corner_kicks' in columns
+    from_table = from_table.sort_values('match_id').reset_index(drop=True)[columns]
+    in_memory = in_memory.sort_values('match_id').reset_index(drop=True)[columns]
+    pd.testing.assert_frame_equal(from_table, in_memory, check_dtype=False)
+
+
+def test_rescraped_score_moves_team_form(db):
+    matches = fixture_matches(count=4)
+    with db.cursor() as cur:
+        BulkIngestion.ingest(cur, matches)
+        refresh(cur)
+    db.commit()
+
+    with db.cursor() as cur:
+        # later scrape of the first match with a corrected score
+        BulkIngestion.ingest(cur, [dict(matches[0], home_score=matches[0]['home_score'] + 5)])
+        refresh(cur)
+        cur.execute("SELECT goals_for FROM team_form WHERE match_id = 'fx000' AND is_home")
+        assert cur.fetchone()[0] == matches[0]['home_score'] + 5
+
+
+def test_long_layout_team_form_matches_wide(db, monkeypatch):
+    monkeypatch.setattr(bulk_ingest, 'DB_STATISTICS_LAYOUT', 'both')
+    form = "SELECT * FROM team_form ORDER BY team_id, match_id"
+    with db.cursor() as cur:
+        BulkIngestion.ingest(cur, fixture_matches())
+        refresh(cur, layout='wide')
+    db.commit()
+    from_wide = pd.read_sql_query(form, db).drop(columns='refreshed_at')
+
+    with db.cursor() as cur:
+        # only the long rows are left to read
+        cur.execute("DELETE FROM match_statistics")
+        refresh(cur, full=True, layout='long')
+    db.commit()
+    from_long = pd.read_sql_query(form, db).drop(columns='refreshed_at')
+
+    assert from_long['xg'].gt(0).any()
+    pd.testing.assert_frame_equal(from_long, from_wide)
+
+
+def test_changed_since_refresh_only_after_new_writes(db):
+    matches = fixture_matches(count=4)
+    with db.cursor() as cur:
+        BulkIngestion.ingest(cur, matches[:2])
+        assert changed_since_refresh(cur)
+    db.commit()
+
+    with db.cursor() as cur:
+        refresh(cur)
+    db.commit()
+    with db.cursor() as cur:
+        assert not changed_since_refresh(cur)
+        BulkIngestion.ingest(cur, matches[2:])
+        assert changed_since_refresh(cur)
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+
+import pytest
+
+from ..src.scraper.wait_policy import WaitPolicy
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level = logging.INFO,
+    format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+class FakeRequest:
+    def __init__(self, url):
+        self.url = url
+
+
+class FakePage:
+    """Selectors in `present` appear at once, any other wait runs into its timeout"""
+
+    def __init__(self, present=()):
+        self.present = set(present)
+        self.timeouts = []
+        self.listeners = {}
+
+    async def wait_for_selector(self, selector, state='attached', timeout=None):
+        self.timeouts.append(timeout)
+        if selector not in self.present:
+            raise TimeoutError(f"Timeout {timeout}ms exceeded waiting for {selector}")
+
+    def on(self, event, handler):
+        self.listeners.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners[event].remove(handler)
+
+    def emit(self, event, request):
+        for handler in list(self.listeners.get(event, [])):
+            handler(request)
+
+
+@pytest.mark.asyncio
+async def test_waits_are_timed_and_timeouts_counted():
+    waits = WaitPolicy(timeout=3000)
+    page = FakePage(present=['.section'])
+
+    assert await waits.selector(page, '.section', name='sections')
+    assert not await waits.selector(page, '.missing', name='missing')
+    assert not await waits.selector(page, '.missing', name='missing')
+
+    summary = waits.summary()
+    assert summary['sections']['count'] == 1 and summary['sections']['timeouts'] == 0
+    assert summary['missing']['count'] == 2 and summary['missing']['timeouts'] == 2
+    assert page.timeouts == [3000, 3000, 3000]
+
+
+@pytest.mark.asyncio
+async def test_explicit_timeouts_are_capped_by_max_timeout():
+    waits = WaitPolicy(timeout=3000, max_timeout=500)
+    page = FakePage(present=['.section'])
+
+    await waits.selector(page, '.section')
+    await waits.selector(page, '.section', timeout=10000)
+    await waits.selector(page, '.section', timeout=200)
+    # zero is kept, not replaced by the default
+    await waits.selector(page, '.section', timeout=0)
+
+    assert page.timeouts == [500, 500, 200, 0]
+
+
+@pytest.mark.asyncio
+async def test_requests_idle_waits_for_matching_requests_to_finish():
+    waits = WaitPolicy(timeout=2000)
+    page = FakePage()
+    feed = FakeRequest('https://www.flashscore.pl/x/feed/df_st_1_KpW2Xq0e')
+
+    async def traffic():
+        await asyncio.sleep(0.01)
+        page.emit('request', FakeRequest('https://www.flashscore.pl/res/logo.png'))
+        page.emit('request', feed)
+        await asyncio.sleep(0.2)
+        page.emit('requestfinished', feed)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    idle, _ = await asyncio.gather(waits.requests_idle(page, '/x/feed/', idle_time=0.1, name='feed'), traffic())
+
+    assert idle
+    # in flight for 0.2s, then quiet for 0.1s
+    assert loop.time() - start >= 0.3
+    assert all(not handlers for handlers in page.listeners.values())
+
+
+@pytest.mark.asyncio
+async def test_requests_idle_gives_up_while_requests_stay_in_flight():
+    waits = WaitPolicy(timeout=150)
+    page = FakePage()
+    waiting = asyncio.ensure_future(waits.requests_idle(page, '/x/feed/', idle_time=0.05, name='feed'))
+    await asyncio.sleep(0)
+    page.emit('request', FakeRequest('https://www.flashscore.pl/x/feed/df_st_1_KpW2Xq0e'))
+
+    assert not await waiting
+    assert waits.timeouts['feed'] == 1
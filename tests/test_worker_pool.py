@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+import logging
+from ..src.scraper.worker_pool import TokenBucket, AdaptiveController, MatchWorkerPool
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=20, burst=1)
+
+    start = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+    elapsed = time.monotonic() - start
+
+    # first token is free, the other four need 1/20 s each
+    assert elapsed >= 0.18
+
+
+def test_adaptive_controller_backs_off_and_recovers():
+    controller = AdaptiveController(max_concurrency=8, max_rate=4.0, window=4, error_threshold=0.25)
+
+    for success in [True, False, False, True]:
+        controller.record(success)
+    assert controller.concurrency == 4
+    assert controller.rate == 2.0
+
+    for _ in range(4):
+        controller.record(True)
+    assert controller.concurrency == 5
+    assert controller.rate == 3.0
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_runs_matches_concurrently():
+    running = 0
+    peak = 0
+
+    async def handler(context, url, match_num):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return {'home_team': 'A', 'away_team': 'B', 'url': url}
+
+    results = []
+    pool = MatchWorkerPool(None, handler, concurrency=3, rate=1000, burst=10)
+    processed = await pool.run([f"match-{i}" for i in range(9)], lambda url, data: results.append(url))
+
+    assert processed == 9
+    assert sorted(results) == sorted(f"match-{i}" for i in range(9))
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_stops_when_asked():
+    async def handler(context, url, match_num):
+        await asyncio.sleep(0.01)
+        return {'home_team': 'A', 'away_team': 'B'}
+
+    seen = []
+
+    def on_result(url, data):
+        seen.append(url)
+        return len(seen) < 2
+
+    pool = MatchWorkerPool(None, handler, concurrency=1, rate=1000, burst=10)
+    await pool.run([f"match-{i}" for i in range(10)], on_result)
+
+    assert seen == ["match-0", "match-1"]
+
+
+@pytest.mark.asyncio
+async def test_bounded_pool_stops_streaming_producer_early():
+    produced = []
+
+    async def urls():
+        # like the season list, new rows keep appearing while the pool works
+        for i in range(100):
+            produced.append(i)
+            yield f"match-{i}"
+            await asyncio.sleep(0)
+
+    async def handler(context, url, match_num):
+        await asyncio.sleep(0.01)
+        return {'home_team': 'A', 'away_team': 'B'}
+
+    seen = []
+
+    def on_result(url, data):
+        seen.append(url)
+        return len(seen) < 3
+
+    pool = MatchWorkerPool(None, handler, concurrency=2, rate=1000, burst=10, queue_size=2)
+    await pool.run(urls(), on_result)
+
+    assert len(seen) >= 3
+    # the producer was never drained to the end
+    assert len(produced) < 10